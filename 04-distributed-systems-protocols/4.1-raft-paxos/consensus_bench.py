@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Virtual-Time Consensus Benchmark
+Deterministic discrete-event runs of Raft, Multi-Paxos and classic Paxos
+over a modeled network with latency, jitter, loss, partitions and leader
+failures.
+"""
+
+import heapq
+import random
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from multi_raft import GroupReplica, RaftMessage
+from paxos_consensus import PaxosNode, Proposal, NOOP
+
+PROTOCOLS = ('raft', 'multi-paxos', 'paxos')
+
+@dataclass
+class NetworkModel:
+    latency: float = 0.005  # One-way delay (seconds)
+    jitter: float = 0.002   # Extra delay drawn uniformly from [0, jitter)
+    loss: float = 0.0       # Probability that any one message is dropped
+    partitions: List[Tuple[float, float, List[int]]] = field(default_factory=list)  # (start, end, cut-off nodes)
+    
+    def partitioned(self, now: float, from_id: int, to_id: int) -> bool:
+        return any(start <= now < end and (from_id in nodes) != (to_id in nodes)
+                   for start, end, nodes in self.partitions)
+
+@dataclass
+class BenchmarkConfig:
+    protocol: str = 'raft'
+    nodes: int = 5
+    batch_size: int = 16              # Commands per replication round
+    clients: int = 64                 # Closed-loop clients, one outstanding command each
+    leader_failure_rate: float = 0.0  # Leader crashes per virtual second
+    recovery_time: float = 0.5        # How long a crashed leader stays down
+    duration: float = 2.0             # Measured virtual seconds
+    warmup: float = 0.5               # First election happens here; not measured
+    tick: float = 0.005               # Shared tick driving timers on every node
+    heartbeat_ticks: int = 10
+    election_ticks: int = 30          # Election timeout is randomized in [election_ticks, 2x)
+    retry_ticks: int = 6              # Resend an unacknowledged round after this long
+    client_timeout: float = 0.5       # Resubmit a command not committed by then
+    network: NetworkModel = field(default_factory=NetworkModel)
+    seed: int = 1
+
+@dataclass
+class BenchmarkResult:
+    protocol: str
+    nodes: int
+    batch_size: int
+    leader_failure_rate: float
+    committed: int
+    throughput: float  # Commands committed per virtual second
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    messages: int
+    messages_per_commit: float
+    dropped: int
+    leader_crashes: int
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class ConsensusSimulator(ABC):
+    """Discrete-event driver shared by the protocol models.
+    
+    Time only moves when the next event is popped from the queue, and every
+    random choice (jitter, loss, timeouts, failures) comes from the seed, so
+    a configuration always produces the same result. All nodes tick together
+    on one timer; a message is delivered latency + jitter after it is sent
+    unless loss, a partition or a crashed endpoint drops it. Clients are
+    closed-loop: each keeps one command outstanding, hands it to whichever
+    live node currently leads, and resubmits it after client_timeout.
+    """
+    
+    def __init__(self, config: BenchmarkConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.failure_rng = random.Random(config.seed)  # Same crash times for every protocol
+        random.seed(config.seed)  # Election timeouts inside the protocol models
+        self.now = 0.0
+        self._events: List[tuple] = []
+        self._seq = 0
+        self.node_ids = list(range(config.nodes))
+        self.down: Set[int] = set()
+        
+        # Client state
+        self._next_command = 0
+        self.issued: Dict[int, float] = {}     # Outstanding command -> first submit time
+        self.submitted: Dict[int, float] = {}  # Outstanding command -> last submit time
+        self.queued: deque = deque()           # Commands waiting for the next tick
+        self.latencies: List[float] = []
+        
+        self.stats = {
+            'messages': 0,
+            'dropped': 0,
+            'leader_crashes': 0
+        }
+    
+    # --- Protocol hooks ---------------------------------------------------
+    
+    @abstractmethod
+    def tick_node(self, node_id: int):
+        """Advance one live node's timers by a tick"""
+    
+    @abstractmethod
+    def deliver(self, message):
+        """Hand a message that survived the network to its destination node"""
+    
+    @abstractmethod
+    def leader(self) -> Optional[int]:
+        """The live node clients should submit to, if any"""
+    
+    @abstractmethod
+    def propose(self, leader_id: int, commands: List[int]):
+        """Submit a batch of client commands at the leader"""
+    
+    @abstractmethod
+    def flush(self, node_id: int):
+        """Send everything the node has queued through send()"""
+    
+    # --- Event loop -------------------------------------------------------
+    
+    def schedule(self, delay: float, action: Callable, *args):
+        self._seq += 1
+        heapq.heappush(self._events, (self.now + delay, self._seq, action, args))
+    
+    def send(self, from_id: int, to_id: int, message):
+        self.stats['messages'] += 1
+        network = self.config.network
+        if (from_id in self.down or self.rng.random() < network.loss
+                or network.partitioned(self.now, from_id, to_id)):
+            self.stats['dropped'] += 1
+            return
+        self.schedule(network.latency + self.rng.random() * network.jitter, self._deliver, to_id, message)
+    
+    def _deliver(self, to_id: int, message):
+        if to_id in self.down:
+            self.stats['dropped'] += 1
+            return
+        self.deliver(message)
+        self.flush(to_id)  # Replies leave immediately rather than on the next tick
+    
+    def run(self) -> BenchmarkResult:
+        config = self.config
+        self.schedule(0.0, self._tick)
+        self.schedule(config.warmup, self._start_clients)
+        if config.leader_failure_rate > 0:
+            self.schedule(config.warmup + self.failure_rng.expovariate(config.leader_failure_rate),
+                          self._crash_leader)
+        
+        end = config.warmup + config.duration
+        while self._events and self._events[0][0] <= end:
+            self.now, _, action, args = heapq.heappop(self._events)
+            action(*args)
+        return self._result()
+    
+    def _tick(self):
+        for node_id in self.node_ids:
+            if node_id not in self.down:
+                self.tick_node(node_id)
+        self._submit()
+        for node_id in self.node_ids:
+            self.flush(node_id)
+        self.schedule(self.config.tick, self._tick)
+    
+    # --- Clients ----------------------------------------------------------
+    
+    def _start_clients(self):
+        for _ in range(self.config.clients):
+            self._issue()
+    
+    def _issue(self):
+        command = self._next_command
+        self._next_command += 1
+        self.issued[command] = self.now
+        self.queued.append(command)
+    
+    def _submit(self):
+        leader = self.leader()
+        if leader is None:
+            return
+        timeout = self.config.client_timeout
+        for command, submitted in self.submitted.items():
+            if self.now - submitted >= timeout:
+                self.queued.append(command)
+        if self.queued:
+            commands = list(self.queued)
+            self.queued.clear()
+            for command in commands:
+                self.submitted[command] = self.now
+            self.propose(leader, commands)
+    
+    def committed(self, command: int):
+        """Record a command's first commit and issue that client's next one"""
+        issued = self.issued.pop(command, None)
+        if issued is None:
+            return  # A resubmitted duplicate
+        self.submitted.pop(command, None)
+        self.latencies.append(self.now - issued)
+        self._issue()
+    
+    # --- Failures ---------------------------------------------------------
+    
+    def _crash_leader(self):
+        leader = self.leader()
+        if leader is not None:
+            self.down.add(leader)
+            self.stats['leader_crashes'] += 1
+            self.schedule(self.config.recovery_time, self.down.discard, leader)
+        self.schedule(self.failure_rng.expovariate(self.config.leader_failure_rate), self._crash_leader)
+    
+    def _result(self) -> BenchmarkResult:
+        config = self.config
+        committed = len(self.latencies)
+        latencies_ms = [latency * 1000 for latency in self.latencies]
+        return BenchmarkResult(
+            protocol=config.protocol,
+            nodes=config.nodes,
+            batch_size=config.batch_size,
+            leader_failure_rate=config.leader_failure_rate,
+            committed=committed,
+            throughput=committed / config.duration,
+            p50_ms=percentile(latencies_ms, 0.50),
+            p90_ms=percentile(latencies_ms, 0.90),
+            p99_ms=percentile(latencies_ms, 0.99),
+            messages=self.stats['messages'],
+            messages_per_commit=self.stats['messages'] / max(committed, 1),
+            dropped=self.stats['dropped'],
+            leader_crashes=self.stats['leader_crashes']
+        )
+
+class RaftSimulator(ConsensusSimulator):
+    """Raft through multi_raft.GroupReplica; batch_size bounds entries per AppendEntries"""
+    
+    def __init__(self, config: BenchmarkConfig):
+        super().__init__(config)
+        self.replicas = {
+            node_id: GroupReplica(0, node_id, [peer for peer in self.node_ids if peer != node_id],
+                                  config.batch_size, config.heartbeat_ticks, config.election_ticks,
+                                  config.retry_ticks)
+            for node_id in self.node_ids
+        }
+        self.scanned = -1  # Highest committed index already reported to clients
+    
+    def tick_node(self, node_id: int):
+        self.replicas[node_id].tick()
+    
+    def deliver(self, message: RaftMessage):
+        self.replicas[message.to_id].step(message)
+        self._report_commits()
+    
+    def flush(self, node_id: int):
+        replica = self.replicas[node_id]
+        for message in replica.outbox:
+            self.send(node_id, message.to_id, message)
+        replica.outbox = []
+    
+    def leader(self) -> Optional[int]:
+        leaders = [(replica.node.current_term, node_id) for node_id, replica in self.replicas.items()
+                   if replica.is_leader and node_id not in self.down]
+        return max(leaders)[1] if leaders else None
+    
+    def propose(self, leader_id: int, commands: List[int]):
+        replica = self.replicas[leader_id]
+        for command in commands:
+            replica.propose(f"C{command}")
+    
+    def _report_commits(self):
+        # Committed prefixes agree, so read new commits from whichever node is furthest ahead
+        node = max((replica.node for replica in self.replicas.values()), key=lambda n: n.commit_index)
+        while self.scanned < node.commit_index:
+            self.scanned += 1
+            command = node.entry(self.scanned).command
+            if command.startswith("C"):
+                self.committed(int(command[1:]))
+
+@dataclass
+class PaxosMessage:
+    type: str  # prepare, promise, nack, accept, accepted, heartbeat
+    ballot: int
+    from_id: int
+    to_id: int
+    slot: int = -1
+    value: Optional[str] = None
+    accepted: Dict[int, Proposal] = field(default_factory=dict)     # Promise: unchosen accepted slots
+    chosen: List[Tuple[int, str]] = field(default_factory=list)     # Piggybacked learner updates
+
+@dataclass
+class PaxosRound:
+    slot: int
+    value: str
+    acks: Set[int]
+    age: int = 0
+
+class PaxosReplica:
+    """Event-driven Paxos proposer, acceptor and learner on one node.
+    
+    A distinguished proposer wins Phase 1 and then fills one slot per round
+    with up to batch_size commands. With multi=True it keeps its ballot for
+    every later slot (Multi-Paxos); with multi=False it runs Phase 1 again
+    before each slot, as single-decree Paxos does. Chosen slots are
+    announced on the next accept or heartbeat rather than in extra messages.
+    """
+    
+    def __init__(self, node_id: int, peer_ids: List[int], multi: bool, config: BenchmarkConfig,
+                 on_chosen: Callable[[str], None]):
+        self.node = PaxosNode(node_id)
+        self.peers = peer_ids
+        self.multi = multi
+        self.config = config
+        self.on_chosen = on_chosen
+        
+        self.ballot = -1
+        self.leading = False
+        self.phase: Optional[str] = None  # 'prepare' or 'ready'
+        self.phase_age = 0
+        self.promises: Dict[int, Dict[int, Proposal]] = {}
+        self.round: Optional[PaxosRound] = None
+        self.recovered: List[Tuple[int, str]] = []  # Slots to re-propose after Phase 1
+        self.pending: deque = deque()
+        self.announce: List[Tuple[int, str]] = []
+        
+        self.elapsed = 0
+        self.timeout = self._random_timeout()
+        self.outbox: List[PaxosMessage] = []
+    
+    def _random_timeout(self) -> int:
+        return random.randint(self.config.election_ticks, 2 * self.config.election_ticks - 1)
+    
+    def _majority(self, count: int) -> bool:
+        return count > (len(self.peers) + 1) // 2
+    
+    def tick(self):
+        self.elapsed += 1
+        if self.leading:
+            if self.round:
+                self.round.age += 1
+                if self.round.age >= self.config.retry_ticks:
+                    self.round.age = 0
+                    for peer in self.peers:
+                        if peer not in self.round.acks:
+                            self._send(peer, 'accept', slot=self.round.slot, value=self.round.value)
+            elif self.phase == 'ready':
+                self._start_round()
+            elif self.phase is None and (self.recovered or self.pending):
+                self._prepare()
+            if self.elapsed >= self.config.heartbeat_ticks:
+                self.elapsed = 0
+                self._broadcast('heartbeat')
+        
+        if self.phase == 'prepare':
+            self.phase_age += 1
+            if self.phase_age >= self.config.retry_ticks:
+                self.phase_age = 0
+                for peer in self.peers:
+                    if peer not in self.promises:
+                        self._send(peer, 'prepare')
+        
+        if not self.leading and self.elapsed >= self.timeout:
+            self._prepare()
+    
+    def step(self, msg: PaxosMessage):
+        node = self.node
+        if (msg.ballot > self.ballot and (self.leading or self.phase)
+                and msg.type in ('prepare', 'accept', 'heartbeat', 'nack')):
+            self._step_down()
+        
+        if msg.type == 'prepare':
+            if msg.ballot > node.highest_proposal_seen:
+                node.highest_proposal_seen = msg.ballot
+                self.elapsed = 0
+                self._send(msg.from_id, 'promise', ballot=msg.ballot, accepted=self._unchosen_accepted())
+            else:
+                self._send(msg.from_id, 'nack', ballot=node.highest_proposal_seen)
+        
+        elif msg.type == 'promise':
+            if self.phase == 'prepare' and msg.ballot == self.ballot:
+                self.promises[msg.from_id] = msg.accepted
+                if self._majority(len(self.promises)):
+                    self._phase1_complete()
+        
+        elif msg.type == 'accept':
+            if msg.ballot >= node.highest_proposal_seen:
+                node.highest_proposal_seen = msg.ballot
+                node.accepted_slots[msg.slot] = Proposal(msg.ballot, msg.value)
+                self.elapsed = 0
+                self._learn(msg.chosen)
+                self._send(msg.from_id, 'accepted', ballot=msg.ballot, slot=msg.slot)
+            else:
+                self._send(msg.from_id, 'nack', ballot=node.highest_proposal_seen)
+        
+        elif msg.type == 'accepted':
+            current = self.round
+            if current and msg.ballot == self.ballot and msg.slot == current.slot:
+                current.acks.add(msg.from_id)
+                if self._majority(len(current.acks)):
+                    self.round = None
+                    if not self.multi:
+                        self.phase = None  # Next slot starts with a fresh Phase 1
+                    self._chosen(current.slot, current.value)
+        
+        elif msg.type == 'heartbeat':
+            if msg.ballot >= node.highest_proposal_seen:
+                node.highest_proposal_seen = msg.ballot
+                self.elapsed = 0
+                self._learn(msg.chosen)
+        
+        elif msg.type == 'nack':
+            node.highest_proposal_seen = max(node.highest_proposal_seen, msg.ballot)
+    
+    def _prepare(self):
+        node = self.node
+        n = len(self.peers) + 1
+        self.ballot = (max(node.highest_proposal_seen, self.ballot) // n + 1) * n + node.node_id
+        node.highest_proposal_seen = self.ballot
+        self.phase, self.phase_age = 'prepare', 0
+        self.promises = {node.node_id: self._unchosen_accepted()}
+        if not self.leading:
+            self.elapsed = 0
+            self.timeout = self._random_timeout()
+        self._broadcast('prepare')
+    
+    def _phase1_complete(self):
+        """Adopt the highest-ballot value for every unchosen slot and fill gaps with no-ops"""
+        node = self.node
+        self.phase = 'ready'
+        self.leading = True
+        node.leader_ballot = self.ballot
+        
+        best: Dict[int, Proposal] = {}
+        for accepted in self.promises.values():
+            for slot, proposal in accepted.items():
+                if slot not in node.chosen_log and (slot not in best or proposal.proposal_id > best[slot].proposal_id):
+                    best[slot] = proposal
+        top = max([node.next_slot - 1] + list(best) + list(node.chosen_log))
+        self.recovered = [(slot, best[slot].value if slot in best else NOOP)
+                          for slot in range(top + 1) if slot not in node.chosen_log]
+        node.next_slot = top + 1
+    
+    def _start_round(self):
+        node = self.node
+        if self.recovered:
+            slot, value = self.recovered.pop(0)
+        elif self.pending:
+            batch = [self.pending.popleft() for _ in range(min(self.config.batch_size, len(self.pending)))]
+            value = " ".join(f"C{command}" for command in batch)
+            slot = node.next_slot
+            node.next_slot += 1
+        else:
+            return
+        node.accepted_slots[slot] = Proposal(self.ballot, value)
+        self.round = PaxosRound(slot, value, {node.node_id})
+        self._broadcast('accept', slot=slot, value=value)
+    
+    def _step_down(self):
+        self.leading = False
+        self.phase = None
+        self.round = None
+        self.recovered = []
+        self.pending.clear()  # Clients resubmit to the next leader
+        self.node.leader_ballot = None
+        self.elapsed = 0
+        self.timeout = self._random_timeout()
+    
+    def _chosen(self, slot: int, value: str):
+        self.node.chosen_log[slot] = value
+        self.announce.append((slot, value))
+        self.on_chosen(value)
+    
+    def _learn(self, chosen: List[Tuple[int, str]]):
+        for slot, value in chosen:
+            self.node.chosen_log[slot] = value
+    
+    def _unchosen_accepted(self) -> Dict[int, Proposal]:
+        return {slot: proposal for slot, proposal in self.node.accepted_slots.items()
+                if slot not in self.node.chosen_log}
+    
+    def _broadcast(self, msg_type: str, **fields):
+        if msg_type in ('accept', 'heartbeat'):
+            fields['chosen'], self.announce = self.announce, []
+        for peer in self.peers:
+            self._send(peer, msg_type, **fields)
+    
+    def _send(self, to_id: int, msg_type: str, ballot: Optional[int] = None, **fields):
+        self.outbox.append(PaxosMessage(msg_type, self.ballot if ballot is None else ballot,
+                                        self.node.node_id, to_id, **fields))
+
+class PaxosSimulator(ConsensusSimulator):
+    """Multi-Paxos or classic Paxos through PaxosReplica; batch_size bounds commands per slot"""
+    
+    def __init__(self, config: BenchmarkConfig):
+        super().__init__(config)
+        multi = config.protocol == 'multi-paxos'
+        self.replicas = {
+            node_id: PaxosReplica(node_id, [peer for peer in self.node_ids if peer != node_id],
+                                  multi, config, self._on_chosen)
+            for node_id in self.node_ids
+        }
+    
+    def tick_node(self, node_id: int):
+        self.replicas[node_id].tick()
+    
+    def deliver(self, message: PaxosMessage):
+        self.replicas[message.to_id].step(message)
+    
+    def flush(self, node_id: int):
+        replica = self.replicas[node_id]
+        for message in replica.outbox:
+            self.send(node_id, message.to_id, message)
+        replica.outbox = []
+    
+    def leader(self) -> Optional[int]:
+        leaders = [(replica.ballot, node_id) for node_id, replica in self.replicas.items()
+                   if replica.leading and node_id not in self.down]
+        return max(leaders)[1] if leaders else None
+    
+    def propose(self, leader_id: int, commands: List[int]):
+        self.replicas[leader_id].pending.extend(commands)
+    
+    def _on_chosen(self, value: str):
+        for token in value.split():
+            if token.startswith("C"):
+                self.committed(int(token[1:]))
+
+def run_benchmark(config: BenchmarkConfig) -> BenchmarkResult:
+    if config.protocol == 'raft':
+        return RaftSimulator(config).run()
+    if config.protocol in ('multi-paxos', 'paxos'):
+        return PaxosSimulator(config).run()
+    raise ValueError(f"Unknown protocol: {config.protocol}")
+
+def sweep(base: Optional[BenchmarkConfig] = None, protocols: Tuple[str, ...] = PROTOCOLS,
+          node_counts: Tuple[int, ...] = (3, 5, 7), batch_sizes: Tuple[int, ...] = (1, 8, 64),
+          failure_rates: Tuple[float, ...] = (0.0, 0.5, 2.0)) -> Dict[str, List[BenchmarkResult]]:
+    """Vary one dimension at a time from the base configuration"""
+    base = base or BenchmarkConfig()
+    dimensions = {
+        'nodes': [{'nodes': n} for n in node_counts],
+        'batch_size': [{'batch_size': b} for b in batch_sizes],
+        'leader_failure_rate': [{'leader_failure_rate': r} for r in failure_rates]
+    }
+    results = {}
+    for dimension, variations in dimensions.items():
+        results[dimension] = [
+            run_benchmark(BenchmarkConfig(**{**base.__dict__, 'protocol': protocol, **variation}))
+            for variation in variations for protocol in protocols
+        ]
+    return results
+
+def print_results(title: str, results: List[BenchmarkResult]):
+    print(f"📊 {title}")
+    print(f"   {'protocol':<12}{'nodes':>6}{'batch':>6}{'fail/s':>7}{'commits/s':>11}"
+          f"{'p50 ms':>8}{'p90 ms':>8}{'p99 ms':>8}{'msgs/commit':>13}")
+    for r in results:
+        print(f"   {r.protocol:<12}{r.nodes:>6}{r.batch_size:>6}{r.leader_failure_rate:>7.1f}"
+              f"{r.throughput:>11,.0f}{r.p50_ms:>8.1f}{r.p90_ms:>8.1f}{r.p99_ms:>8.1f}"
+              f"{r.messages_per_commit:>13.2f}")
+    print()
+
+def demonstrate_virtual_benchmark():
+    """Show reproducibility and the effect of a lossy, partitioned network"""
+    print("=== Virtual-Time Consensus Benchmark ===")
+    
+    config = BenchmarkConfig(protocol='raft', seed=7)
+    first, second = run_benchmark(config), run_benchmark(config)
+    print(f"🔁 Same seed twice: {first.committed} vs {second.committed} commits, "
+          f"p99 {first.p99_ms:.1f}ms vs {second.p99_ms:.1f}ms → "
+          f"{'identical' if first == second else 'different'}\n")
+    
+    lossy = NetworkModel(latency=0.01, jitter=0.005, loss=0.02, partitions=[(1.0, 1.5, [0, 1])])
+    print_results("Lossy WAN (10ms ± 5ms, 2% loss, nodes 0-1 cut off at t=1.0-1.5s)",
+                  [run_benchmark(BenchmarkConfig(protocol=protocol, network=lossy)) for protocol in PROTOCOLS])
+    
+    print("🎯 Virtual-time benchmark demonstrates:")
+    print("💡 Simulated clock: results depend only on the seed, not on the host")
+    print("💡 Network model: latency, jitter, loss and timed partitions")
+    print("💡 Closed-loop clients with resubmission across leader failures")
+    print("💡 Throughput, p50/p90/p99 commit latency and messages per commit")
+
+if __name__ == "__main__":
+    demonstrate_virtual_benchmark()
@@ -10,6 +10,7 @@ import statistics
 from typing import List, Dict, Tuple
 from raft_consensus import RaftCluster
 from paxos_consensus import PaxosCluster
+from consensus_bench import BenchmarkConfig, sweep, print_results
 
 class ConsensusComparison:
     def __init__(self):
@@ -27,7 +28,16 @@ class ConsensusComparison:
                 'proposals': 0,
                 'success_rate': 0,
                 'partition_tolerance': 0
-            }
+            },
+            'multi_paxos': {
+                'latency': [],
+                'throughput': [],
+                'messages_per_value': [],
+                'leader_elections': 0,
+                'success_rate': 0,
+                'partition_tolerance': 0
+            },
+            'virtual': {}
         }
     
     def benchmark_raft(self, node_count: int = 5, operations: int = 10) -> Dict:
@@ -70,7 +80,7 @@ class ConsensusComparison:
         
         return {
             'avg_latency': statistics.mean(latencies) if latencies else 0,
-            'throughput': successes / (operations * 0.05) if operations > 0 else 0,
+            'throughput': successes / (sum(latencies) / 1000) if latencies else 0,
             'success_rate': successes / operations if operations > 0 else 0,
             'partition_tolerance': partition_successes / 3,
             'leader_elections': cluster.stats['elections']
@@ -111,12 +121,55 @@ class ConsensusComparison:
         
         return {
             'avg_latency': statistics.mean(latencies) if latencies else 0,
-            'throughput': successes / (operations * 0.05) if operations > 0 else 0,
+            'throughput': successes / (sum(latencies) / 1000) if latencies else 0,
             'success_rate': successes / operations if operations > 0 else 0,
             'partition_tolerance': partition_successes / 3,
             'proposals': cluster.stats['proposals']
         }
     
+    def benchmark_multi_paxos(self, node_count: int = 5, operations: int = 10) -> Dict:
+        """Benchmark Multi-Paxos in steady state: one Phase 1, then Phase 2 per value"""
+        print(f"🔬 Benchmarking Multi-Paxos with {node_count} nodes, {operations} operations")
+        
+        cluster = PaxosCluster(node_count)
+        cluster.elect_leader(0)  # Like Raft's election, kept out of the measured operations
+        
+        latencies = []
+        successes = 0
+        messages_before = cluster.stats['messages']
+        
+        for i in range(operations):
+            start_time = time.time()
+            success = cluster.propose_multi(0, f"operation_{i}")
+            end_time = time.time()
+            
+            if success:
+                latencies.append((end_time - start_time) * 1000)  # ms
+                successes += 1
+            
+            time.sleep(0.05)  # Small delay between operations
+        
+        messages_per_value = (cluster.stats['messages'] - messages_before) / max(successes, 1)
+        
+        # Test partition tolerance: the leader is cut off, the majority side takes over
+        cluster.simulate_partition([0, 1])
+        partition_successes = 0
+        for i in range(3):
+            if cluster.propose_multi(2, f"partition_op_{i}"):
+                partition_successes += 1
+            time.sleep(0.05)
+        
+        cluster.heal_partition()
+        
+        return {
+            'avg_latency': statistics.mean(latencies) if latencies else 0,
+            'throughput': successes / (sum(latencies) / 1000) if latencies else 0,
+            'messages_per_value': messages_per_value,
+            'success_rate': successes / operations if operations > 0 else 0,
+            'partition_tolerance': partition_successes / 3,
+            'leader_elections': cluster.stats['leader_elections']
+        }
+    
     def run_comparison(self):
         """Run comprehensive comparison between Raft and Paxos"""
         print("=== Raft vs Paxos Consensus Comparison ===\n")
@@ -144,12 +197,25 @@ class ConsensusComparison:
             self.results['paxos']['partition_tolerance'] += paxos_results['partition_tolerance']
             self.results['paxos']['proposals'] += paxos_results['proposals']
             
+            # Benchmark Multi-Paxos
+            multi_results = self.benchmark_multi_paxos(size, operations_per_test)
+            self.results['multi_paxos']['latency'].append(multi_results['avg_latency'])
+            self.results['multi_paxos']['throughput'].append(multi_results['throughput'])
+            self.results['multi_paxos']['messages_per_value'].append(multi_results['messages_per_value'])
+            self.results['multi_paxos']['success_rate'] += multi_results['success_rate']
+            self.results['multi_paxos']['partition_tolerance'] += multi_results['partition_tolerance']
+            self.results['multi_paxos']['leader_elections'] += multi_results['leader_elections']
+            
             print(f"   Raft - Latency: {raft_results['avg_latency']:.1f}ms, "
                   f"Throughput: {raft_results['throughput']:.1f} ops/s, "
                   f"Success: {raft_results['success_rate']:.1%}")
             print(f"   Paxos - Latency: {paxos_results['avg_latency']:.1f}ms, "
                   f"Throughput: {paxos_results['throughput']:.1f} ops/s, "
                   f"Success: {paxos_results['success_rate']:.1%}")
+            print(f"   Multi-Paxos - Latency: {multi_results['avg_latency']:.1f}ms, "
+                  f"Throughput: {multi_results['throughput']:.1f} ops/s, "
+                  f"Success: {multi_results['success_rate']:.1%}, "
+                  f"Messages/value: {multi_results['messages_per_value']:.1f}")
             print()
         
         # Average results
@@ -158,9 +224,28 @@ class ConsensusComparison:
         self.results['raft']['partition_tolerance'] /= num_tests
         self.results['paxos']['success_rate'] /= num_tests
         self.results['paxos']['partition_tolerance'] /= num_tests
+        self.results['multi_paxos']['success_rate'] /= num_tests
+        self.results['multi_paxos']['partition_tolerance'] /= num_tests
         
         self.print_comparison_summary()
     
+    def run_virtual_benchmarks(self, base: BenchmarkConfig = None):
+        """Reproducible sweep on a simulated clock: cluster size, batch size, leader failures"""
+        base = base or BenchmarkConfig()
+        print("=== Virtual-Time Sweep (deterministic, seed %d) ===\n" % base.seed)
+        print(f"🌐 Network: {base.network.latency * 1000:.0f}ms ± {base.network.jitter * 1000:.0f}ms one-way, "
+              f"{base.network.loss:.0%} loss; {base.clients} closed-loop clients, "
+              f"{base.duration:.0f}s measured per run\n")
+        
+        self.results['virtual'] = sweep(base)
+        titles = {
+            'nodes': f"Cluster size (batch {base.batch_size}, no failures)",
+            'batch_size': f"Batch size ({base.nodes} nodes, no failures)",
+            'leader_failure_rate': f"Leader failures per second ({base.nodes} nodes, batch {base.batch_size})"
+        }
+        for dimension, results in self.results['virtual'].items():
+            print_results(titles[dimension], results)
+    
     def print_comparison_summary(self):
         """Print detailed comparison summary"""
         print("📈 Comprehensive Comparison Summary:")
@@ -171,12 +256,18 @@ class ConsensusComparison:
         paxos_avg_latency = statistics.mean(self.results['paxos']['latency'])
         raft_avg_throughput = statistics.mean(self.results['raft']['throughput'])
         paxos_avg_throughput = statistics.mean(self.results['paxos']['throughput'])
+        multi_avg_latency = statistics.mean(self.results['multi_paxos']['latency'])
+        multi_avg_throughput = statistics.mean(self.results['multi_paxos']['throughput'])
         
         print(f"⚡ Performance Metrics:")
         print(f"   Raft Average Latency:    {raft_avg_latency:.1f}ms")
         print(f"   Paxos Average Latency:   {paxos_avg_latency:.1f}ms")
+        print(f"   Multi-Paxos Average Latency: {multi_avg_latency:.1f}ms")
         print(f"   Raft Average Throughput: {raft_avg_throughput:.1f} ops/s")
         print(f"   Paxos Average Throughput: {paxos_avg_throughput:.1f} ops/s")
+        print(f"   Multi-Paxos Average Throughput: {multi_avg_throughput:.1f} ops/s")
+        print(f"   Multi-Paxos Messages/Value: "
+              f"{statistics.mean(self.results['multi_paxos']['messages_per_value']):.1f}")
         
         # Reliability metrics
         print(f"\n🛡️  Reliability Metrics:")
@@ -184,11 +275,14 @@ class ConsensusComparison:
         print(f"   Paxos Success Rate:      {self.results['paxos']['success_rate']:.1%}")
         print(f"   Raft Partition Tolerance: {self.results['raft']['partition_tolerance']:.1%}")
         print(f"   Paxos Partition Tolerance: {self.results['paxos']['partition_tolerance']:.1%}")
+        print(f"   Multi-Paxos Success Rate: {self.results['multi_paxos']['success_rate']:.1%}")
+        print(f"   Multi-Paxos Partition Tolerance: {self.results['multi_paxos']['partition_tolerance']:.1%}")
         
         # Algorithm characteristics
         print(f"\n🔍 Algorithm Characteristics:")
         print(f"   Raft Leader Elections:   {self.results['raft']['leader_elections']}")
         print(f"   Paxos Total Proposals:   {self.results['paxos']['proposals']}")
+        print(f"   Multi-Paxos Phase 1 Rounds: {self.results['multi_paxos']['leader_elections']}")
         
         # Comparison analysis
         print(f"\n📊 Analysis:")
@@ -203,6 +297,14 @@ class ConsensusComparison:
         else:
             print(f"   🚀 Paxos has {((paxos_avg_throughput / raft_avg_throughput - 1) * 100):.1f}% higher throughput")
         
+        # Both stable-leader protocols pay one round trip per value in steady state
+        if raft_avg_throughput > multi_avg_throughput:
+            print(f"   ⚖️  Steady state: Raft has {((raft_avg_throughput / multi_avg_throughput - 1) * 100):.1f}% "
+                  f"higher throughput than Multi-Paxos")
+        else:
+            print(f"   ⚖️  Steady state: Multi-Paxos has {((multi_avg_throughput / raft_avg_throughput - 1) * 100):.1f}% "
+                  f"higher throughput than Raft")
+        
         # Trade-offs summary
         print(f"\n⚖️  Trade-offs Summary:")
         print(f"   Raft Advantages:")
@@ -232,6 +334,8 @@ def demonstrate_comparison():
     """Demonstrate consensus algorithm comparison"""
     comparison = ConsensusComparison()
     comparison.run_comparison()
+    print()
+    comparison.run_virtual_benchmarks()
 
 if __name__ == "__main__":
     demonstrate_comparison()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Multi-Raft Host
+Many Raft groups per node driven by one tick scheduler, with per-peer
+message coalescing.
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from raft_consensus import LogEntry, NodeState, RaftNode, NOOP_COMMAND, apply_command
+
+HEARTBEAT_TICKS = 2      # Leader heartbeat interval
+ELECTION_TICKS = 10      # Election timeout is randomized in [ELECTION_TICKS, 2 * ELECTION_TICKS)
+APPEND_RETRY_TICKS = 4   # Resend an unacknowledged AppendEntries after this long
+
+@dataclass
+class RaftMessage:
+    group_id: int
+    type: str  # vote, vote_resp, append, append_resp, heartbeat, heartbeat_resp
+    term: int
+    from_id: int
+    to_id: int
+    index: int = -1    # prev_log_index / last_log_index; match or hint index in responses
+    log_term: int = 0  # prev_log_term / last_log_term
+    entries: List[LogEntry] = field(default_factory=list)
+    commit: int = -1
+    success: bool = False
+
+@dataclass
+class Envelope:
+    """Everything one host sends one peer in a tick, across all groups"""
+    from_id: int
+    to_id: int
+    messages: List[RaftMessage] = field(default_factory=list)
+    heartbeats: List[Tuple[int, int, int]] = field(default_factory=list)            # (group, term, commit)
+    heartbeat_acks: List[Tuple[int, int, bool]] = field(default_factory=list)      # (group, term, success)
+    
+    def message_count(self) -> int:
+        return len(self.messages) + len(self.heartbeats) + len(self.heartbeat_acks)
+
+class GroupReplica:
+    """One member of one Raft group, stepped by its host.
+    
+    The replica owns no timer and no socket: tick() advances its election
+    and heartbeat clocks by one unit and step() handles a message. Anything
+    it wants to send is left in outbox for the host to collect, so every
+    group's traffic to a peer leaves in that tick's single envelope.
+    """
+    
+    def __init__(self, group_id: int, node_id: int, peer_ids: List[int], max_batch_entries: int = 64,
+                 heartbeat_ticks: int = HEARTBEAT_TICKS, election_ticks: int = ELECTION_TICKS,
+                 retry_ticks: int = APPEND_RETRY_TICKS):
+        self.group_id = group_id
+        self.node = RaftNode(node_id)
+        self.peers = peer_ids
+        self.max_batch_entries = max_batch_entries
+        self.heartbeat_ticks = heartbeat_ticks
+        self.election_ticks = election_ticks
+        self.retry_ticks = retry_ticks
+        
+        self.elapsed = 0
+        self.timeout = self._random_timeout()
+        self.votes: Set[int] = set()
+        self.inflight: Dict[int, int] = {}  # peer -> ticks since its AppendEntries was sent
+        self.outbox: List[RaftMessage] = []
+    
+    @property
+    def is_leader(self) -> bool:
+        return self.node.state == NodeState.LEADER
+    
+    def _random_timeout(self) -> int:
+        return random.randint(self.election_ticks, 2 * self.election_ticks - 1)
+    
+    def tick(self):
+        self.elapsed += 1
+        if self.is_leader:
+            for peer in list(self.inflight):
+                self.inflight[peer] += 1
+                if self.inflight[peer] >= self.retry_ticks:
+                    del self.inflight[peer]
+            if self.elapsed >= self.heartbeat_ticks:
+                self.elapsed = 0
+                for peer in self.peers:
+                    # Never ask a follower to commit past what it is known to hold
+                    commit = min(self.node.commit_index, self.node.match_index[peer])
+                    self._send(peer, 'heartbeat', commit=commit)
+            self._replicate()
+        elif self.elapsed >= self.timeout:
+            self._campaign()
+    
+    def propose(self, command: str) -> Optional[LogEntry]:
+        """Append to the leader's log; it is replicated on the next tick"""
+        if not self.is_leader:
+            return None
+        node = self.node
+        entry = LogEntry(node.current_term, node.last_index() + 1, command)
+        node.log.append(entry)
+        self._advance_commit()
+        return entry
+    
+    def step(self, msg: RaftMessage):
+        node = self.node
+        if msg.term > node.current_term:
+            node.current_term = msg.term
+            node.voted_for = None
+            self._become_follower()
+        
+        if msg.type == 'vote':
+            last = node.last_index()
+            up_to_date = (msg.log_term, msg.index) >= (node.term_at(last), last)
+            granted = (msg.term == node.current_term and up_to_date
+                       and node.voted_for in (None, msg.from_id))
+            if granted:
+                node.voted_for = msg.from_id
+                self.elapsed = 0
+            self._send(msg.from_id, 'vote_resp', success=granted)
+        
+        elif msg.type == 'vote_resp':
+            if node.state == NodeState.CANDIDATE and msg.term == node.current_term and msg.success:
+                self.votes.add(msg.from_id)
+                if len(self.votes) > (len(self.peers) + 1) // 2:
+                    self._become_leader()
+        
+        elif msg.type in ('append', 'heartbeat'):
+            reply = 'append_resp' if msg.type == 'append' else 'heartbeat_resp'
+            if msg.term < node.current_term:
+                self._send(msg.from_id, reply, index=node.last_index())
+                return
+            self._become_follower()
+            self.elapsed = 0
+            if msg.type == 'heartbeat':
+                self._commit_to(min(msg.commit, node.last_index()))
+                self._send(msg.from_id, reply, success=True)
+            else:
+                self._handle_append(msg)
+        
+        elif msg.type == 'append_resp':
+            if not self.is_leader or msg.term != node.current_term:
+                return
+            self.inflight.pop(msg.from_id, None)
+            if msg.success:
+                node.match_index[msg.from_id] = max(node.match_index[msg.from_id], msg.index)
+                node.next_index[msg.from_id] = node.match_index[msg.from_id] + 1
+                self._advance_commit()
+            else:
+                node.next_index[msg.from_id] = max(0, min(node.next_index[msg.from_id] - 1, msg.index + 1))
+    
+    def _handle_append(self, msg: RaftMessage):
+        node = self.node
+        prev = msg.index
+        if prev > node.last_index() or node.term_at(prev) != msg.log_term:
+            self._send(msg.from_id, 'append_resp', index=min(prev - 1, node.last_index()))
+            return
+        
+        for entry in msg.entries:
+            if entry.index <= node.last_index():
+                if node.term_at(entry.index) == entry.term:
+                    continue
+                del node.log[entry.index - node.first_index():]
+            node.log.append(LogEntry(entry.term, entry.index, entry.command))
+        
+        last_new = prev + len(msg.entries)
+        self._commit_to(min(msg.commit, last_new))
+        self._send(msg.from_id, 'append_resp', index=last_new, success=True)
+    
+    def _replicate(self):
+        """At most one AppendEntries per peer in flight, carrying everything it lacks"""
+        node = self.node
+        for peer in self.peers:
+            if peer in self.inflight or node.next_index[peer] > node.last_index():
+                continue
+            prev = node.next_index[peer] - 1
+            self._send(peer, 'append', index=prev, log_term=node.term_at(prev),
+                       entries=node.entries_from(prev + 1, self.max_batch_entries),
+                       commit=node.commit_index)
+            self.inflight[peer] = 0
+    
+    def _campaign(self):
+        node = self.node
+        node.current_term += 1
+        node.state = NodeState.CANDIDATE
+        node.voted_for = node.node_id
+        self.votes = {node.node_id}
+        self.elapsed = 0
+        self.timeout = self._random_timeout()
+        
+        if not self.peers:
+            self._become_leader()
+            return
+        last = node.last_index()
+        for peer in self.peers:
+            self._send(peer, 'vote', index=last, log_term=node.term_at(last))
+    
+    def _become_leader(self):
+        node = self.node
+        node.state = NodeState.LEADER
+        node.next_index = {peer: node.last_index() + 1 for peer in self.peers}
+        node.match_index = {peer: -1 for peer in self.peers}
+        self.inflight = {}
+        self.elapsed = self.heartbeat_ticks  # Announce on the next tick
+        self.propose(NOOP_COMMAND)  # Commits anything left over from earlier terms
+    
+    def _become_follower(self):
+        # A higher term alone does not reset the election timer; only a vote
+        # granted or word from the leader does, so a stale candidate cannot
+        # keep an election from happening
+        if self.node.state != NodeState.FOLLOWER:
+            self.node.state = NodeState.FOLLOWER
+            self.votes = set()
+            self.inflight = {}
+            self.timeout = self._random_timeout()
+            self.elapsed = 0
+    
+    def _advance_commit(self):
+        node = self.node
+        matches = sorted([node.last_index()] + [node.match_index[peer] for peer in self.peers], reverse=True)
+        majority_index = matches[len(matches) // 2]
+        if majority_index > node.commit_index and node.term_at(majority_index) == node.current_term:
+            self._commit_to(majority_index)
+    
+    def _commit_to(self, index: int):
+        node = self.node
+        if index <= node.commit_index:
+            return
+        node.commit_index = index
+        while node.last_applied < node.commit_index:
+            node.last_applied += 1
+            entry = node.entry(node.last_applied)
+            entry.committed = True
+            apply_command(node.state_machine, entry.command)
+    
+    def _send(self, to_id: int, msg_type: str, **fields):
+        self.outbox.append(RaftMessage(self.group_id, msg_type, self.node.current_term,
+                                       self.node.node_id, to_id, **fields))
+
+class MultiRaftHost:
+    """One node hosting a replica of every Raft group.
+    
+    tick() advances all groups and then gathers their outboxes into one
+    envelope per peer. Heartbeats and their acks, which dominate idle
+    traffic, travel as (group, term, commit) tuples inside the envelope
+    rather than as individual messages, so the number of messages a node
+    sends per tick is bounded by its peer count, not its group count.
+    """
+    
+    def __init__(self, node_id: int, peer_ids: List[int], group_ids: List[int], max_batch_entries: int = 64):
+        self.node_id = node_id
+        self.peer_ids = peer_ids
+        self.groups: Dict[int, GroupReplica] = {
+            group_id: GroupReplica(group_id, node_id, peer_ids, max_batch_entries)
+            for group_id in group_ids
+        }
+        
+        self.stats = {
+            'ticks': 0,
+            'raft_messages': 0,        # Logical per-group messages sent
+            'envelopes': 0,            # Network messages actually sent
+            'heartbeats_coalesced': 0  # Heartbeats and acks packed as tuples
+        }
+    
+    def tick(self) -> List[Envelope]:
+        self.stats['ticks'] += 1
+        for group in self.groups.values():
+            group.tick()
+        return self.flush()
+    
+    def flush(self) -> List[Envelope]:
+        """Drain every group's outbox into one envelope per peer"""
+        envelopes: Dict[int, Envelope] = {}
+        for group in self.groups.values():
+            if not group.outbox:
+                continue
+            for msg in group.outbox:
+                envelope = envelopes.get(msg.to_id)
+                if envelope is None:
+                    envelope = envelopes[msg.to_id] = Envelope(self.node_id, msg.to_id)
+                if msg.type == 'heartbeat':
+                    envelope.heartbeats.append((msg.group_id, msg.term, msg.commit))
+                elif msg.type == 'heartbeat_resp':
+                    envelope.heartbeat_acks.append((msg.group_id, msg.term, msg.success))
+                else:
+                    envelope.messages.append(msg)
+            group.outbox = []
+        
+        for envelope in envelopes.values():
+            self.stats['envelopes'] += 1
+            self.stats['raft_messages'] += envelope.message_count()
+            self.stats['heartbeats_coalesced'] += len(envelope.heartbeats) + len(envelope.heartbeat_acks)
+        return list(envelopes.values())
+    
+    def receive(self, envelope: Envelope):
+        """Unpack an envelope and step each group; replies go out on the next flush"""
+        sender = envelope.from_id
+        for group_id, term, commit in envelope.heartbeats:
+            if group_id in self.groups:
+                self.groups[group_id].step(RaftMessage(group_id, 'heartbeat', term, sender, self.node_id,
+                                                       commit=commit))
+        for group_id, term, success in envelope.heartbeat_acks:
+            if group_id in self.groups:
+                self.groups[group_id].step(RaftMessage(group_id, 'heartbeat_resp', term, sender, self.node_id,
+                                                       success=success))
+        for msg in envelope.messages:
+            if msg.group_id in self.groups:
+                self.groups[msg.group_id].step(msg)
+
+class MultiRaftCluster:
+    """Hosts wired together by a simulated network and one shared tick loop.
+    
+    Envelopes sent during a tick are delivered at the start of the next,
+    so a request/response round trip takes two ticks.
+    """
+    
+    def __init__(self, node_count: int = 3, group_count: int = 100, max_batch_entries: int = 64):
+        node_ids = list(range(node_count))
+        self.hosts: Dict[int, MultiRaftHost] = {
+            node_id: MultiRaftHost(node_id, [peer for peer in node_ids if peer != node_id],
+                                   list(range(group_count)), max_batch_entries)
+            for node_id in node_ids
+        }
+        self.group_count = group_count
+        self.in_transit: List[Envelope] = []
+        self.partitioned: Set[int] = set()
+        
+        self.stats = {
+            'ticks': 0,
+            'envelopes_dropped': 0
+        }
+    
+    def tick(self):
+        delivering, self.in_transit = self.in_transit, []
+        for envelope in delivering:
+            if (envelope.from_id in self.partitioned) != (envelope.to_id in self.partitioned):
+                self.stats['envelopes_dropped'] += 1
+                continue
+            self.hosts[envelope.to_id].receive(envelope)
+        for host in self.hosts.values():
+            self.in_transit.extend(host.tick())
+        self.stats['ticks'] += 1
+    
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.tick()
+    
+    def run_until(self, predicate: Callable[[], bool], max_ticks: int) -> bool:
+        for _ in range(max_ticks):
+            if predicate():
+                return True
+            self.tick()
+        return predicate()
+    
+    def leader_of(self, group_id: int) -> Optional[int]:
+        """Host of the highest-term leader replica for the group"""
+        leaders = [(host.groups[group_id].node.current_term, host.node_id)
+                   for host in self.hosts.values() if host.groups[group_id].is_leader]
+        return max(leaders)[1] if leaders else None
+    
+    def all_have_leaders(self) -> bool:
+        return all(self.leader_of(group_id) is not None for group_id in range(self.group_count))
+    
+    def propose(self, group_id: int, command: str) -> Optional[LogEntry]:
+        leader = self.leader_of(group_id)
+        if leader is None:
+            return None
+        return self.hosts[leader].groups[group_id].propose(command)
+    
+    def committed(self, group_id: int, entry: LogEntry) -> bool:
+        """An entry is committed once any replica's commit index covers it in the same term"""
+        for host in self.hosts.values():
+            node = host.groups[group_id].node
+            if node.commit_index >= entry.index and node.term_at(entry.index) == entry.term:
+                return True
+        return False
+    
+    def simulate_partition(self, node_ids: List[int]):
+        """Cut the given hosts off from the rest"""
+        self.partitioned = set(node_ids)
+    
+    def heal_partition(self):
+        self.partitioned = set()
+    
+    def host_stats(self) -> Dict[str, int]:
+        totals = {key: 0 for key in ('raft_messages', 'envelopes', 'heartbeats_coalesced')}
+        for host in self.hosts.values():
+            for key in totals:
+                totals[key] += host.stats[key]
+        return totals
+
+def demonstrate_multi_raft(node_count: int = 3, group_counts: Tuple[int, ...] = (1, 10, 100, 1000),
+                           ticks: int = 50):
+    """Show per-node message cost as the number of groups per node grows"""
+    print("=== Multi-Raft Host Demonstration ===")
+    print(f"🖥️ {node_count} hosts, one tick scheduler per cluster, {ticks} measured ticks per run\n")
+    
+    for group_count in group_counts:
+        cluster = MultiRaftCluster(node_count, group_count)
+        elected = cluster.run_until(cluster.all_have_leaders, max_ticks=200)
+        election_ticks = cluster.stats['ticks']
+        
+        before = cluster.host_stats()
+        start = time.time()
+        entries = []
+        for t in range(ticks):
+            if t % 5 == 0:
+                entries.extend((g, cluster.propose(g, f"SET g{g}=t{t}")) for g in range(group_count))
+            cluster.tick()
+        elapsed = time.time() - start
+        after = cluster.host_stats()
+        cluster.run(4)
+        
+        node_ticks = ticks * node_count
+        messages = (after['raft_messages'] - before['raft_messages']) / node_ticks
+        envelopes = (after['envelopes'] - before['envelopes']) / node_ticks
+        committed = sum(1 for g, entry in entries if entry and cluster.committed(g, entry))
+        print(f"📦 {group_count:>5} groups: leaders {'✅' if elected else '❌'} in {election_ticks:>3} ticks, "
+              f"{messages:8.1f} raft msgs → {envelopes:.1f} envelopes per node per tick, "
+              f"{committed}/{len(entries)} committed, {elapsed / ticks * 1000:.2f}ms/tick")
+    
+    # Failover: every group led by an isolated host re-elects elsewhere
+    cluster = MultiRaftCluster(node_count, 100)
+    cluster.run_until(cluster.all_have_leaders, max_ticks=200)
+    led = sum(1 for g in range(100) if cluster.leader_of(g) == 0)
+    cluster.simulate_partition([0])
+    start_tick = cluster.stats['ticks']
+    cluster.run_until(lambda: all(cluster.leader_of(g) not in (None, 0) for g in range(100)), max_ticks=200)
+    print(f"\n🔀 Host 0 isolated: {led} groups it led failed over in {cluster.stats['ticks'] - start_tick} ticks")
+    cluster.heal_partition()
+    
+    print("\n🎯 Multi-Raft demonstrates:")
+    print("💡 One tick loop drives every group; no per-group timers or threads")
+    print("💡 All groups' traffic to a peer leaves as one envelope per tick")
+    print("💡 Heartbeats packed as (group, term, commit) tuples")
+    print("💡 Envelopes per node stay bounded by peer count as groups grow")
+
+if __name__ == "__main__":
+    demonstrate_multi_raft()
@@ -7,11 +7,14 @@ Implements Multi-Paxos with proposers, acceptors, and learners.
 import time
 import random
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple, Set
 import json
 
+NOOP = "<no-op>"  # Fills slots a new Multi-Paxos leader finds no value for
+
 @dataclass
 class Proposal:
     proposal_id: int
@@ -37,6 +40,12 @@ class PaxosNode:
     # Learner state
     learned_values: Dict[int, str] = field(default_factory=dict)
     
+    # Multi-Paxos: per-slot acceptor and learner state, plus the leader's held ballot
+    accepted_slots: Dict[int, Proposal] = field(default_factory=dict)
+    chosen_log: Dict[int, str] = field(default_factory=dict)
+    leader_ballot: Optional[int] = None
+    next_slot: int = 0
+    
     # Network simulation
     active: bool = True
     message_delay: float = 0.01
@@ -51,8 +60,13 @@ class PaxosCluster:
             'promises': 0,
             'accepts': 0,
             'learns': 0,
-            'rounds': 0
+            'rounds': 0,
+            'messages': 0,
+            'leader_elections': 0,
+            'slots_chosen': 0
         }
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=node_count, thread_name_prefix="paxos-rpc")
     
     def is_partitioned(self, from_node: int, to_node: int) -> bool:
         """Check if nodes are network partitioned"""
@@ -63,6 +77,9 @@ class PaxosCluster:
         if not self.nodes[to_node].active or self.is_partitioned(from_node, to_node):
             return False
         
+        with self._lock:
+            self.stats['messages'] += 1
+        
         # Simulate network delay
         time.sleep(self.message_delay)
         return True
@@ -188,6 +205,124 @@ class PaxosCluster:
             print(f"   ❌ Phase 2 failed: insufficient accepts")
             return False
     
+    # --- Multi-Paxos -------------------------------------------------------
+    
+    def elect_leader(self, proposer_id: int) -> bool:
+        """Multi-Paxos Phase 1: one prepare covers every slot the proposer has not seen chosen"""
+        proposer = self.nodes[proposer_id]
+        ballot = self.generate_proposal_id(proposer_id)
+        proposer.leader_ballot = None
+        majority = len(self.nodes) // 2 + 1
+        self.stats['leader_elections'] += 1
+        self.stats['rounds'] += 1
+        
+        print(f"👑 Node {proposer_id} sending PREPARE({ballot}) for all open slots")
+        
+        def prepare(acceptor: PaxosNode) -> Optional[Dict[int, Proposal]]:
+            if ballot <= acceptor.highest_proposal_seen:
+                return None
+            acceptor.highest_proposal_seen = ballot
+            self.stats['promises'] += 1
+            return {slot: proposal for slot, proposal in acceptor.accepted_slots.items()
+                    if slot not in proposer.chosen_log}
+        
+        replies = self._broadcast(proposer_id, {'type': 'prepare', 'ballot': ballot}, prepare)
+        promises = [accepted for accepted in replies.values() if accepted is not None]
+        print(f"   Promises received: {len(promises)}/{len(self.nodes)} (need {majority})")
+        if len(promises) < majority:
+            print(f"   ❌ Node {proposer_id} could not take leadership")
+            return False
+        
+        # Any slot a promiser accepted may already be chosen: carry its highest-ballot value forward
+        recovered: Dict[int, Proposal] = {}
+        for accepted in promises:
+            for slot, proposal in accepted.items():
+                if slot not in recovered or proposal.proposal_id > recovered[slot].proposal_id:
+                    recovered[slot] = proposal
+        
+        known = set(proposer.chosen_log) | set(recovered)
+        proposer.leader_ballot = ballot
+        proposer.next_slot = max(known) + 1 if known else 0
+        
+        for slot in range(proposer.next_slot):
+            if slot in proposer.chosen_log:
+                continue
+            value = recovered[slot].value if slot in recovered else NOOP
+            if not self._phase2_slot(proposer_id, slot, value):
+                return False
+        
+        print(f"   ✅ Node {proposer_id} leads with ballot {ballot} "
+              f"({len(recovered)} slot(s) recovered, next slot {proposer.next_slot})")
+        return True
+    
+    def propose_multi(self, proposer_id: int, value: str) -> bool:
+        """Choose value in the next slot; Phase 1 only runs when the proposer holds no ballot"""
+        proposer = self.nodes[proposer_id]
+        self.stats['proposals'] += 1
+        
+        if proposer.leader_ballot is None and not self.elect_leader(proposer_id):
+            return False
+        
+        slot = proposer.next_slot
+        proposer.next_slot += 1
+        if self._phase2_slot(proposer_id, slot, value):
+            print(f"   ✅ Slot {slot} chosen: '{value}' (Phase 2 only)")
+            return True
+        
+        print(f"   ❌ Slot {slot} not chosen for '{value}'")
+        return False
+    
+    def _phase2_slot(self, proposer_id: int, slot: int, value: str) -> bool:
+        """Accept round for one slot under the leader's ballot; a rejection means we were preempted"""
+        proposer = self.nodes[proposer_id]
+        ballot = proposer.leader_ballot
+        proposal = Proposal(ballot, value)
+        majority = len(self.nodes) // 2 + 1
+        
+        def accept(acceptor: PaxosNode) -> bool:
+            if ballot < acceptor.highest_proposal_seen:
+                return False
+            acceptor.highest_proposal_seen = ballot
+            acceptor.accepted_slots[slot] = proposal
+            self.stats['accepts'] += 1
+            return True
+        
+        replies = self._broadcast(proposer_id, {
+            'type': 'accept',
+            'ballot': ballot,
+            'slot': slot,
+            'value': value
+        }, accept)
+        
+        if sum(1 for accepted in replies.values() if accepted) >= majority:
+            for learner in self.nodes.values():
+                learner.chosen_log[slot] = value
+                self.stats['learns'] += 1
+            self.stats['slots_chosen'] += 1
+            return True
+        
+        if not all(replies.values()):
+            print(f"   ⚠️  Node {proposer_id} preempted by a higher ballot")
+            proposer.leader_ballot = None
+        return False
+    
+    def _broadcast(self, proposer_id: int, message: dict, handler) -> Dict[int, object]:
+        """Send message to every acceptor in parallel; returns handler results from those reached"""
+        def deliver(acceptor_id: int):
+            # The proposer's own acceptor needs no network hop
+            if acceptor_id != proposer_id and not self.send_message(proposer_id, acceptor_id, message):
+                return acceptor_id, False, None
+            if not self.nodes[acceptor_id].active:
+                return acceptor_id, False, None
+            with self._lock:
+                return acceptor_id, True, handler(self.nodes[acceptor_id])
+        
+        results = {}
+        for acceptor_id, reached, result in self._pool.map(deliver, list(self.nodes)):
+            if reached:
+                results[acceptor_id] = result
+        return results
+    
     def simulate_partition(self, partitioned_nodes: List[int]):
         """Simulate network partition"""
         self.network_partition = set(partitioned_nodes)
@@ -269,6 +404,36 @@ class PaxosCluster:
         print(f"   Accepts: {self.stats['accepts']}")
         print(f"   Learns: {self.stats['learns']}")
 
+def demonstrate_multi_paxos(values: int = 10):
+    """Stable-leader Multi-Paxos against a full two-phase round per value"""
+    print("\n=== Multi-Paxos with a Stable Leader ===")
+    
+    classic = PaxosCluster(node_count=5)
+    for i in range(3):
+        classic.propose_value(0, f"classic_{i}")
+    classic_messages = classic.stats['messages'] / 3
+    
+    cluster = PaxosCluster(node_count=5)
+    for i in range(values):
+        cluster.propose_multi(0, f"cmd_{i}")
+    steady_messages = (cluster.stats['messages'] - (len(cluster.nodes) - 1)) / values
+    
+    # A value only the minority side accepted may have been chosen, so the next leader keeps it
+    cluster.simulate_partition([0, 1])
+    cluster.propose_multi(0, "accepted_by_minority")
+    cluster.heal_partition()
+    
+    # Node 2 takes over through Phase 1, then Node 0 finds itself preempted
+    cluster.propose_multi(2, "after_failover")
+    cluster.propose_multi(0, "stale_leader")
+    cluster.propose_multi(0, "retry_after_preemption")
+    
+    logs = {node_id: [node.chosen_log[s] for s in sorted(node.chosen_log)] for node_id, node in cluster.nodes.items()}
+    print(f"\n📊 Messages per value: classic Paxos {classic_messages:.1f}, "
+          f"Multi-Paxos steady state {steady_messages:.1f}")
+    print(f"   Phase 1 rounds: {cluster.stats['leader_elections']} for {cluster.stats['slots_chosen']} slots chosen")
+    print(f"   All learners agree on {len(logs[0])} slots: {all(log == logs[0] for log in logs.values())}")
+
 def demonstrate_paxos():
     """Demonstrate Paxos consensus algorithm"""
     print("=== Paxos Consensus Algorithm Demonstration ===")
@@ -279,8 +444,11 @@ def demonstrate_paxos():
     # Run simulation
     cluster.run_simulation()
     
+    demonstrate_multi_paxos()
+    
     print("\n🎯 Paxos demonstrates:")
     print("💡 Two-phase protocol: prepare and accept")
+    print("💡 Multi-Paxos: Phase 1 once per leader, Phase 2 per value")
     print("💡 Safety: at most one value chosen per instance")
     print("💡 Liveness: progress despite failures (with majority)")
     print("💡 Theoretical foundation for distributed consensus")
@@ -4,14 +4,28 @@ Raft Consensus Algorithm Simulation
 Implements leader election, log replication, and safety properties.
 """
 
+import os
 import time
 import random
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple
 import json
 
+from raft_wal import WriteAheadLog, WalState
+
+ELECTION_TIMEOUT_RANGE = (0.15, 0.3)  # Randomized election timeout bounds (seconds)
+NOOP_COMMAND = "NOOP"  # Committed by a new leader before it serves reads
+
+def apply_command(state_machine: Dict[str, str], command: str):
+    """Apply one committed "SET key=value" command; anything else is a no-op"""
+    if command.startswith("SET ") and "=" in command:
+        key, value = command[4:].split("=", 1)
+        state_machine[key.strip()] = value.strip()
+
 class NodeState(Enum):
     FOLLOWER = "follower"
     CANDIDATE = "candidate"
@@ -24,16 +38,38 @@ class LogEntry:
     command: str
     committed: bool = False
 
+@dataclass
+class Snapshot:
+    """State machine image covering the log up to last_included_index"""
+    last_included_index: int
+    last_included_term: int
+    data: bytes
+
 @dataclass
 class RaftNode:
     node_id: int
     current_term: int = 0
     voted_for: Optional[int] = None
-    log: List[LogEntry] = field(default_factory=list)
-    commit_index: int = 0
-    last_applied: int = 0
+    log: List[LogEntry] = field(default_factory=list)  # Entries after the snapshot
+    commit_index: int = -1
+    last_applied: int = -1
     state: NodeState = NodeState.FOLLOWER
     
+    # Applied state and compaction
+    state_machine: Dict[str, str] = field(default_factory=dict)
+    snapshot: Optional[Snapshot] = None
+    snapshot_index: int = -1
+    snapshot_term: int = 0
+    incoming_snapshot: bytearray = field(default_factory=bytearray)  # InstallSnapshot chunks so far
+    
+    # Durability
+    wal: Optional[WriteAheadLog] = field(default=None, repr=False)
+    durable_index: int = -1  # Highest own entry known to be on disk
+    
+    # Reads
+    leader_contact: float = 0.0  # When a current leader was last heard from
+    lease_expiry: float = 0.0    # Leader may serve reads locally until then
+    
     # Leader state
     next_index: Dict[int, int] = field(default_factory=dict)
     match_index: Dict[int, int] = field(default_factory=dict)
@@ -49,21 +85,293 @@ class RaftNode:
 
     def reset_election_timeout(self):
         # Randomized timeout between 150-300ms
-        self.election_timeout = random.uniform(0.15, 0.3)
+        self.election_timeout = random.uniform(*ELECTION_TIMEOUT_RANGE)
+    
+    def first_index(self) -> int:
+        """Index of log[0]; everything before it lives in the snapshot"""
+        return self.snapshot_index + 1
+    
+    def last_index(self) -> int:
+        return self.snapshot_index + len(self.log)
+    
+    def entry(self, index: int) -> LogEntry:
+        return self.log[index - self.snapshot_index - 1]
+    
+    def term_at(self, index: int) -> int:
+        if index == self.snapshot_index:
+            return self.snapshot_term
+        return self.entry(index).term
+    
+    def entries_from(self, index: int, count: int) -> List[LogEntry]:
+        start = index - self.snapshot_index - 1
+        return self.log[start:start + count]
+
+class ReplicationPipeline:
+    """Leader-side AppendEntries stream to one follower.
+    
+    Pending entries are cut into batches bounded by entry count and bytes, and
+    up to max_inflight batches are outstanding at once. Batches reach the
+    follower in send order, so each consistency check sees its predecessor;
+    a rejected batch discards the ones behind it and rewinds next_index.
+    A follower that needs entries already compacted away is sent the
+    leader's snapshot in chunks instead.
+    """
+    
+    def __init__(self, cluster: 'RaftCluster', leader_id: int, follower_id: int):
+        self.cluster = cluster
+        self.leader_id = leader_id
+        self.follower_id = follower_id
+        self.term = cluster.nodes[leader_id].current_term
+        self.next_send = cluster.nodes[leader_id].next_index[follower_id]
+        self.inflight = deque()  # (future, last index in batch)
+        self.sent_commit = -1  # Highest leader_commit the follower has been sent
+        self.active = False
+        
+        # In-order delivery of pipelined batches
+        self._order = threading.Condition()
+        self._send_seq = 0
+        self._deliver_seq = 0
+    
+    def run(self):
+        """Keep batches in flight until the follower has the whole log or is unreachable"""
+        cluster = self.cluster
+        leader = cluster.nodes[self.leader_id]
+        
+        while True:
+            snapshot = None
+            with cluster._lock:
+                if self._stale(leader):
+                    self.inflight.clear()  # Deposed: replies no longer matter
+                elif not self.inflight and self.next_send < leader.first_index():
+                    snapshot = leader.snapshot
+                while snapshot is None and self._can_send(leader):
+                    self._send_batch(leader)
+                if snapshot is None and not self.inflight:
+                    self.active = False
+                    cluster._replicated.notify_all()
+                    return
+            
+            if snapshot is not None:
+                response = self._install_snapshot(snapshot)
+                last_index = snapshot.last_included_index
+            else:
+                future, last_index = self.inflight.popleft()
+                response = future.result()
+            
+            if response is None or not response[1]:
+                # Everything behind a failed batch fails its consistency check too
+                for later, _ in self.inflight:
+                    later.result()
+            
+            with cluster._lock:
+                if response is None:
+                    # Unreachable: stop here, the next proposal or heartbeat retries
+                    self.inflight.clear()
+                    self.next_send = leader.next_index[self.follower_id]
+                    self.active = False
+                    cluster._replicated.notify_all()
+                    return
+                
+                follower_term, success = response
+                if follower_term > leader.current_term:
+                    cluster._step_down(leader, follower_term)
+                elif success:
+                    leader.match_index[self.follower_id] = max(leader.match_index[self.follower_id], last_index)
+                    leader.next_index[self.follower_id] = max(leader.next_index[self.follower_id], last_index + 1)
+                    self.next_send = max(self.next_send, last_index + 1)
+                    cluster._advance_commit(leader)
+                else:
+                    # Log mismatch: back up one entry and resend from there
+                    self.inflight.clear()
+                    leader.next_index[self.follower_id] = max(0, leader.next_index[self.follower_id] - 1)
+                    self.next_send = leader.next_index[self.follower_id]
+                cluster._replicated.notify_all()
+    
+    def _stale(self, leader: RaftNode) -> bool:
+        return leader.state != NodeState.LEADER or leader.current_term != self.term
+    
+    def _can_send(self, leader: RaftNode) -> bool:
+        # Once idle, an empty batch still goes out if the follower missed the latest commit index
+        return (not self._stale(leader) and len(self.inflight) < self.cluster.max_inflight
+                and leader.first_index() <= self.next_send
+                and (self.next_send <= leader.last_index() or
+                     (not self.inflight and self.sent_commit < leader.commit_index)))
+    
+    def _send_batch(self, leader: RaftNode):
+        cluster = self.cluster
+        batch = cluster._next_batch(leader, self.next_send)
+        prev_log_index = self.next_send - 1
+        prev_log_term = leader.term_at(prev_log_index)
+        
+        seq = self._send_seq
+        self._send_seq += 1
+        future = cluster._rpc_pool.submit(self._deliver, seq, leader.current_term, prev_log_index,
+                                          prev_log_term, batch, leader.commit_index)
+        self.inflight.append((future, prev_log_index + len(batch)))
+        self.next_send += len(batch)
+        self.sent_commit = leader.commit_index
+        cluster.stats['append_rpcs'] += 1
+        cluster.stats['entries_sent'] += len(batch)
+    
+    def _deliver(self, seq: int, term: int, prev_log_index: int, prev_log_term: int,
+                 entries: List[LogEntry], leader_commit: int) -> Optional[Tuple[int, bool]]:
+        """One AppendEntries round trip; returns (follower term, success) or None if unreachable"""
+        reachable = self.cluster.send_message(self.leader_id, self.follower_id, {
+            'type': 'AppendEntries',
+            'term': term,
+            'leader_id': self.leader_id,
+            'prev_log_index': prev_log_index,
+            'prev_log_term': prev_log_term,
+            'entries': [{'term': e.term, 'command': e.command} for e in entries],
+            'leader_commit': leader_commit
+        })
+        
+        follower = self.cluster.nodes[self.follower_id]
+        with self._order:
+            while self._deliver_seq != seq:
+                self._order.wait()
+            try:
+                if not reachable:
+                    return None
+                with self.cluster._lock:
+                    success = self.cluster._handle_append_entries(
+                        follower, term, prev_log_index, prev_log_term, entries, leader_commit
+                    )
+                    response = follower.current_term, success
+            finally:
+                self._deliver_seq += 1
+                self._order.notify_all()
+        
+        # Reply only once durable; later batches already applied share this fsync
+        self.cluster._sync(follower)
+        return response
+    
+    def _install_snapshot(self, snapshot: Snapshot) -> Optional[Tuple[int, bool]]:
+        """Stream a snapshot chunk by chunk; returns (follower term, success) or None if unreachable"""
+        cluster = self.cluster
+        follower = cluster.nodes[self.follower_id]
+        chunk_size = cluster.snapshot_chunk_bytes
+        data = snapshot.data
+        
+        for offset in range(0, max(len(data), 1), chunk_size):
+            chunk = data[offset:offset + chunk_size]
+            done = offset + chunk_size >= len(data)
+            if not cluster.send_message(self.leader_id, self.follower_id, {
+                'type': 'InstallSnapshot',
+                'term': self.term,
+                'leader_id': self.leader_id,
+                'last_included_index': snapshot.last_included_index,
+                'last_included_term': snapshot.last_included_term,
+                'offset': offset,
+                'data': chunk,
+                'done': done
+            }):
+                return None
+            
+            with cluster._lock:
+                cluster.stats['snapshot_chunks'] += 1
+                accepted = cluster._handle_install_snapshot(follower, self.term, snapshot, offset, chunk, done)
+            cluster._sync(follower)
+            if not accepted:
+                return follower.current_term, False
+        
+        return follower.current_term, True
 
 class RaftCluster:
-    def __init__(self, node_count: int = 5):
+    def __init__(self, node_count: int = 5, data_dir: Optional[str] = None):
         self.nodes = {i: RaftNode(i) for i in range(node_count)}
         self.network_partition = set()
         self.message_delay = 0.01  # 10ms network delay
         self.running = True
+        
+        # Replication pipeline limits
+        self.max_batch_entries = 64
+        self.max_batch_bytes = 64 * 1024
+        self.max_inflight = 4
+        
+        # Log compaction
+        self.snapshot_threshold = 1000  # Applied entries kept in the log before snapshotting
+        self.snapshot_chunk_bytes = 16 * 1024
+        
+        # Reads: ReadIndex by default; leases also make voters refuse to depose a leader they just heard from
+        self.lease_reads = False
+        self.max_clock_drift = 0.1  # Bound on relative clock rate error between nodes
+        
+        self.pipelines: Dict[Tuple[int, int], ReplicationPipeline] = {}
+        self._rpc_pool = ThreadPoolExecutor(max_workers=max(1, node_count - 1) * self.max_inflight,
+                                            thread_name_prefix="raft-rpc")
+        self._lock = threading.RLock()
+        self._replicated = threading.Condition(self._lock)
+        
         self.stats = {
             'elections': 0,
             'log_entries': 0,
             'heartbeats': 0,
-            'leader_changes': 0
+            'leader_changes': 0,
+            'append_rpcs': 0,
+            'entries_sent': 0,
+            'snapshots': 0,
+            'snapshots_installed': 0,
+            'snapshot_chunks': 0,
+            'recovered_entries': 0,
+            'reads': 0,
+            'read_index_rounds': 0,
+            'lease_reads': 0,
+            'reads_rejected': 0
         }
         
+        # Durable state: one write-ahead log per node, replayed on startup
+        self.data_dir = data_dir
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            for node_id, node in self.nodes.items():
+                wal = WriteAheadLog(os.path.join(data_dir, f"raft-node-{node_id}.wal"))
+                self._restore(node, wal.recover())
+                node.wal = wal
+    
+    def _restore(self, node: RaftNode, state: WalState):
+        """Rebuild term, vote, snapshot and log from a recovered WAL"""
+        node.current_term = state.current_term
+        node.voted_for = state.voted_for
+        if state.snapshot_data is not None:
+            node.snapshot = Snapshot(state.snapshot_index, state.snapshot_term, state.snapshot_data)
+            node.snapshot_index, node.snapshot_term = state.snapshot_index, state.snapshot_term
+            node.state_machine = json.loads(state.snapshot_data.decode())
+            node.commit_index = node.last_applied = state.snapshot_index
+        node.log = [LogEntry(term=term, index=index, command=command) for index, term, command in state.entries]
+        node.durable_index = node.last_index()
+        self.stats['recovered_entries'] += len(node.log)
+    
+    def _persist_hard_state(self, node: RaftNode):
+        if node.wal:
+            node.wal.save_hard_state(node.current_term, node.voted_for)
+    
+    def _persist_entries(self, node: RaftNode, entries: List[LogEntry]):
+        if node.wal:
+            for entry in entries:
+                node.wal.append_entry(entry.index, entry.term, entry.command)
+    
+    def _persist_snapshot(self, node: RaftNode):
+        """Rewrite the node's WAL as its snapshot plus the entries that follow"""
+        if node.wal:
+            node.wal.compact(node.snapshot_index, node.snapshot_term, node.snapshot.data,
+                             node.current_term, node.voted_for,
+                             [(e.index, e.term, e.command) for e in node.log])
+    
+    def _sync(self, node: RaftNode):
+        """Group commit: wait until everything the node has logged is on disk"""
+        if node.wal:
+            node.wal.sync()
+    
+    def _durable_index(self, node: RaftNode) -> int:
+        return node.last_index() if node.wal is None else min(node.durable_index, node.last_index())
+    
+    def close(self):
+        """Flush and close every node's WAL"""
+        for node in self.nodes.values():
+            if node.wal:
+                node.wal.close()
+        
     def is_partitioned(self, from_node: int, to_node: int) -> bool:
         """Check if nodes are network partitioned"""
         return (from_node in self.network_partition) != (to_node in self.network_partition)
@@ -97,8 +405,16 @@ class RaftCluster:
                 votes[node_id] = False
                 continue
             
+            # With leases, nobody votes while a leader it recently heard from may still hold one
+            if self.lease_reads and term > node.current_term and (
+                    node.state == NodeState.LEADER or
+                    time.time() - node.leader_contact < ELECTION_TIMEOUT_RANGE[0]):
+                votes[node_id] = False
+                continue
+            
             # Vote decision logic
             vote_granted = False
+            hard_state = (node.current_term, node.voted_for)
             if term > node.current_term:
                 node.current_term = term
                 node.voted_for = None
@@ -108,8 +424,8 @@ class RaftCluster:
                 (node.voted_for is None or node.voted_for == candidate_id)):
                 
                 # Check log up-to-date condition
-                node_last_log_term = node.log[-1].term if node.log else 0
-                node_last_log_index = len(node.log) - 1 if node.log else -1
+                node_last_log_index = node.last_index()
+                node_last_log_term = node.term_at(node_last_log_index)
                 
                 log_ok = (last_log_term > node_last_log_term or 
                          (last_log_term == node_last_log_term and last_log_index >= node_last_log_index))
@@ -119,6 +435,10 @@ class RaftCluster:
                     node.voted_for = candidate_id
                     node.reset_election_timeout()
             
+            # Term and vote must be on disk before the reply leaves
+            if (node.current_term, node.voted_for) != hard_state:
+                self._persist_hard_state(node)
+                self._sync(node)
             votes[node_id] = vote_granted
         
         return votes
@@ -145,34 +465,124 @@ class RaftCluster:
                 responses[node_id] = False
                 continue
             
-            success = False
-            if term >= node.current_term:
-                node.current_term = term
-                node.state = NodeState.FOLLOWER
-                node.voted_for = None
-                node.last_heartbeat = time.time()
-                
-                # Log consistency check
-                if (prev_log_index == -1 or 
-                    (prev_log_index < len(node.log) and 
-                     node.log[prev_log_index].term == prev_log_term)):
-                    
-                    # Append new entries
-                    if entries:
-                        # Remove conflicting entries
-                        node.log = node.log[:prev_log_index + 1]
-                        node.log.extend(entries)
-                    
-                    # Update commit index
-                    if leader_commit > node.commit_index:
-                        node.commit_index = min(leader_commit, len(node.log) - 1)
-                    
-                    success = True
-            
-            responses[node_id] = success
+            with self._lock:
+                responses[node_id] = self._handle_append_entries(
+                    node, term, prev_log_index, prev_log_term, entries, leader_commit
+                )
+            self._sync(node)
         
         return responses
     
+    def _handle_append_entries(self, node: RaftNode, term: int, prev_log_index: int,
+                               prev_log_term: int, entries: List[LogEntry], leader_commit: int) -> bool:
+        """Follower side of AppendEntries"""
+        if not self._accept_leader(node, term):
+            return False
+        
+        # Entries already folded into our snapshot are committed and need no check
+        if prev_log_index < node.snapshot_index:
+            entries = entries[node.snapshot_index - prev_log_index:]
+            prev_log_index, prev_log_term = node.snapshot_index, node.snapshot_term
+        
+        # Log consistency check
+        if not (prev_log_index <= node.last_index() and
+                node.term_at(prev_log_index) == prev_log_term):
+            return False
+        
+        # Skip entries we already hold; truncate only at the first conflict
+        for offset, entry in enumerate(entries):
+            index = prev_log_index + 1 + offset
+            if index <= node.last_index():
+                if node.term_at(index) == entry.term:
+                    continue
+                del node.log[index - node.first_index():]
+                if node.wal:
+                    node.wal.truncate_from(index)
+            node.log.extend(entries[offset:])
+            self._persist_entries(node, entries[offset:])
+            break
+        
+        # Update commit index
+        if leader_commit > node.commit_index:
+            # A stale or reordered append may cover less than we've already committed
+            node.commit_index = max(node.commit_index, min(leader_commit, prev_log_index + len(entries)))
+            self._apply_committed(node)
+        
+        return True
+    
+    def _handle_install_snapshot(self, node: RaftNode, term: int, snapshot: Snapshot,
+                                 offset: int, chunk: bytes, done: bool) -> bool:
+        """Follower side of InstallSnapshot: buffer chunks, then replace state on the last one"""
+        if not self._accept_leader(node, term):
+            return False
+        
+        if offset == 0:
+            node.incoming_snapshot = bytearray()
+        node.incoming_snapshot[offset:] = chunk
+        if not done:
+            return True
+        
+        data = bytes(node.incoming_snapshot)
+        node.incoming_snapshot = bytearray()
+        last_index, last_term = snapshot.last_included_index, snapshot.last_included_term
+        if last_index <= node.snapshot_index:
+            return True  # Already have something at least as recent
+        
+        # Keep any suffix that agrees with the snapshot, otherwise discard the whole log
+        if last_index <= node.last_index() and node.term_at(last_index) == last_term:
+            node.log = node.entries_from(last_index + 1, len(node.log))
+        else:
+            node.log = []
+        
+        node.snapshot = Snapshot(last_index, last_term, data)
+        node.snapshot_index, node.snapshot_term = last_index, last_term
+        node.state_machine = json.loads(data.decode())
+        node.last_applied = last_index
+        node.commit_index = max(node.commit_index, last_index)
+        self._persist_snapshot(node)
+        self.stats['snapshots_installed'] += 1
+        self._apply_committed(node)
+        return True
+    
+    def _accept_leader(self, node: RaftNode, term: int) -> bool:
+        """Common term handling for leader RPCs; False if the sender is stale"""
+        if term < node.current_term:
+            return False
+        
+        if term > node.current_term:
+            node.voted_for = None
+            node.current_term = term
+            self._persist_hard_state(node)
+        node.state = NodeState.FOLLOWER
+        node.last_heartbeat = node.leader_contact = time.time()
+        return True
+    
+    def _apply_committed(self, node: RaftNode):
+        """Apply newly committed entries to the state machine, compacting the log past the threshold"""
+        while node.last_applied < node.commit_index:
+            node.last_applied += 1
+            apply_command(node.state_machine, node.entry(node.last_applied).command)
+        
+        if node.last_applied - node.snapshot_index >= self.snapshot_threshold:
+            self.take_snapshot(node.node_id)
+    
+    def take_snapshot(self, node_id: int) -> Optional[Snapshot]:
+        """Snapshot the state machine at last_applied and drop the log up to it"""
+        node = self.nodes[node_id]
+        with self._lock:
+            index = node.last_applied
+            if index <= node.snapshot_index:
+                return node.snapshot
+            
+            term = node.term_at(index)
+            data = json.dumps(node.state_machine, sort_keys=True).encode()
+            node.log = node.entries_from(index + 1, len(node.log))
+            node.snapshot = Snapshot(index, term, data)
+            node.snapshot_index, node.snapshot_term = index, term
+            self._persist_snapshot(node)
+            self.stats['snapshots'] += 1
+            return node.snapshot
+    
     def start_election(self, node_id: int):
         """Start leader election for a node"""
         node = self.nodes[node_id]
@@ -180,14 +590,16 @@ class RaftCluster:
         node.state = NodeState.CANDIDATE
         node.voted_for = node_id
         node.reset_election_timeout()
+        self._persist_hard_state(node)
+        self._sync(node)
         
         self.stats['elections'] += 1
         
         print(f"🗳️  Node {node_id} starting election for term {node.current_term}")
         
         # Get vote requests
-        last_log_index = len(node.log) - 1 if node.log else -1
-        last_log_term = node.log[-1].term if node.log else 0
+        last_log_index = node.last_index()
+        last_log_term = node.term_at(last_log_index)
         
         votes = self.request_vote(node_id, node.current_term, last_log_index, last_log_term)
         vote_count = sum(1 for granted in votes.values() if granted)
@@ -205,12 +617,14 @@ class RaftCluster:
         """Node becomes leader"""
         node = self.nodes[node_id]
         node.state = NodeState.LEADER
+        node.durable_index = node.last_index()  # Logged and synced while a follower
         
         # Initialize leader state
         for other_id in self.nodes:
             if other_id != node_id:
-                node.next_index[other_id] = len(node.log)
+                node.next_index[other_id] = node.last_index() + 1
                 node.match_index[other_id] = -1
+                self.pipelines[(node_id, other_id)] = ReplicationPipeline(self, node_id, other_id)
         
         self.stats['leader_changes'] += 1
         print(f"👑 Node {node_id} became leader for term {node.current_term}")
@@ -230,8 +644,8 @@ class RaftCluster:
             if follower_id == leader_id:
                 continue
             
-            prev_log_index = leader.next_index.get(follower_id, 0) - 1
-            prev_log_term = leader.log[prev_log_index].term if prev_log_index >= 0 else 0
+            prev_log_index = max(leader.next_index.get(follower_id, 0) - 1, leader.snapshot_index)
+            prev_log_term = leader.term_at(prev_log_index)
             
             # Send empty entries for heartbeat
             responses = self.append_entries(
@@ -246,46 +660,195 @@ class RaftCluster:
             return False
         
         # Create new log entry
-        entry = LogEntry(
-            term=leader.current_term,
-            index=len(leader.log),
-            command=command
-        )
-        leader.log.append(entry)
-        self.stats['log_entries'] += 1
+        with self._lock:
+            entry = LogEntry(
+                term=leader.current_term,
+                index=leader.last_index() + 1,
+                command=command
+            )
+            leader.log.append(entry)
+            self._persist_entries(leader, [entry])
+            self.stats['log_entries'] += 1
         
         print(f"📝 Leader {leader_id} replicating: {command}")
+        self._make_durable(leader, entry.index)
         
-        # Replicate to followers
-        success_count = 1  # Leader counts as success
-        for follower_id in self.nodes:
-            if follower_id == leader_id:
-                continue
-            
-            prev_log_index = leader.next_index.get(follower_id, 0) - 1
-            prev_log_term = leader.log[prev_log_index].term if prev_log_index >= 0 else 0
-            
-            responses = self.append_entries(
-                leader_id, leader.current_term, prev_log_index,
-                prev_log_term, [entry], leader.commit_index
-            )
-            
-            if responses.get(follower_id, False):
-                success_count += 1
-                leader.match_index[follower_id] = entry.index
-                leader.next_index[follower_id] = entry.index + 1
+        # Followers are driven in parallel; return as soon as a majority holds the entry
+        self._wait_for_commit(leader_id, entry)
+        success_count = 1 + sum(1 for match in leader.match_index.values() if match >= entry.index)
         
-        # Check if majority replicated
-        majority = len(self.nodes) // 2 + 1
-        if success_count >= majority:
-            entry.committed = True
-            leader.commit_index = entry.index
+        if entry.committed:
             print(f"   ✅ Entry committed (replicated to {success_count}/{len(self.nodes)} nodes)")
             return True
         else:
             print(f"   ❌ Entry not committed (only {success_count}/{len(self.nodes)} nodes)")
             return False
     
+    def replicate_batch(self, leader_id: int, commands: List[str]) -> int:
+        """Append several commands at once and let the pipelines batch them; returns entries committed"""
+        leader = self.nodes[leader_id]
+        if leader.state != NodeState.LEADER or not commands:
+            return 0
+        
+        with self._lock:
+            first = leader.last_index() + 1
+            entries = [LogEntry(term=leader.current_term, index=first + i, command=command)
+                       for i, command in enumerate(commands)]
+            leader.log.extend(entries)
+            self._persist_entries(leader, entries)
+            self.stats['log_entries'] += len(commands)
+        
+        print(f"📝 Leader {leader_id} replicating {len(commands)} entries")
+        self._make_durable(leader, entries[-1].index)
+        self._wait_for_commit(leader_id, entries[-1])
+        return sum(1 for entry in entries if entry.committed)
+    
+    def _make_durable(self, leader: RaftNode, index: int):
+        """Sync the leader's own WAL; concurrent proposals are coalesced into one fsync"""
+        if leader.wal is None:
+            return
+        leader.wal.sync()
+        with self._lock:
+            leader.durable_index = max(leader.durable_index, index)
+            self._advance_commit(leader)
+            self._replicated.notify_all()
+    
+    def _wait_for_commit(self, leader_id: int, entry: LogEntry):
+        """Start idle follower pipelines and block until entry commits or replication stalls"""
+        leader = self.nodes[leader_id]
+        with self._replicated:
+            for (owner, _), pipeline in self.pipelines.items():
+                if owner == leader_id and not pipeline.active:
+                    pipeline.active = True
+                    threading.Thread(target=pipeline.run, daemon=True).start()
+            
+            while (not entry.committed and leader.state == NodeState.LEADER and
+                   any(p.active for (owner, _), p in self.pipelines.items() if owner == leader_id)):
+                self._replicated.wait(timeout=1.0)
+    
+    def wait_for_followers(self, leader_id: int, timeout: float = 5.0) -> bool:
+        """Block until the leader's pipelines go idle; True if every follower then matches its log"""
+        leader = self.nodes[leader_id]
+        deadline = time.time() + timeout
+        with self._replicated:
+            while any(p.active for (owner, _), p in self.pipelines.items() if owner == leader_id):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._replicated.wait(timeout=remaining)
+            return min(leader.match_index.values()) >= leader.last_index()
+    
+    def read(self, leader_id: int, key: str) -> Tuple[bool, Optional[str]]:
+        """Linearizable read of one key; returns (served, value)"""
+        served, values = self.read_batch(leader_id, [key])
+        return served, values.get(key)
+    
+    def read_batch(self, leader_id: int, keys: List[str]) -> Tuple[bool, Dict[str, Optional[str]]]:
+        """Serve reads from the leader's state machine without appending to the log.
+        
+        ReadIndex: note the commit index, confirm leadership with one heartbeat
+        round, then answer once applied >= that index. With lease_reads the
+        heartbeat round is skipped while the leader's lease is still valid.
+        """
+        leader = self.nodes[leader_id]
+        if leader.state != NodeState.LEADER:
+            self.stats['reads_rejected'] += len(keys)
+            return False, {}
+        
+        # A new leader only knows the commit index once an entry from its own term commits
+        if leader.commit_index < 0 or leader.term_at(leader.commit_index) != leader.current_term:
+            if not self.replicate_log(leader_id, NOOP_COMMAND):
+                self.stats['reads_rejected'] += len(keys)
+                return False, {}
+        
+        with self._lock:
+            read_index = leader.commit_index
+            lease_valid = self.lease_reads and time.time() < leader.lease_expiry
+        
+        if lease_valid:
+            self.stats['lease_reads'] += len(keys)
+        elif not self._confirm_leadership(leader_id):
+            self.stats['reads_rejected'] += len(keys)
+            return False, {}
+        
+        with self._replicated:
+            while leader.last_applied < read_index and leader.state == NodeState.LEADER:
+                self._replicated.wait(timeout=0.1)
+            values = {key: leader.state_machine.get(key) for key in keys}
+        self.stats['reads'] += len(keys)
+        return True, values
+    
+    def _confirm_leadership(self, leader_id: int) -> bool:
+        """One parallel heartbeat round; True if a majority still accepts this leader's term"""
+        leader = self.nodes[leader_id]
+        term = leader.current_term
+        round_start = time.time()
+        
+        def heartbeat(follower_id: int):
+            if not self.send_message(leader_id, follower_id, {
+                'type': 'Heartbeat',
+                'term': term,
+                'leader_id': leader_id
+            }):
+                return None
+            follower = self.nodes[follower_id]
+            with self._lock:
+                accepted = self._accept_leader(follower, term)
+                reply = True if accepted else follower.current_term
+            self._sync(follower)
+            return reply
+        
+        replies = list(self._rpc_pool.map(heartbeat, [f for f in self.nodes if f != leader_id]))
+        
+        with self._lock:
+            self.stats['read_index_rounds'] += 1
+            higher = [reply for reply in replies if reply not in (None, True) and reply > term]
+            if higher:
+                self._step_down(leader, max(higher))
+                return False
+            
+            acks = 1 + sum(1 for reply in replies if reply is True)
+            if acks < len(self.nodes) // 2 + 1 or leader.state != NodeState.LEADER or leader.current_term != term:
+                return False
+            
+            # Followers will not vote for anyone else for a minimum election timeout after the
+            # heartbeat; measured from before it was sent and shrunk by the drift bound
+            leader.lease_expiry = round_start + ELECTION_TIMEOUT_RANGE[0] * (1 - self.max_clock_drift)
+            return True
+    
+    def _next_batch(self, leader: RaftNode, start: int) -> List[LogEntry]:
+        """Entries from start, bounded by max_batch_entries and max_batch_bytes (at least one)"""
+        batch = []
+        size = 0
+        for entry in leader.entries_from(start, self.max_batch_entries):
+            entry_size = len(entry.command.encode()) + 16  # term + index framing
+            if batch and size + entry_size > self.max_batch_bytes:
+                break
+            batch.append(entry)
+            size += entry_size
+        return batch
+    
+    def _advance_commit(self, leader: RaftNode):
+        """Commit the highest index held by a majority, if it is from the current term"""
+        matches = sorted([self._durable_index(leader)] + list(leader.match_index.values()), reverse=True)
+        index = matches[len(self.nodes) // 2]
+        if index <= leader.commit_index or leader.term_at(index) != leader.current_term:
+            return
+        
+        for committed in range(leader.commit_index + 1, index + 1):
+            leader.entry(committed).committed = True
+        leader.commit_index = index
+        self._apply_committed(leader)
+    
+    def _step_down(self, node: RaftNode, term: int):
+        """A higher term was seen in a reply; revert to follower"""
+        node.current_term = term
+        node.state = NodeState.FOLLOWER
+        node.voted_for = None
+        node.last_heartbeat = time.time()
+        self._persist_hard_state(node)
+        print(f"   ⬇️  Node {node.node_id} stepping down (saw term {term})")
+    
     def get_leader(self) -> Optional[int]:
         """Find current leader"""
         for node_id, node in self.nodes.items():
@@ -364,10 +927,13 @@ class RaftCluster:
             status = "👑" if node.state == NodeState.LEADER else "👥"
             print(f"   {status} Node {node_id}: {node.state.value} (term {node.current_term})")
             print(f"      Log entries: {len(node.log)}, Committed: {node.commit_index + 1}")
+            if node.snapshot:
+                print(f"      Snapshot through index {node.snapshot_index} "
+                      f"({len(node.snapshot.data)} bytes, {len(node.state_machine)} keys)")
             if node.log:
-                for i, entry in enumerate(node.log[:3]):  # Show first 3 entries
+                for entry in node.log[:3]:  # Show first 3 entries
                     committed = "✅" if entry.committed else "⏳"
-                    print(f"        {committed} [{i}] {entry.command} (term {entry.term})")
+                    print(f"        {committed} [{entry.index}] {entry.command} (term {entry.term})")
                 if len(node.log) > 3:
                     print(f"        ... and {len(node.log) - 3} more entries")
         
@@ -377,6 +943,87 @@ class RaftCluster:
         print(f"   Log entries: {self.stats['log_entries']}")
         print(f"   Heartbeats: {self.stats['heartbeats']}")
 
+def demonstrate_replication_pipeline(entries: int = 100):
+    """Compare one-entry-per-RPC replication with batched, pipelined AppendEntries"""
+    print("\n=== Pipelined Log Replication ===")
+    commands = [f"SET key{i}={i}" for i in range(entries)]
+    
+    for label, batch_entries, inflight in [("One entry per RPC", 1, 1), ("Batched + pipelined", 16, 4)]:
+        cluster = RaftCluster(node_count=5)
+        cluster.max_batch_entries = batch_entries
+        cluster.max_inflight = inflight
+        cluster.start_election(0)
+        
+        start = time.time()
+        committed = cluster.replicate_batch(0, commands)
+        elapsed = time.time() - start
+        print(f"   {label}: {committed}/{entries} committed in {elapsed * 1000:.0f}ms, "
+              f"{cluster.stats['append_rpcs']} AppendEntries RPCs")
+
+def demonstrate_log_compaction(entries: int = 3000):
+    """Snapshot at a log-size threshold and catch a lagging follower up with InstallSnapshot"""
+    print("\n=== Log Compaction and InstallSnapshot ===")
+    cluster = RaftCluster(node_count=5)
+    cluster.message_delay = 0.002
+    cluster.snapshot_threshold = 500
+    cluster.snapshot_chunk_bytes = 4 * 1024
+    cluster.start_election(0)
+    
+    # Node 4 misses the whole history while the others compact
+    cluster.simulate_partition([4])
+    cluster.replicate_batch(0, [f"SET key{i % 400}={i}" for i in range(entries)])
+    leader, lagging = cluster.nodes[0], cluster.nodes[4]
+    print(f"   Leader log: {len(leader.log)} entries after {cluster.stats['snapshots']} snapshots "
+          f"(snapshot through index {leader.snapshot_index}, {len(leader.snapshot.data)} bytes)")
+    
+    cluster.heal_partition()
+    start = time.time()
+    cluster.replicate_log(0, "SET caught=up")
+    cluster.wait_for_followers(0)
+    elapsed = time.time() - start
+    
+    print(f"   Node 4 caught up to index {lagging.last_index()} in {elapsed * 1000:.0f}ms with "
+          f"{cluster.stats['snapshot_chunks']} snapshot chunks instead of replaying {entries} entries")
+    print(f"   State machines match: {lagging.state_machine == leader.state_machine}, "
+          f"node 4 log holds {len(lagging.log)} entries")
+
+def demonstrate_linearizable_reads(reads: int = 100):
+    """ReadIndex and lease reads served without touching the log"""
+    print("\n=== Linearizable Reads: ReadIndex and Leases ===")
+    
+    for label, lease in [("ReadIndex", False), ("Lease", True)]:
+        cluster = RaftCluster(node_count=5)
+        cluster.lease_reads = lease
+        cluster.start_election(0)
+        cluster.replicate_batch(0, [f"SET key{i}={i}" for i in range(20)])
+        log_size = cluster.nodes[0].last_index()
+        
+        start = time.time()
+        served = sum(1 for i in range(reads) if cluster.read(0, f"key{i % 20}")[0])
+        elapsed = time.time() - start
+        print(f"   {label}: {served}/{reads} reads in {elapsed * 1000:.0f}ms, "
+              f"{cluster.stats['read_index_rounds']} heartbeat rounds, "
+              f"{cluster.stats['lease_reads']} served on lease, "
+              f"log grew by {cluster.nodes[0].last_index() - log_size} entries")
+        
+        if not lease:
+            # Reads queued together share a single confirmation round
+            rounds = cluster.stats['read_index_rounds']
+            start = time.time()
+            served, values = cluster.read_batch(0, [f"key{i % 20}" for i in range(reads)])
+            print(f"   ReadIndex batch: {reads} reads of {len(values)} keys in {(time.time() - start) * 1000:.0f}ms, "
+                  f"{cluster.stats['read_index_rounds'] - rounds} heartbeat round")
+    
+    # An isolated leader can no longer confirm itself; its lease runs out before anyone else can win
+    cluster.simulate_partition([0, 1])
+    cluster.start_election(2)
+    print(f"   Election during lease: {'won' if cluster.nodes[2].state == NodeState.LEADER else 'blocked'}")
+    time.sleep(ELECTION_TIMEOUT_RANGE[0])
+    served, _ = cluster.read(0, "key1")
+    print(f"   Stale leader read after lease expiry: {'served' if served else 'rejected'}")
+    cluster.start_election(2)
+    cluster.heal_partition()
+
 def demonstrate_raft():
     """Demonstrate Raft consensus algorithm"""
     print("=== Raft Consensus Algorithm Demonstration ===")
@@ -387,9 +1034,16 @@ def demonstrate_raft():
     # Run simulation
     cluster.run_simulation(duration=5.0)
     
+    demonstrate_replication_pipeline()
+    demonstrate_log_compaction()
+    demonstrate_linearizable_reads()
+    
     print("\n🎯 Raft demonstrates:")
     print("💡 Leader election with randomized timeouts")
     print("💡 Log replication with majority consensus")
+    print("💡 Batched, pipelined AppendEntries to followers in parallel")
+    print("💡 Snapshots bound the log; InstallSnapshot catches up lagging followers")
+    print("💡 ReadIndex and lease reads skip the write path")
     print("💡 Safety: committed entries never lost")
     print("💡 Partition tolerance: minority cannot make progress")
 
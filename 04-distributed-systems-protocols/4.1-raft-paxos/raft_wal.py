@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Raft Write-Ahead Log
+CRC-framed on-disk records for term, vote and log entries, with crash
+recovery and group commit.
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# Record framing: payload length, CRC32 over type + payload, record type
+RECORD_HEADER = struct.Struct('!IIB')
+
+REC_HARD_STATE = 1  # current_term, voted_for
+REC_ENTRY = 2       # index, term, command
+REC_TRUNCATE = 3    # drop entries from index onwards
+REC_SNAPSHOT = 4    # last included index, term, state machine image
+
+HARD_STATE = struct.Struct('!qq')
+ENTRY_HEADER = struct.Struct('!qq')
+TRUNCATE = struct.Struct('!q')
+SNAPSHOT_HEADER = struct.Struct('!qq')
+
+def encode_record(record_type: int, payload: bytes) -> bytes:
+    body = bytes([record_type]) + payload
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(body), record_type) + payload
+
+@dataclass
+class WalState:
+    """Durable Raft state rebuilt from the log on startup"""
+    current_term: int = 0
+    voted_for: Optional[int] = None
+    snapshot_index: int = -1
+    snapshot_term: int = 0
+    snapshot_data: Optional[bytes] = None
+    entries: List[Tuple[int, int, str]] = field(default_factory=list)  # (index, term, command)
+    records: int = 0
+    torn_bytes: int = 0
+
+class WriteAheadLog:
+    """Append-only record file with group commit.
+    
+    Records are buffered by append and become durable through sync. The
+    first thread to call sync writes everything buffered so far with one
+    write and one fsync; threads that arrive while that fsync is running
+    queue up behind it and are covered by the next one, so a burst of
+    concurrent proposals costs a handful of fsyncs rather than one each.
+    """
+    
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, 'ab')
+        
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._appended = 0  # Records buffered so far
+        self._durable = 0   # Records known to be on disk
+        self._flushing = False
+        
+        self.stats = {
+            'records': 0,
+            'writes': 0,
+            'fsyncs': 0,
+            'bytes': 0,
+            'compactions': 0
+        }
+    
+    # --- Appending --------------------------------------------------------
+    
+    def append(self, record_type: int, payload: bytes) -> int:
+        """Buffer one record; returns its sequence number for sync"""
+        record = encode_record(record_type, payload)
+        with self._cond:
+            self._pending.append(record)
+            self._appended += 1
+            self.stats['records'] += 1
+            return self._appended
+    
+    def save_hard_state(self, term: int, voted_for: Optional[int]) -> int:
+        return self.append(REC_HARD_STATE, HARD_STATE.pack(term, -1 if voted_for is None else voted_for))
+    
+    def append_entry(self, index: int, term: int, command: str) -> int:
+        return self.append(REC_ENTRY, ENTRY_HEADER.pack(index, term) + command.encode('utf-8'))
+    
+    def truncate_from(self, index: int) -> int:
+        return self.append(REC_TRUNCATE, TRUNCATE.pack(index))
+    
+    def sync(self, seq: Optional[int] = None):
+        """Block until record seq (default: everything appended so far) is on disk"""
+        with self._cond:
+            target = self._appended if seq is None else seq
+            while self._durable < target:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                
+                # Become the flusher for everything buffered up to now
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                flushed = self._appended
+                self._cond.release()
+                try:
+                    self._write(batch)
+                finally:
+                    self._cond.acquire()
+                    self._durable = max(self._durable, flushed)
+                    self._flushing = False
+                    self._cond.notify_all()
+    
+    def _write(self, batch: List[bytes]):
+        if not batch:
+            return
+        data = b''.join(batch)
+        self._file.write(data)
+        self._file.flush()
+        self.stats['writes'] += 1
+        self.stats['bytes'] += len(data)
+        if self.fsync:
+            os.fsync(self._file.fileno())
+            self.stats['fsyncs'] += 1
+    
+    # --- Compaction -------------------------------------------------------
+    
+    def compact(self, snapshot_index: int, snapshot_term: int, snapshot_data: bytes,
+                term: int, voted_for: Optional[int], entries: List[Tuple[int, int, str]]):
+        """Rewrite the file as snapshot + hard state + the entries that follow it.
+        
+        The caller passes its complete in-memory state, so anything still
+        buffered is superseded and counts as durable once the new file is in place.
+        """
+        records = [
+            encode_record(REC_SNAPSHOT, SNAPSHOT_HEADER.pack(snapshot_index, snapshot_term) + snapshot_data),
+            encode_record(REC_HARD_STATE, HARD_STATE.pack(term, -1 if voted_for is None else voted_for))
+        ]
+        records.extend(encode_record(REC_ENTRY, ENTRY_HEADER.pack(index, entry_term) + command.encode('utf-8'))
+                       for index, entry_term, command in entries)
+        
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            
+            temp_path = self.path + '.compact'
+            with open(temp_path, 'wb') as f:
+                f.write(b''.join(records))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temp_path, self.path)
+            if self.fsync:
+                self._fsync_directory()
+            self._file = open(self.path, 'ab')
+            
+            self._pending = []
+            self._durable = self._appended
+            self.stats['compactions'] += 1
+            self._cond.notify_all()
+    
+    def _fsync_directory(self):
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    # --- Recovery ---------------------------------------------------------
+    
+    def recover(self) -> WalState:
+        """Replay the file; a torn or corrupt tail is cut off at the last good record"""
+        state = WalState()
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, crc, record_type = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(bytes([record_type]) + payload) != crc:
+                break
+            self._replay(state, record_type, payload)
+            state.records += 1
+            offset = start + length
+        
+        if offset < len(data):
+            state.torn_bytes = len(data) - offset
+            with self._cond:
+                self._file.truncate(offset)
+        return state
+    
+    @staticmethod
+    def _replay(state: WalState, record_type: int, payload: bytes):
+        if record_type == REC_HARD_STATE:
+            term, voted_for = HARD_STATE.unpack(payload)
+            state.current_term = term
+            state.voted_for = None if voted_for < 0 else voted_for
+        elif record_type == REC_ENTRY:
+            index, term = ENTRY_HEADER.unpack_from(payload)
+            command = payload[ENTRY_HEADER.size:].decode('utf-8')
+            WriteAheadLog._drop_from(state, index)
+            state.entries.append((index, term, command))
+        elif record_type == REC_TRUNCATE:
+            WriteAheadLog._drop_from(state, TRUNCATE.unpack(payload)[0])
+        elif record_type == REC_SNAPSHOT:
+            index, term = SNAPSHOT_HEADER.unpack_from(payload)
+            state.snapshot_index, state.snapshot_term = index, term
+            state.snapshot_data = payload[SNAPSHOT_HEADER.size:]
+            state.entries = [e for e in state.entries if e[0] > index]
+    
+    @staticmethod
+    def _drop_from(state: WalState, index: int):
+        while state.entries and state.entries[-1][0] >= index:
+            state.entries.pop()
+    
+    def close(self):
+        self.sync()
+        with self._cond:
+            self._file.close()
+
+def demonstrate_group_commit(records: int = 2048, writers: int = 32):
+    """Compare one fsync per record with concurrent writers sharing fsyncs"""
+    print("=== Raft WAL Group Commit Demonstration ===")
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        # One record, one fsync
+        wal = WriteAheadLog(os.path.join(data_dir, "serial.wal"))
+        start = time.time()
+        for i in range(records):
+            wal.append_entry(i, 1, f"SET key{i}={i}")
+            wal.sync()
+        serial = time.time() - start
+        print(f"💾 Serial:       {records} records, {wal.stats['fsyncs']} fsyncs, "
+              f"{records / serial:,.0f} durable records/s")
+        wal.close()
+        
+        # Concurrent proposers coalesced by sync
+        wal = WriteAheadLog(os.path.join(data_dir, "group.wal"))
+        per_writer = records // writers
+        next_index = [0]
+        index_lock = threading.Lock()
+        
+        def writer():
+            for _ in range(per_writer):
+                # Indexes are assigned in append order, as a leader does under its lock
+                with index_lock:
+                    index = next_index[0]
+                    next_index[0] += 1
+                    seq = wal.append_entry(index, 1, f"SET key{index}={index}")
+                wal.sync(seq)
+        
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        grouped = time.time() - start
+        written = per_writer * writers
+        print(f"💾 Group commit: {written} records, {wal.stats['fsyncs']} fsyncs "
+              f"({written / max(wal.stats['fsyncs'], 1):.1f} records each), "
+              f"{written / grouped:,.0f} durable records/s")
+        wal.close()
+        
+        # A torn final record is dropped on recovery
+        path = os.path.join(data_dir, "group.wal")
+        with open(path, 'ab') as f:
+            f.write(encode_record(REC_ENTRY, ENTRY_HEADER.pack(written, 1) + b"SET torn=1")[:-4])
+        recovered = WriteAheadLog(path)
+        state = recovered.recover()
+        recovered.close()
+        print(f"🔁 Recovery: {len(state.entries)} entries from {state.records} records, "
+              f"{state.torn_bytes} torn bytes discarded")
+    
+    print("\n🎯 Raft WAL demonstrates:")
+    print("💡 Length + CRC32 framing detects torn and corrupt records")
+    print("💡 Term, vote and entries rebuilt from the log on startup")
+    print("💡 Group commit: one write + fsync covers every waiting proposal")
+
+if __name__ == "__main__":
+    demonstrate_group_commit()
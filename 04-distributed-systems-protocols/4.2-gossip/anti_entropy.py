@@ -45,11 +45,205 @@ class StateDiff:
     outdated_entries: List[StateEntry] = field(default_factory=list)
     conflicting_entries: List[Tuple[StateEntry, StateEntry]] = field(default_factory=list)
 
+class MerkleTree:
+    """Merkle tree over hashed key ranges.
+    
+    Keys hash into 2**depth leaf buckets. A leaf digest is the XOR of its
+    entries' digests, so a write updates it in O(1); interior nodes are
+    rehashed lazily, only along the paths of leaves dirtied since the
+    last read. Nodes are stored heap-style: root at 1, children 2i, 2i+1.
+    """
+    
+    DIGEST_SIZE = 16
+    
+    def __init__(self, depth: int = 10):
+        self.depth = depth
+        self.leaf_count = 1 << depth
+        self.leaves: List[int] = [0] * self.leaf_count
+        self.bucket_keys: List[Set[str]] = [set() for _ in range(self.leaf_count)]
+        self.entry_digests: Dict[str, int] = {}
+        self.dirty: Set[int] = set()
+        
+        # Hash the empty tree once; afterwards only dirty paths are rehashed
+        self.nodes: List[bytes] = [b''] * (2 * self.leaf_count)
+        for index in range(self.leaf_count, 2 * self.leaf_count):
+            self.nodes[index] = bytes(self.DIGEST_SIZE)
+        for index in range(self.leaf_count - 1, 0, -1):
+            self.nodes[index] = self._hash_children(index)
+    
+    def bucket(self, key: str) -> int:
+        """Leaf bucket for a key: the top depth bits of its hash"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') >> (64 - self.depth)
+    
+    @classmethod
+    def entry_digest(cls, entry: StateEntry) -> int:
+        # Same fields the state diff compares, so equal digests mean nothing to sync
+        data = f"{entry.key}\0{entry.version}\0{entry.value}".encode('utf-8')
+        return int.from_bytes(hashlib.blake2b(data, digest_size=cls.DIGEST_SIZE).digest(), 'big')
+    
+    def update(self, entry: StateEntry):
+        """Fold a new or replaced entry into its leaf"""
+        digest = self.entry_digest(entry)
+        previous = self.entry_digests.get(entry.key, 0)
+        if digest == previous:
+            return
+        
+        bucket = self.bucket(entry.key)
+        self.leaves[bucket] ^= previous ^ digest
+        self.entry_digests[entry.key] = digest
+        self.bucket_keys[bucket].add(entry.key)
+        self.dirty.add(bucket)
+    
+    def root(self) -> bytes:
+        return self.hashes([1])[0]
+    
+    def hashes(self, indices: List[int]) -> List[bytes]:
+        """Digests of the given tree nodes"""
+        self._rehash()
+        return [self.nodes[index] for index in indices]
+    
+    def is_leaf(self, index: int) -> bool:
+        return index >= self.leaf_count
+    
+    def _hash_children(self, index: int) -> bytes:
+        return hashlib.blake2b(self.nodes[2 * index] + self.nodes[2 * index + 1],
+                               digest_size=self.DIGEST_SIZE).digest()
+    
+    def _rehash(self):
+        if not self.dirty:
+            return
+        
+        level = set()
+        for bucket in self.dirty:
+            index = self.leaf_count + bucket
+            self.nodes[index] = self.leaves[bucket].to_bytes(self.DIGEST_SIZE, 'big')
+            level.add(index >> 1)
+        
+        while level:
+            for index in level:
+                self.nodes[index] = self._hash_children(index)
+            level = {index >> 1 for index in level if index > 1}
+        self.dirty.clear()
+
+class InvertibleBloomFilter:
+    """Invertible Bloom lookup table over 128-bit entry digests.
+    
+    Each digest lands in one cell of each of HASH_COUNT sub-tables; a cell
+    keeps a count, the XOR of its digests and the XOR of their check
+    hashes. Subtracting two replicas' tables cancels every shared entry,
+    and peeling cells that hold exactly one digest lists the differences,
+    so a table sized for d differences reconciles any number of keys.
+    Sub-tables are powers of two, letting the full-size table maintained
+    on every write be folded down to the size a sync needs.
+    """
+    
+    HASH_COUNT = 3
+    CELL_BYTES = 4 + MerkleTree.DIGEST_SIZE + 8  # count, digest sum, check-hash sum
+    
+    def __init__(self, cells_per_table: int = 1024):
+        if cells_per_table & (cells_per_table - 1):
+            raise ValueError("cells_per_table must be a power of two")
+        self.cells_per_table = cells_per_table
+        size = self.HASH_COUNT * cells_per_table
+        self.counts = [0] * size
+        self.digest_sums = [0] * size
+        self.check_sums = [0] * size
+    
+    @staticmethod
+    def check_hash(digest: int) -> int:
+        return int.from_bytes(hashlib.blake2b(digest.to_bytes(MerkleTree.DIGEST_SIZE, 'big'),
+                                              digest_size=8, person=b'iblt-check').digest(), 'big')
+    
+    def _cells(self, digest: int) -> List[int]:
+        # Each sub-table indexes by its own 32-bit slice of the digest
+        mask = self.cells_per_table - 1
+        return [table * self.cells_per_table + ((digest >> (32 * table)) & mask)
+                for table in range(self.HASH_COUNT)]
+    
+    def _toggle(self, digest: int, sign: int):
+        check = self.check_hash(digest)
+        for cell in self._cells(digest):
+            self.counts[cell] += sign
+            self.digest_sums[cell] ^= digest
+            self.check_sums[cell] ^= check
+    
+    def insert(self, digest: int):
+        self._toggle(digest, 1)
+    
+    def remove(self, digest: int):
+        self._toggle(digest, -1)
+    
+    def folded(self, cells_per_table: int) -> 'InvertibleBloomFilter':
+        """The same set in a smaller table: cell i absorbs every cell congruent to it"""
+        if cells_per_table > self.cells_per_table or self.cells_per_table % cells_per_table:
+            raise ValueError(f"Cannot fold {self.cells_per_table} cells into {cells_per_table}")
+        folded = InvertibleBloomFilter(cells_per_table)
+        for table in range(self.HASH_COUNT):
+            source = table * self.cells_per_table
+            target = table * cells_per_table
+            for offset in range(self.cells_per_table):
+                cell = target + (offset & (cells_per_table - 1))
+                folded.counts[cell] += self.counts[source + offset]
+                folded.digest_sums[cell] ^= self.digest_sums[source + offset]
+                folded.check_sums[cell] ^= self.check_sums[source + offset]
+        return folded
+    
+    def subtract(self, other: 'InvertibleBloomFilter') -> 'InvertibleBloomFilter':
+        if other.cells_per_table != self.cells_per_table:
+            raise ValueError("Cannot subtract tables of different sizes")
+        result = InvertibleBloomFilter(self.cells_per_table)
+        result.counts = [a - b for a, b in zip(self.counts, other.counts)]
+        result.digest_sums = [a ^ b for a, b in zip(self.digest_sums, other.digest_sums)]
+        result.check_sums = [a ^ b for a, b in zip(self.check_sums, other.check_sums)]
+        return result
+    
+    def decode(self) -> Optional[Tuple[Set[int], Set[int]]]:
+        """Peel a difference table into (only in self, only in other); None if it is too full"""
+        ours: Set[int] = set()
+        theirs: Set[int] = set()
+        pending = list(range(len(self.counts)))
+        while pending:
+            cell = pending.pop()
+            count = self.counts[cell]
+            if count not in (1, -1):
+                continue
+            digest = self.digest_sums[cell]
+            if self.check_sums[cell] != self.check_hash(digest):
+                continue  # Several digests that happen to net to one
+            (ours if count == 1 else theirs).add(digest)
+            self._toggle(digest, -count)
+            pending.extend(self._cells(digest))
+        
+        if any(self.counts) or any(self.digest_sums):
+            return None
+        return ours, theirs
+    
+    def wire_size(self) -> int:
+        return len(self.counts) * self.CELL_BYTES
+
 class AntiEntropyManager:
-    def __init__(self, node_id: str):
+    def __init__(self, node_id: str, peer_registry: Optional[Dict[str, 'AntiEntropyManager']] = None,
+                 merkle_depth: int = 10, verbose: bool = True, reconciliation: str = "merkle"):
         self.node_id = node_id
         self.state: Dict[str, StateEntry] = {}
         self.version_vector: Dict[str, int] = {}
+        self.merkle = MerkleTree(merkle_depth)
+        self.verbose = verbose
+        
+        # Digest mode: an IBLT over entry digests, kept current on every write
+        if reconciliation not in ("merkle", "sketch"):
+            raise ValueError(f"Unknown reconciliation mode: {reconciliation}")
+        self.reconciliation = reconciliation
+        self.sketch = InvertibleBloomFilter()
+        self.digest_keys: Dict[int, str] = {}
+        self.sketch_min_cells = 8  # Per sub-table; doubled until the difference peels
+        self._lock = threading.RLock()
+        
+        # Peers reachable in-process are reconciled through their Merkle trees;
+        # any other peer id falls back to simulated peer state
+        self.peer_registry = peer_registry if peer_registry is not None else {}
+        self.peer_registry[node_id] = self
         
         # Configuration
         self.sync_interval = 5.0
@@ -69,7 +263,11 @@ class AntiEntropyManager:
             'full_syncs': 0,
             'conflicts_resolved': 0,
             'entries_synchronized': 0,
-            'bytes_transferred': 0
+            'bytes_transferred': 0,
+            'hashes_compared': 0,
+            'leaf_ranges_transferred': 0,
+            'sketches_exchanged': 0,
+            'sketch_decode_failures': 0
         }
     
     def start(self):
@@ -97,8 +295,9 @@ class AntiEntropyManager:
             node_id=self.node_id
         )
         
-        self.state[key] = entry
-        print(f"📝 Put: {key} = {value} (v{current_version})")
+        self._store(entry)
+        if self.verbose:
+            print(f"📝 Put: {key} = {value} (v{current_version})")
         return True
     
     def get(self, key: str) -> Optional[str]:
@@ -121,11 +320,46 @@ class AntiEntropyManager:
                 node_id=self.node_id
             )
             
-            self.state[key] = tombstone
-            print(f"🗑️ Deleted: {key} (tombstone v{current_version})")
+            self._store(tombstone)
+            if self.verbose:
+                print(f"🗑️ Deleted: {key} (tombstone v{current_version})")
             return True
         return False
     
+    def _store(self, entry: StateEntry):
+        """Write an entry and fold it into the Merkle tree"""
+        with self._lock:
+            self.state[entry.key] = entry
+            previous = self.merkle.entry_digests.get(entry.key)
+            self.merkle.update(entry)
+            digest = self.merkle.entry_digests[entry.key]
+            if digest != previous:
+                if previous is not None:
+                    self.sketch.remove(previous)
+                    del self.digest_keys[previous]
+                self.sketch.insert(digest)
+                self.digest_keys[digest] = entry.key
+    
+    def merkle_hashes(self, indices: List[int]) -> List[bytes]:
+        """Serve a peer the digests of the requested tree nodes"""
+        with self._lock:
+            return self.merkle.hashes(indices)
+    
+    def entries_in_buckets(self, buckets: List[int]) -> List[StateEntry]:
+        """Serve a peer every entry in the requested leaf ranges"""
+        with self._lock:
+            return [self.state[key] for bucket in buckets for key in self.merkle.bucket_keys[bucket]]
+    
+    def sketch_of_size(self, cells_per_table: int) -> InvertibleBloomFilter:
+        """Serve a peer our digest sketch folded to the requested size"""
+        with self._lock:
+            return self.sketch.folded(cells_per_table)
+    
+    def entries_for_digests(self, digests: Set[int]) -> List[StateEntry]:
+        """Serve a peer the entries behind digests it found only on our side"""
+        with self._lock:
+            return [self.state[self.digest_keys[digest]] for digest in digests if digest in self.digest_keys]
+    
     def add_sync_peer(self, peer_id: str):
         """Add a peer for synchronization"""
         self.sync_peers.add(peer_id)
@@ -189,12 +423,20 @@ class AntiEntropyManager:
     
     def _sync_with_peer(self, peer_id: str, full_sync: bool = False):
         """Synchronize state with a specific peer"""
-        # Simulate peer communication
-        peer_state = self._simulate_peer_state(peer_id)
-        peer_version_vector = self._simulate_peer_version_vector(peer_id)
-        
-        # Calculate differences
-        diff = self._calculate_state_diff(peer_state, peer_version_vector)
+        peer = self.peer_registry.get(peer_id)
+        if peer is not None and peer is not self:
+            diff = None
+            if self.reconciliation == "sketch":
+                diff = self._sketch_diff(peer)
+            if diff is None:
+                diff = self._merkle_diff(peer)
+        else:
+            # Simulate peer communication
+            peer_state = self._simulate_peer_state(peer_id)
+            peer_version_vector = self._simulate_peer_version_vector(peer_id)
+            
+            # Calculate differences
+            diff = self._calculate_state_diff(peer_state, peer_version_vector)
         
         if diff.missing_entries or diff.outdated_entries or diff.conflicting_entries:
             self.sync_state = SyncState.SYNCING
@@ -205,9 +447,77 @@ class AntiEntropyManager:
         entries_synced = len(diff.missing_entries) + len(diff.outdated_entries)
         self.stats['entries_synchronized'] += entries_synced
         
-        if entries_synced > 0:
+        if entries_synced > 0 and self.verbose:
             print(f"🔄 Synced {entries_synced} entries with {peer_id}")
     
+    def _merkle_diff(self, peer: 'AntiEntropyManager') -> StateDiff:
+        """Walk both Merkle trees top-down and pull only the differing leaf ranges.
+        
+        Each round trip compares one level, descending only under nodes whose
+        digests differ, so the cost tracks divergence rather than keyspace.
+        """
+        if peer.merkle.depth != self.merkle.depth:
+            raise ValueError(f"Merkle depth mismatch with {peer.node_id}")
+        
+        frontier = [1]
+        differing_buckets = []
+        while frontier:
+            theirs = peer.merkle_hashes(frontier)
+            ours = self.merkle_hashes(frontier)
+            self.stats['hashes_compared'] += len(frontier)
+            self.stats['bytes_transferred'] += len(frontier) * (4 + MerkleTree.DIGEST_SIZE)
+            
+            next_frontier = []
+            for index, our_hash, their_hash in zip(frontier, ours, theirs):
+                if our_hash == their_hash:
+                    continue
+                if self.merkle.is_leaf(index):
+                    differing_buckets.append(index - self.merkle.leaf_count)
+                else:
+                    next_frontier.extend((2 * index, 2 * index + 1))
+            frontier = next_frontier
+        
+        if not differing_buckets:
+            return StateDiff()
+        
+        peer_entries = peer.entries_in_buckets(differing_buckets)
+        self.stats['leaf_ranges_transferred'] += len(differing_buckets)
+        self.stats['bytes_transferred'] += sum(len(json.dumps(entry.to_dict())) for entry in peer_entries)
+        
+        with self._lock:
+            return self._calculate_state_diff({entry.key: entry for entry in peer_entries}, {})
+    
+    def _sketch_diff(self, peer: 'AntiEntropyManager') -> Optional[StateDiff]:
+        """Reconcile through IBLT sketches; None if the replicas differ too much to peel.
+        
+        The sketch starts small and doubles on each failed peel, so the
+        bytes exchanged stay proportional to the number of differences.
+        """
+        cells = self.sketch_min_cells
+        while cells <= self.sketch.cells_per_table:
+            theirs = peer.sketch_of_size(cells)
+            self.stats['sketches_exchanged'] += 1
+            self.stats['bytes_transferred'] += 4 + theirs.wire_size()
+            with self._lock:
+                decoded = theirs.subtract(self.sketch.folded(cells)).decode()
+            if decoded is not None:
+                break
+            self.stats['sketch_decode_failures'] += 1
+            cells *= 2
+        else:
+            return None  # Too divergent for the largest sketch; walk the Merkle tree instead
+        
+        only_theirs, _ = decoded
+        if not only_theirs:
+            return StateDiff()
+        
+        peer_entries = peer.entries_for_digests(only_theirs)
+        self.stats['bytes_transferred'] += len(only_theirs) * MerkleTree.DIGEST_SIZE
+        self.stats['bytes_transferred'] += sum(len(json.dumps(entry.to_dict())) for entry in peer_entries)
+        
+        with self._lock:
+            return self._calculate_state_diff({entry.key: entry for entry in peer_entries}, {})
+    
     def _simulate_peer_state(self, peer_id: str) -> Dict[str, StateEntry]:
         """Simulate getting state from a peer"""
         # In real implementation, this would be network communication
@@ -285,22 +595,25 @@ class AntiEntropyManager:
         """Apply state differences from peer"""
         # Apply missing entries
         for entry in diff.missing_entries:
-            self.state[entry.key] = entry
+            self._store(entry)
             self._update_version_vector(entry.node_id, entry.version)
-            print(f"📥 Received missing entry: {entry.key} = {entry.value}")
+            if self.verbose:
+                print(f"📥 Received missing entry: {entry.key} = {entry.value}")
         
         # Apply outdated entries (peer has newer version)
         for entry in diff.outdated_entries:
-            self.state[entry.key] = entry
+            self._store(entry)
             self._update_version_vector(entry.node_id, entry.version)
-            print(f"🔄 Updated entry: {entry.key} = {entry.value} (v{entry.version})")
+            if self.verbose:
+                print(f"🔄 Updated entry: {entry.key} = {entry.value} (v{entry.version})")
         
         # Resolve conflicts
         for local_entry, peer_entry in diff.conflicting_entries:
             resolved_entry = self._resolve_conflict(local_entry, peer_entry)
-            self.state[resolved_entry.key] = resolved_entry
+            self._store(resolved_entry)
             self.stats['conflicts_resolved'] += 1
-            print(f"⚖️ Resolved conflict for {resolved_entry.key}: chose {resolved_entry.value}")
+            if self.verbose:
+                print(f"⚖️ Resolved conflict for {resolved_entry.key}: chose {resolved_entry.value}")
     
     def _resolve_conflict(self, local_entry: StateEntry, peer_entry: StateEntry) -> StateEntry:
         """Resolve conflicts between local and peer entries"""
@@ -364,10 +677,11 @@ def demonstrate_anti_entropy():
     """Demonstrate anti-entropy mechanisms"""
     print("=== Anti-Entropy Mechanisms Demonstration ===")
     
-    # Create multiple nodes
+    # Create multiple nodes sharing an in-process peer registry
+    registry: Dict[str, AntiEntropyManager] = {}
     nodes = []
     for i in range(4):
-        node = AntiEntropyManager(f"node_{i}")
+        node = AntiEntropyManager(f"node_{i}", peer_registry=registry)
         nodes.append(node)
     
     try:
@@ -450,11 +764,59 @@ def demonstrate_anti_entropy():
             except:
                 pass
     
+    demonstrate_merkle_sync()
+    
     print("\n🎯 Anti-entropy demonstrates:")
     print("💡 Automatic state synchronization across nodes")
     print("💡 Conflict detection and resolution")
     print("💡 Partition tolerance and recovery")
     print("💡 Version vector-based consistency")
+    print("💡 Merkle-tree reconciliation proportional to divergence")
+    print("💡 IBLT digest sketches: bandwidth proportional to the number of differences")
+
+def demonstrate_merkle_sync(key_count: int = 20000, divergent_keys: int = 5):
+    """Compare Merkle reconciliation with a full key/version exchange"""
+    print(f"\n🌳 Merkle sync of two {key_count:,}-key replicas differing in {divergent_keys} keys...")
+    
+    registry: Dict[str, AntiEntropyManager] = {}
+    replica_a = AntiEntropyManager("replica_a", peer_registry=registry, verbose=False)
+    replica_b = AntiEntropyManager("replica_b", peer_registry=registry, verbose=False)
+    for i in range(key_count):
+        replica_a.put(f"key_{i:05d}", f"value_{i}")
+    for entry in replica_a.state.values():
+        replica_b._store(entry)
+    
+    for i in random.sample(range(key_count), divergent_keys):
+        replica_a.put(f"key_{i:05d}", f"updated_{i}")
+    
+    full_exchange = sum(len(json.dumps(entry.to_dict())) for entry in replica_a.state.values())
+    start = time.perf_counter()
+    replica_b._sync_with_peer("replica_a")
+    elapsed = time.perf_counter() - start
+    
+    stats = replica_b.stats
+    print(f"   {stats['hashes_compared']} digests compared, {stats['leaf_ranges_transferred']} leaf ranges pulled, "
+          f"{stats['entries_synchronized']} entries updated in {elapsed * 1000:.1f}ms")
+    print(f"   {stats['bytes_transferred']:,} bytes vs {full_exchange:,} for a full exchange")
+    print(f"   Roots match: {replica_a.merkle.root() == replica_b.merkle.root()}")
+    
+    # Same divergence reconciled through IBLT digest sketches
+    replica_c = AntiEntropyManager("replica_c", peer_registry=registry, verbose=False, reconciliation="sketch")
+    for entry in replica_b.state.values():
+        replica_c._store(entry)
+    for i in random.sample(range(key_count), divergent_keys):
+        replica_a.put(f"key_{i:05d}", f"resynced_{i}")
+    
+    start = time.perf_counter()
+    replica_c._sync_with_peer("replica_a")
+    elapsed = time.perf_counter() - start
+    
+    stats = replica_c.stats
+    print(f"🧮 IBLT sketch sync of the same replicas with {divergent_keys} new differences...")
+    print(f"   {stats['sketches_exchanged']} sketch(es) exchanged ({stats['sketch_decode_failures']} too small), "
+          f"{stats['entries_synchronized']} entries updated in {elapsed * 1000:.1f}ms")
+    print(f"   {stats['bytes_transferred']:,} bytes vs {full_exchange:,} for a full exchange")
+    print(f"   Roots match: {replica_a.merkle.root() == replica_c.merkle.root()}")
 
 if __name__ == "__main__":
     demonstrate_anti_entropy()
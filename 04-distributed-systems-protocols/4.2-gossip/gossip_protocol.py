@@ -13,12 +13,138 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Set, Optional, Tuple
 import json
 import hashlib
+import math
+import struct
+import zlib
 
 class NodeState(Enum):
     ALIVE = "alive"
     SUSPICIOUS = "suspicious"
     DEAD = "dead"
 
+# At equal incarnation a worse state overrides a better one
+STATE_PRECEDENCE = {NodeState.ALIVE: 0, NodeState.SUSPICIOUS: 1, NodeState.DEAD: 2}
+
+# Binary wire format: header, type-specific varint fields, interned string
+# table (sender first), then entries that refer to strings by index
+WIRE_MAGIC = 0x47
+WIRE_VERSION = 1
+WIRE_HEADER = struct.Struct('!BBBBd')  # magic, version, message type, flags, timestamp
+WIRE_TYPES = ["join", "gossip", "gossip_ack", "state_change", "ping", "ack"]
+WIRE_FIELDS = {"gossip": ('seq', 'base', 'incarnation'), "gossip_ack": ('ack',)}
+WIRE_STATES = [NodeState.ALIVE, NodeState.SUSPICIOUS, NodeState.DEAD]
+FLAG_FULL = 0x01
+ENTRY_MEMBER, ENTRY_STATE, ENTRY_STATE_ZLIB = 0, 1, 2
+COMPRESS_MIN_BYTES = 64  # State values at least this large are tried with zlib
+MAX_VARINT_BYTES = 10
+
+def encode_varint(value: int, out: bytearray):
+    """Append an unsigned LEB128 varint"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    """Read a varint at pos; returns (value, next position)"""
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+class GossipEncoder:
+    """Packs membership and state entries into one datagram of at most budget bytes.
+    
+    Entries are added one at a time and refused once the next would not
+    fit, so callers add them in priority order. Node ids, addresses and
+    state keys are interned, so each is sent once however many entries
+    refer to it.
+    """
+    
+    def __init__(self, message_type: str, sender_id: str, budget: Optional[int] = None,
+                 now: Optional[float] = None):
+        self.message_type = message_type
+        self.budget = budget
+        self.strings: Dict[str, int] = {}
+        self.string_table = bytearray()
+        self.entries = bytearray()
+        self.keys: Set[str] = set()
+        self.now = time.time() if now is None else now
+        self._intern(sender_id)
+        # Header, varint fields and the two table counts at their widest
+        self.overhead = WIRE_HEADER.size + MAX_VARINT_BYTES * (len(WIRE_FIELDS.get(message_type, ())) + 2)
+    
+    def __contains__(self, entry_key: str) -> bool:
+        return entry_key in self.keys
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def size(self) -> int:
+        return self.overhead + len(self.string_table) + len(self.entries)
+    
+    def _intern(self, text: str) -> int:
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+            raw = text.encode('utf-8')
+            encode_varint(len(raw), self.string_table)
+            self.string_table += raw
+        return index
+    
+    def add(self, entry_key: str, payload: Dict) -> bool:
+        """Append an entry; False (and nothing added) if it would overflow the budget"""
+        string_count, table_size, entries_size = len(self.strings), len(self.string_table), len(self.entries)
+        
+        out = self.entries
+        kind, _, name = entry_key.partition(':')
+        if kind == 'member':
+            out.append(ENTRY_MEMBER)
+            encode_varint(self._intern(name), out)
+            encode_varint(self._intern(payload['address']), out)
+            out += struct.pack('!HB', payload['port'], WIRE_STATES.index(NodeState(payload['state'])))
+            encode_varint(payload['incarnation'], out)
+            encode_varint(max(0, int((self.now - payload['last_seen']) * 1000)), out)  # Age in ms
+        else:
+            value = json.dumps(payload['value']).encode('utf-8')
+            entry_type = ENTRY_STATE
+            if len(value) >= COMPRESS_MIN_BYTES:
+                packed = zlib.compress(value)
+                if len(packed) < len(value):
+                    value, entry_type = packed, ENTRY_STATE_ZLIB
+            out.append(entry_type)
+            encode_varint(self._intern(payload['owner']), out)
+            encode_varint(self._intern(payload['key']), out)
+            encode_varint(payload['version'], out)
+            encode_varint(len(value), out)
+            out += value
+        
+        if self.budget is not None and self.size() > self.budget and self.keys:
+            # Roll back, including any strings this entry interned
+            for text in list(self.strings)[string_count:]:
+                del self.strings[text]
+            del self.string_table[table_size:]
+            del self.entries[entries_size:]
+            return False
+        
+        self.keys.add(entry_key)
+        return True
+    
+    def finish(self, full: bool = False, timestamp: Optional[float] = None, **fields) -> bytes:
+        out = bytearray(WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, WIRE_TYPES.index(self.message_type),
+                                         FLAG_FULL if full else 0, self.now if timestamp is None else timestamp))
+        for name in WIRE_FIELDS.get(self.message_type, ()):
+            encode_varint(fields[name], out)
+        encode_varint(len(self.strings), out)
+        out += self.string_table
+        encode_varint(len(self.keys), out)
+        out += self.entries
+        return bytes(out)
+
 @dataclass
 class GossipMessage:
     message_type: str
@@ -26,6 +152,79 @@ class GossipMessage:
     data: Dict
     timestamp: float = field(default_factory=time.time)
     
+    def to_bytes(self) -> bytes:
+        """Binary encoding; entry-carrying messages use the interned entry format"""
+        encoder = GossipEncoder(self.message_type, self.sender_id)
+        if self.message_type in WIRE_FIELDS:
+            for entry_key, payload in self.data.get('entries', {}).items():
+                encoder.add(entry_key, payload)
+            fields = {name: self.data.get(name, 0) for name in WIRE_FIELDS[self.message_type]}
+            return encoder.finish(full=self.data.get('full', False), timestamp=self.timestamp, **fields)
+        
+        # Control messages are small and rare: their data rides as one JSON string entry
+        encoder._intern(json.dumps(self.data))
+        return encoder.finish(timestamp=self.timestamp)
+    
+    @classmethod
+    def from_bytes(cls, buf: bytes, now: Optional[float] = None) -> 'GossipMessage':
+        magic, version, type_index, flags, timestamp = WIRE_HEADER.unpack_from(buf)
+        if magic != WIRE_MAGIC or version != WIRE_VERSION:
+            raise ValueError(f"Not a gossip datagram (magic {magic:#x}, version {version})")
+        message_type = WIRE_TYPES[type_index]
+        pos = WIRE_HEADER.size
+        
+        data: Dict = {}
+        for name in WIRE_FIELDS.get(message_type, ()):
+            data[name], pos = decode_varint(buf, pos)
+        
+        count, pos = decode_varint(buf, pos)
+        strings = []
+        for _ in range(count):
+            length, pos = decode_varint(buf, pos)
+            strings.append(buf[pos:pos + length].decode('utf-8'))
+            pos += length
+        
+        if message_type not in WIRE_FIELDS:
+            return cls(message_type, strings[0], json.loads(strings[1]), timestamp)
+        
+        data['full'] = bool(flags & FLAG_FULL)
+        data['entries'] = entries = {}
+        now = time.time() if now is None else now
+        count, pos = decode_varint(buf, pos)
+        for _ in range(count):
+            kind = buf[pos]
+            pos += 1
+            if kind == ENTRY_MEMBER:
+                node, pos = decode_varint(buf, pos)
+                address, pos = decode_varint(buf, pos)
+                port, state = struct.unpack_from('!HB', buf, pos)
+                incarnation, pos = decode_varint(buf, pos + 3)
+                age_ms, pos = decode_varint(buf, pos)
+                entries[f"member:{strings[node]}"] = {
+                    'address': strings[address],
+                    'port': port,
+                    'state': WIRE_STATES[state].value,
+                    'incarnation': incarnation,
+                    'last_seen': now - age_ms / 1000
+                }
+            else:
+                owner, pos = decode_varint(buf, pos)
+                key, pos = decode_varint(buf, pos)
+                version, pos = decode_varint(buf, pos)
+                length, pos = decode_varint(buf, pos)
+                value = buf[pos:pos + length]
+                pos += length
+                if kind == ENTRY_STATE_ZLIB:
+                    value = zlib.decompress(value)
+                entries[f"state:{strings[owner]}:{strings[key]}"] = {
+                    'owner': strings[owner],
+                    'key': strings[key],
+                    'value': json.loads(value),
+                    'version': version
+                }
+        
+        return cls(message_type, strings[0], data, timestamp)
+    
     def to_json(self) -> str:
         return json.dumps({
             'type': self.message_type,
@@ -66,19 +265,40 @@ class GossipNode:
     suspicion_timeout: float = 5.0
     failure_timeout: float = 10.0
     
+    # Delta dissemination
+    delta_limit: int = 64  # A peer missing more changed entries than this gets a full sync
+    retransmit_multiplier: int = 2  # Recent updates ride on ~multiplier * log2(N) messages
+    piggyback_limit: int = 16  # Recent updates added to any one message
+    max_datagram_size: int = 1400  # Stay under a typical Ethernet MTU
+    
     # State
     members: Dict[str, NodeInfo] = field(default_factory=dict)
     local_state: Dict[str, any] = field(default_factory=dict)
     incarnation: int = 0
     running: bool = False
     
+    # Every membership or state entry change is stamped from node_version;
+    # entry_versions is kept in stamp order so deltas read newest-first
+    node_version: int = 0
+    entry_versions: Dict[str, int] = field(default_factory=dict)
+    state_entries: Dict[str, Dict] = field(default_factory=dict)  # "state:<owner>:<key>" -> entry
+    peer_acked: Dict[str, int] = field(default_factory=dict)  # Peer -> highest of our stamps it confirmed
+    peer_received: Dict[str, int] = field(default_factory=dict)  # Peer -> highest of its stamps we applied
+    syncing_peers: Set[str] = field(default_factory=set)  # Peers partway through a multi-datagram full sync
+    recent_updates: Dict[str, int] = field(default_factory=dict)  # Entry key -> times piggybacked
+    
     # Statistics
     stats: Dict[str, int] = field(default_factory=lambda: {
         'messages_sent': 0,
         'messages_received': 0,
         'failures_detected': 0,
         'recoveries_detected': 0,
-        'gossip_rounds': 0
+        'gossip_rounds': 0,
+        'bytes_sent': 0,
+        'deltas_sent': 0,
+        'full_syncs_sent': 0,
+        'entries_sent': 0,
+        'entries_deferred': 0
     })
     
     def __post_init__(self):
@@ -90,6 +310,14 @@ class GossipNode:
             state=NodeState.ALIVE,
             incarnation=self.incarnation
         )
+        self.touch(f"member:{self.node_id}")
+    
+    def touch(self, entry_key: str):
+        """Stamp an entry as changed and queue it for piggybacking"""
+        self.node_version += 1
+        self.entry_versions.pop(entry_key, None)
+        self.entry_versions[entry_key] = self.node_version
+        self.recent_updates[entry_key] = 0
 
 class GossipProtocol:
     def __init__(self, node: GossipNode):
@@ -97,6 +325,8 @@ class GossipProtocol:
         self.socket = None
         self.gossip_thread = None
         self.failure_detector_thread = None
+        self._lock = threading.RLock()
+        self.clock = time.time  # Swapped for a virtual clock under simulation
         
     def start(self):
         """Start the gossip protocol"""
@@ -143,62 +373,185 @@ class GossipProtocol:
     
     def update_local_state(self, key: str, value: any):
         """Update local state and trigger gossip"""
-        self.node.local_state[key] = value
-        self.node.incarnation += 1
+        with self._lock:
+            self.node.local_state[key] = value
+            self.node.incarnation += 1
+            entry_key = f"state:{self.node.node_id}:{key}"
+            self.node.state_entries[entry_key] = {
+                'owner': self.node.node_id,
+                'key': key,
+                'value': value,
+                'version': self.node.incarnation
+            }
+            self.node.touch(entry_key)
         print(f"📝 Updated local state: {key} = {value}")
     
+    def get_cluster_data(self) -> Dict[str, Dict[str, any]]:
+        """State learned from every node, keyed by owner"""
+        cluster: Dict[str, Dict[str, any]] = {}
+        for entry in self.node.state_entries.values():
+            cluster.setdefault(entry['owner'], {})[entry['key']] = entry['value']
+        return cluster
+    
     def _gossip_loop(self):
         """Main gossip loop"""
         while self.node.running:
             try:
                 self._perform_gossip_round()
-                self._listen_for_messages()
-                time.sleep(self.node.gossip_interval)
+                self._listen_for_messages(time.time() + self.node.gossip_interval)
             except Exception as e:
                 print(f"❌ Gossip loop error: {e}")
     
     def _perform_gossip_round(self):
         """Perform one round of gossip"""
-        if len(self.node.members) <= 1:
-            return
+        with self._lock:
+            if len(self.node.members) <= 1:
+                return
+            
+            # Select random peers for gossip
+            alive_members = [m for m in self.node.members.values() 
+                            if m.state == NodeState.ALIVE and m.node_id != self.node.node_id]
+            
+            if not alive_members:
+                return
+            
+            gossip_targets = random.sample(alive_members, 
+                                         min(self.node.fanout, len(alive_members)))
+            
+            # Each target gets only what it has not confirmed yet
+            for target in gossip_targets:
+                self._send_gossip(target)
+            
+            self.node.stats['gossip_rounds'] += 1
+    
+    def _send_gossip(self, target: NodeInfo):
+        """Send target as much of its delta as fits in one datagram"""
+        entries, full, base = self._delta_for(target.node_id)
+        encoder = GossipEncoder("gossip", self.node.node_id, self.node.max_datagram_size, self.clock())
+        self._piggyback(encoder)
         
-        # Select random peers for gossip
-        alive_members = [m for m in self.node.members.values() 
-                        if m.state == NodeState.ALIVE and m.node_id != self.node.node_id]
+        # The delta goes oldest stamp first, so whatever fits is a contiguous
+        # prefix and seq can claim exactly the stamps delivered
+        seq = self.node.node_version
+        for entry_key, payload in entries.items():
+            if entry_key not in encoder and not encoder.add(entry_key, payload):
+                seq = self.node.entry_versions[entry_key] - 1
+                self.node.stats['entries_deferred'] += 1
+                break
         
-        if not alive_members:
-            return
+        # A full sync that overflows the datagram carries on as deltas from
+        # whatever prefix the peer acks, rather than restarting from stamp 0
+        if seq < self.node.node_version:
+            if full:
+                self.node.syncing_peers.add(target.node_id)
+        else:
+            self.node.syncing_peers.discard(target.node_id)
         
-        gossip_targets = random.sample(alive_members, 
-                                     min(self.node.fanout, len(alive_members)))
+        payload = encoder.finish(full=full, seq=seq, base=base, incarnation=self.node.incarnation)
+        self._send_payload((target.address, target.port), payload)
         
-        # Create gossip message with membership and state info
-        gossip_data = {
-            'members': {
-                node_id: {
-                    'address': info.address,
-                    'port': info.port,
-                    'state': info.state.value,
-                    'incarnation': info.incarnation,
-                    'last_seen': info.last_seen
-                }
-                for node_id, info in self.node.members.items()
-            },
-            'local_state': self.node.local_state,
-            'incarnation': self.node.incarnation
-        }
+        self.node.stats['full_syncs_sent' if full else 'deltas_sent'] += 1
+        self.node.stats['entries_sent'] += len(encoder)
+    
+    def _delta_for(self, peer_id: str) -> Tuple[Dict[str, Dict], bool, int]:
+        """Entries changed since peer's acked stamp (oldest first), or everything if it is too far behind"""
+        acked = self.node.peer_acked.get(peer_id)
+        if acked is not None:
+            # Resuming a full sync: the rest of it is exactly the entries past acked
+            resuming = peer_id in self.node.syncing_peers
+            changed = []
+            for entry_key in reversed(self.node.entry_versions):
+                if self.node.entry_versions[entry_key] <= acked:
+                    break
+                changed.append(entry_key)
+                if not resuming and len(changed) > self.node.delta_limit:
+                    break
+            if resuming or len(changed) <= self.node.delta_limit:
+                return {key: self._entry_payload(key) for key in reversed(changed)}, False, acked
         
-        gossip_msg = GossipMessage(
-            message_type="gossip",
-            sender_id=self.node.node_id,
-            data=gossip_data
-        )
+        return {key: self._entry_payload(key) for key in self.node.entry_versions}, True, 0
+    
+    def _entry_payload(self, entry_key: str) -> Dict:
+        kind, _, name = entry_key.partition(':')
+        if kind == 'member':
+            info = self.node.members[name]
+            return {
+                'address': info.address,
+                'port': info.port,
+                'state': info.state.value,
+                'incarnation': info.incarnation,
+                'last_seen': info.last_seen
+            }
+        return self.node.state_entries[entry_key]
+    
+    def _retransmit_limit(self) -> int:
+        return max(1, math.ceil(self.node.retransmit_multiplier * math.log2(len(self.node.members) + 1)))
+    
+    def _piggyback(self, encoder: GossipEncoder):
+        """Pack the least-disseminated recent updates that fit; retire them after ~log(N) sends"""
+        recent = self.node.recent_updates
+        if not recent:
+            return
         
-        # Send to selected targets
-        for target in gossip_targets:
-            self._send_message(target.address, target.port, gossip_msg)
+        limit = self._retransmit_limit()
+        for entry_key in sorted(recent, key=recent.get)[:self.node.piggyback_limit]:
+            if entry_key not in encoder and not encoder.add(entry_key, self._entry_payload(entry_key)):
+                break
+            recent[entry_key] += 1
+            if recent[entry_key] >= limit:
+                del recent[entry_key]
+    
+    def _merge_entries(self, entries: Dict[str, Dict]) -> int:
+        """Apply newer entries from a peer; returns how many changed"""
+        changed = 0
+        for entry_key, payload in entries.items():
+            kind, _, name = entry_key.partition(':')
+            if kind == 'member':
+                changed += self._merge_member(name, payload)
+            elif kind == 'state':
+                current = self.node.state_entries.get(entry_key)
+                if current is None or payload['version'] > current['version']:
+                    self.node.state_entries[entry_key] = payload
+                    self.node.touch(entry_key)
+                    changed += 1
+        return changed
+    
+    def _merge_member(self, node_id: str, payload: Dict) -> int:
+        state = NodeState(payload['state'])
+        incarnation = payload['incarnation']
+        
+        if node_id == self.node.node_id:
+            # Refute suspicion of ourselves by outbidding its incarnation
+            if state != NodeState.ALIVE and incarnation >= self.node.incarnation:
+                self.node.incarnation = incarnation + 1
+                self.node.members[node_id].incarnation = self.node.incarnation
+                self.node.touch(f"member:{node_id}")
+            return 0
         
-        self.node.stats['gossip_rounds'] += 1
+        existing = self.node.members.get(node_id)
+        if existing is None:
+            # New member discovered
+            self.node.members[node_id] = NodeInfo(
+                node_id=node_id,
+                address=payload['address'],
+                port=payload['port'],
+                state=state,
+                incarnation=incarnation,
+                last_seen=payload['last_seen']
+            )
+            print(f"🆕 Discovered new node: {node_id}")
+        elif (incarnation > existing.incarnation or
+              (incarnation == existing.incarnation and
+               STATE_PRECEDENCE[state] > STATE_PRECEDENCE[existing.state])):
+            # Update existing member
+            existing.state = state
+            existing.incarnation = incarnation
+            existing.last_seen = payload['last_seen']
+        else:
+            return 0
+        
+        self.node.touch(f"member:{node_id}")
+        return 1
     
     def _failure_detector_loop(self):
         """Failure detection loop"""
@@ -211,9 +564,13 @@ class GossipProtocol:
     
     def _detect_failures(self):
         """Detect failed nodes based on timeouts"""
-        current_time = time.time()
+        with self._lock:
+            self._check_timeouts()
+    
+    def _check_timeouts(self):
+        current_time = self.clock()
         
-        for node_id, member in self.node.members.items():
+        for node_id, member in list(self.node.members.items()):
             if node_id == self.node.node_id:
                 continue
             
@@ -223,6 +580,7 @@ class GossipProtocol:
             if (member.state == NodeState.ALIVE and 
                 time_since_seen > self.node.suspicion_timeout):
                 member.state = NodeState.SUSPICIOUS
+                self.node.touch(f"member:{node_id}")
                 print(f"⚠️  Node {node_id} marked as suspicious")
                 self._gossip_state_change(node_id, NodeState.SUSPICIOUS)
             
@@ -230,6 +588,7 @@ class GossipProtocol:
             elif (member.state == NodeState.SUSPICIOUS and 
                   time_since_seen > self.node.failure_timeout):
                 member.state = NodeState.DEAD
+                self.node.touch(f"member:{node_id}")
                 self.node.stats['failures_detected'] += 1
                 print(f"💀 Node {node_id} marked as dead")
                 self._gossip_state_change(node_id, NodeState.DEAD)
@@ -253,24 +612,31 @@ class GossipProtocol:
         for member in alive_members:
             self._send_message(member.address, member.port, state_change_msg)
     
-    def _listen_for_messages(self):
-        """Listen for incoming gossip messages"""
-        try:
-            data, addr = self.socket.recvfrom(4096)
-            message = GossipMessage.from_json(data.decode())
-            self._handle_message(message, addr)
-            self.node.stats['messages_received'] += 1
-        except socket.timeout:
-            pass  # Normal timeout, continue
-        except Exception as e:
-            print(f"❌ Error receiving message: {e}")
+    def _listen_for_messages(self, until: float):
+        """Drain incoming gossip messages until the next round is due"""
+        while self.node.running and time.time() < until:
+            try:
+                data, addr = self.socket.recvfrom(65535)
+                message = GossipMessage.from_bytes(data, self.clock())
+                with self._lock:
+                    self._handle_message(message, addr)
+                self.node.stats['messages_received'] += 1
+            except socket.timeout:
+                pass  # Normal timeout, continue
+            except OSError:
+                if self.node.running:
+                    raise
+            except Exception as e:
+                print(f"❌ Error receiving message: {e}")
     
     def _handle_message(self, message: GossipMessage, sender_addr):
         """Handle incoming gossip message"""
         if message.message_type == "join":
             self._handle_join_message(message)
         elif message.message_type == "gossip":
-            self._handle_gossip_message(message)
+            self._handle_gossip_message(message, sender_addr)
+        elif message.message_type == "gossip_ack":
+            self._handle_gossip_ack_message(message)
         elif message.message_type == "state_change":
             self._handle_state_change_message(message)
         elif message.message_type == "ping":
@@ -289,39 +655,50 @@ class GossipProtocol:
         )
         
         self.node.members[message.sender_id] = new_node
+        self.node.touch(f"member:{message.sender_id}")
         print(f"🤝 Node {message.sender_id} joined cluster")
         
-        # Send current membership back
-        self._send_membership_update(new_node.address, new_node.port)
+        # A (re)joining node starts empty and restarts its own stamps, so
+        # forget both high-water marks we may hold from an earlier life
+        self.node.peer_acked.pop(message.sender_id, None)
+        self.node.peer_received.pop(message.sender_id, None)
+        self.node.syncing_peers.discard(message.sender_id)
+        
+        # With no acked stamp left, this sends a full sync of our state
+        self._send_gossip(new_node)
     
-    def _handle_gossip_message(self, message: GossipMessage):
-        """Handle gossip message with membership updates"""
+    def _handle_gossip_message(self, message: GossipMessage, sender_addr=None):
+        """Handle gossip message with membership and state updates"""
         gossip_data = message.data
+        self._merge_entries(gossip_data.get('entries', {}))
         
-        # Update membership information
-        for node_id, member_data in gossip_data.get('members', {}).items():
-            if node_id not in self.node.members:
-                # New member discovered
-                self.node.members[node_id] = NodeInfo(
-                    node_id=node_id,
-                    address=member_data['address'],
-                    port=member_data['port'],
-                    state=NodeState(member_data['state']),
-                    incarnation=member_data['incarnation'],
-                    last_seen=member_data['last_seen']
-                )
-                print(f"🆕 Discovered new node: {node_id}")
-            else:
-                # Update existing member
-                existing = self.node.members[node_id]
-                if member_data['incarnation'] > existing.incarnation:
-                    existing.state = NodeState(member_data['state'])
-                    existing.incarnation = member_data['incarnation']
-                    existing.last_seen = member_data['last_seen']
+        # Record how far into the sender's change log we now are
+        sender = message.sender_id
+        received = self.node.peer_received.get(sender, 0)
+        if gossip_data.get('full') or gossip_data.get('base', 0) <= received:
+            self.node.peer_received[sender] = max(received, gossip_data.get('seq', 0))
         
         # Update sender's last seen time
-        if message.sender_id in self.node.members:
-            self.node.members[message.sender_id].last_seen = time.time()
+        if sender in self.node.members:
+            self.node.members[sender].last_seen = self.clock()
+        
+        # Confirm the high-water mark so the sender's next delta starts there
+        if sender_addr:
+            encoder = GossipEncoder("gossip_ack", self.node.node_id, self.node.max_datagram_size, self.clock())
+            self._piggyback(encoder)
+            self._send_payload(sender_addr, encoder.finish(ack=self.node.peer_received.get(sender, 0)))
+    
+    def _handle_gossip_ack_message(self, message: GossipMessage):
+        """Advance a peer's high-water mark and apply piggybacked updates"""
+        data = message.data
+        sender = message.sender_id
+        # Taken as is: an ack below the last one means the peer lost state
+        # (e.g. restarted) and the next delta must start over from there
+        self.node.peer_acked[sender] = data['ack']
+        self._merge_entries(data.get('entries', {}))
+        
+        if sender in self.node.members:
+            self.node.members[sender].last_seen = self.clock()
     
     def _handle_state_change_message(self, message: GossipMessage):
         """Handle state change notification"""
@@ -331,6 +708,7 @@ class GossipProtocol:
         
         if target_node in self.node.members:
             self.node.members[target_node].state = new_state
+            self.node.touch(f"member:{target_node}")
             print(f"📢 Received state change: {target_node} -> {new_state.value}")
     
     def _handle_ping_message(self, message: GossipMessage, sender_addr):
@@ -341,44 +719,28 @@ class GossipProtocol:
             data={'ping_id': message.data.get('ping_id')}
         )
         
-        self.socket.sendto(ack_msg.to_json().encode(), sender_addr)
+        self._send_to_addr(sender_addr, ack_msg)
     
     def _handle_ack_message(self, message: GossipMessage):
         """Handle ack message"""
         # Update last seen time for sender
         if message.sender_id in self.node.members:
-            self.node.members[message.sender_id].last_seen = time.time()
+            self.node.members[message.sender_id].last_seen = self.clock()
     
     def _send_message(self, address: str, port: int, message: GossipMessage):
         """Send message to specific node"""
+        self._send_to_addr((address, port), message)
+    
+    def _send_to_addr(self, addr: Tuple[str, int], message: GossipMessage):
+        self._send_payload(addr, message.to_bytes())
+    
+    def _send_payload(self, addr: Tuple[str, int], payload: bytes):
         try:
-            self.socket.sendto(message.to_json().encode(), (address, port))
+            self.socket.sendto(payload, addr)
             self.node.stats['messages_sent'] += 1
+            self.node.stats['bytes_sent'] += len(payload)
         except Exception as e:
-            print(f"❌ Failed to send message to {address}:{port}: {e}")
-    
-    def _send_membership_update(self, address: str, port: int):
-        """Send current membership to a node"""
-        membership_data = {
-            'members': {
-                node_id: {
-                    'address': info.address,
-                    'port': info.port,
-                    'state': info.state.value,
-                    'incarnation': info.incarnation,
-                    'last_seen': info.last_seen
-                }
-                for node_id, info in self.node.members.items()
-            }
-        }
-        
-        update_msg = GossipMessage(
-            message_type="gossip",
-            sender_id=self.node.node_id,
-            data=membership_data
-        )
-        
-        self._send_message(address, port, update_msg)
+            print(f"❌ Failed to send message to {addr[0]}:{addr[1]}: {e}")
     
     def get_cluster_state(self) -> Dict:
         """Get current cluster state"""
@@ -393,6 +755,7 @@ class GossipProtocol:
                 for node_id, info in self.node.members.items()
             },
             'local_state': self.node.local_state,
+            'cluster_state': self.get_cluster_data(),
             'stats': self.node.stats
         }
 
@@ -461,10 +824,14 @@ def demonstrate_gossip_protocol():
             
             if state['local_state']:
                 print(f"     Local state: {state['local_state']}")
+            print(f"     Cluster state: {state['cluster_state']}")
             
-            print(f"     Stats: {state['stats']['gossip_rounds']} rounds, "
-                  f"{state['stats']['messages_sent']} sent, "
-                  f"{state['stats']['messages_received']} received")
+            stats = state['stats']
+            print(f"     Stats: {stats['gossip_rounds']} rounds, "
+                  f"{stats['messages_sent']} sent, "
+                  f"{stats['messages_received']} received")
+            print(f"     Dissemination: {stats['deltas_sent']} deltas, {stats['full_syncs_sent']} full syncs, "
+                  f"{stats['entries_sent']} entries, {stats['bytes_sent']:,} bytes")
     
     finally:
         # Cleanup
@@ -479,6 +846,38 @@ def demonstrate_gossip_protocol():
     print("💡 Automatic failure detection and recovery")
     print("💡 Eventual consistency across the cluster")
     print("💡 Scalable membership management")
+    print("💡 Delta gossip with per-peer high-water marks and bounded piggybacking")
+    print("💡 Compact binary datagrams packed to an MTU budget")
+
+def demonstrate_wire_format(member_count: int = 200):
+    """Compare JSON and binary encodings of a full membership sync"""
+    print("\n=== Gossip Wire Format ===")
+    
+    protocol = GossipProtocol(GossipNode("wire_demo", "127.0.0.1", 9500))
+    for i in range(member_count):
+        protocol.node.members[f"node-{i:04d}"] = NodeInfo(f"node-{i:04d}", "10.0.0.1", 7000 + i)
+        protocol.node.touch(f"member:node-{i:04d}")
+    protocol.update_local_state("config", {"replicas": 3, "zones": [f"us-east-1{z}" for z in "abcdef"]})
+    
+    entries, full, _ = protocol._delta_for("peer")
+    as_json = GossipMessage("gossip", "wire_demo", {'entries': entries, 'full': full}).to_json().encode()
+    as_binary = GossipMessage("gossip", "wire_demo", {'entries': entries, 'full': full}).to_bytes()
+    print(f"📦 Full sync of {len(entries)} entries: JSON {len(as_json):,} bytes, binary {len(as_binary):,} bytes")
+    
+    # Split the sync into datagrams the way _send_gossip does
+    remaining = dict(entries)
+    datagrams = []
+    while remaining:
+        encoder = GossipEncoder("gossip", "wire_demo", protocol.node.max_datagram_size)
+        for entry_key in list(remaining):
+            if not encoder.add(entry_key, remaining[entry_key]):
+                break
+            del remaining[entry_key]
+        datagrams.append(encoder.finish(full=True, seq=0, base=0, incarnation=0))
+    decoded = sum(len(GossipMessage.from_bytes(datagram).data['entries']) for datagram in datagrams)
+    print(f"📨 {len(datagrams)} datagrams of at most {max(map(len, datagrams))} bytes "
+          f"(budget {protocol.node.max_datagram_size}), {decoded} entries decoded")
 
 if __name__ == "__main__":
     demonstrate_gossip_protocol()
+    demonstrate_wire_format()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Discrete-Event Gossip Simulator
+Drives the gossip, membership and anti-entropy code on a virtual clock.
+"""
+
+import heapq
+import itertools
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gossip_protocol import GossipNode, GossipProtocol, GossipMessage, NodeInfo
+from membership_manager import MembershipManager, Member, MembershipEvent, MembershipEventType
+from anti_entropy import AntiEntropyManager
+
+LatencyModel = Callable[[random.Random], float]
+
+def constant_latency(seconds: float) -> LatencyModel:
+    return lambda rng: seconds
+
+def uniform_latency(low: float, high: float) -> LatencyModel:
+    return lambda rng: rng.uniform(low, high)
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> LatencyModel:
+    """Long-tailed latency, the usual shape of datacenter round trips"""
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+class DiscreteEventSimulator:
+    """Heap of timestamped callbacks run in virtual time.
+    
+    Nothing sleeps: run() pops the earliest event, moves the clock to its
+    time and calls it. Ties are broken by scheduling order, so a run with
+    the same seeds replays identically.
+    """
+    
+    def __init__(self):
+        self.now = 0.0
+        self._queue: List[Tuple[float, int, Callable, tuple]] = []
+        self._seq = itertools.count()
+        self.events_processed = 0
+    
+    def clock(self) -> float:
+        return self.now
+    
+    def schedule(self, delay: float, callback: Callable, *args):
+        heapq.heappush(self._queue, (self.now + delay, next(self._seq), callback, args))
+    
+    def schedule_at(self, when: float, callback: Callable, *args):
+        heapq.heappush(self._queue, (when, next(self._seq), callback, args))
+    
+    def run(self, until: float, stop: Optional[Callable[[], bool]] = None) -> float:
+        """Process events up to virtual time until, or until stop() turns true"""
+        queue = self._queue
+        while queue and queue[0][0] <= until:
+            when, _, callback, args = heapq.heappop(queue)
+            self.now = when
+            callback(*args)
+            self.events_processed += 1
+            if stop is not None and stop():
+                break
+        else:
+            self.now = max(self.now, until)
+        return self.now
+    
+    def __len__(self) -> int:
+        return len(self._queue)
+
+class SimulatedNetwork:
+    """Delivers datagrams after a sampled latency, dropping a fraction of them"""
+    
+    def __init__(self, simulator: DiscreteEventSimulator, latency: Optional[LatencyModel] = None,
+                 loss_rate: float = 0.0, seed: int = 0):
+        self.simulator = simulator
+        self.latency = latency or lognormal_latency(0.002)
+        self.loss_rate = loss_rate
+        self.rng = random.Random(seed)
+        self.stats = {'messages': 0, 'bytes': 0, 'dropped': 0}
+    
+    def send(self, size: int, deliver: Callable, *args):
+        self.stats['messages'] += 1
+        self.stats['bytes'] += size
+        if self.rng.random() < self.loss_rate:
+            self.stats['dropped'] += 1
+            return
+        self.simulator.schedule(self.latency(self.rng), deliver, *args)
+
+class SimulatedGossipProtocol(GossipProtocol):
+    """GossipProtocol whose datagrams travel over a SimulatedNetwork instead of UDP"""
+    
+    def __init__(self, node: GossipNode, simulator: DiscreteEventSimulator, network: SimulatedNetwork,
+                 directory: Dict[Tuple[str, int], 'SimulatedGossipProtocol']):
+        super().__init__(node)
+        self.simulator = simulator
+        self.network = network
+        self.directory = directory
+        self.clock = simulator.clock
+        self.on_update: Optional[Callable[['SimulatedGossipProtocol'], None]] = None
+        directory[(node.address, node.port)] = self
+    
+    def gossip_round(self):
+        """One gossip round, rescheduling itself every gossip_interval"""
+        if not self.node.running:
+            return
+        self._perform_gossip_round()
+        self.simulator.schedule(self.node.gossip_interval, self.gossip_round)
+    
+    def _send_payload(self, addr: Tuple[str, int], payload: bytes):
+        self.node.stats['messages_sent'] += 1
+        self.node.stats['bytes_sent'] += len(payload)
+        target = self.directory.get(addr)
+        if target is not None:
+            self.network.send(len(payload), target._deliver, payload, (self.node.address, self.node.port))
+    
+    def _deliver(self, payload: bytes, sender_addr: Tuple[str, int]):
+        if not self.node.running:
+            return
+        self.node.stats['messages_received'] += 1
+        self._handle_message(GossipMessage.from_bytes(payload, self.clock()), sender_addr)
+    
+    def _merge_entries(self, entries: Dict[str, Dict]) -> int:
+        changed = super()._merge_entries(entries)
+        if changed and self.on_update is not None:
+            self.on_update(self)
+        return changed
+
+def _sim_address(index: int) -> str:
+    return f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+def simulate_gossip_dissemination(node_count: int = 10000, fanout: int = 3, view_size: int = 32,
+                                  gossip_interval: float = 1.0, loss_rate: float = 0.01,
+                                  latency: Optional[LatencyModel] = None, seed: int = 1) -> Dict:
+    """Time for one state update to reach every node of a steady-state cluster.
+    
+    Each node starts with a random partial view of view_size peers whose
+    membership it has already synced, as a cluster of this size would use
+    a peer-sampling service rather than full views.
+    """
+    random.seed(seed)  # Peer selection inside GossipProtocol draws from the random module
+    rng = random.Random(seed)
+    simulator = DiscreteEventSimulator()
+    network = SimulatedNetwork(simulator, latency, loss_rate, seed)
+    directory: Dict[Tuple[str, int], SimulatedGossipProtocol] = {}
+    
+    protocols = []
+    for i in range(node_count):
+        node = GossipNode(f"node-{i}", _sim_address(i), 7946, gossip_interval=gossip_interval, fanout=fanout)
+        node.running = True
+        protocols.append(SimulatedGossipProtocol(node, simulator, network, directory))
+    
+    for protocol in protocols:
+        node = protocol.node
+        for peer in rng.sample(protocols, min(view_size + 1, node_count)):
+            if peer is protocol or len(node.members) > view_size:
+                continue
+            node.members[peer.node.node_id] = NodeInfo(peer.node.node_id, peer.node.address, peer.node.port,
+                                                       last_seen=0.0)
+            # Bootstrap already exchanged: both ends agree on the high-water mark
+            node.peer_acked[peer.node.node_id] = node.node_version
+            peer.node.peer_received[node.node_id] = node.node_version
+        node.recent_updates.clear()
+    
+    informed: Dict[str, float] = {}
+    update_at = gossip_interval
+    
+    def on_update(protocol: SimulatedGossipProtocol):
+        if protocol.node.node_id not in informed and "state:node-0:config" in protocol.node.state_entries:
+            informed[protocol.node.node_id] = simulator.now - update_at
+    
+    for protocol in protocols:
+        protocol.on_update = on_update
+        simulator.schedule_at(rng.uniform(0, gossip_interval), protocol.gossip_round)
+    
+    def publish():
+        protocols[0].update_local_state("config", "v2")
+        informed["node-0"] = 0.0
+    
+    started = time.perf_counter()
+    simulator.run(update_at)  # Warm-up round: steady-state traffic only
+    baseline_messages, baseline_bytes = network.stats['messages'], network.stats['bytes']
+    simulator.schedule_at(update_at, publish)
+    simulator.run(update_at + 100 * gossip_interval, stop=lambda: len(informed) == node_count)
+    wall_time = time.perf_counter() - started
+    
+    elapsed = simulator.now - update_at
+    times = sorted(informed.values())
+    rounds = elapsed / gossip_interval
+    return {
+        'nodes': node_count,
+        'converged': len(informed) == node_count,
+        'convergence_time': elapsed,
+        'p50_time': times[len(times) // 2],
+        'p99_time': times[min(len(times) - 1, int(len(times) * 0.99))],
+        'messages': network.stats['messages'] - baseline_messages,
+        'bytes': network.stats['bytes'] - baseline_bytes,
+        'dropped': network.stats['dropped'],
+        'messages_per_node_round': (network.stats['messages'] - baseline_messages) / node_count / max(rounds, 1e-9),
+        'events': simulator.events_processed,
+        'wall_time': wall_time
+    }
+
+def simulate_swim_failure(member_count: int = 300, protocol_period: float = 1.0, crash_at: float = 30.0,
+                          message_loss: float = 0.01, seed: int = 1) -> Dict:
+    """Time for a SWIM cluster to detect a crashed member and agree it failed.
+    
+    Probes are synchronous calls between managers, so a round trip is
+    modelled as finishing within its protocol period.
+    """
+    random.seed(seed)
+    rng = random.Random(seed)
+    simulator = DiscreteEventSimulator()
+    registry: Dict[str, MembershipManager] = {}
+    
+    managers = [MembershipManager(f"member-{i}", _sim_address(i), registry, verbose=False)
+                for i in range(member_count)]
+    for manager in managers:
+        manager.clock = simulator.clock
+        manager.protocol_period = protocol_period
+        manager.message_loss = message_loss
+        manager.running = True
+        for other in managers:
+            if other is not manager:
+                manager.members[other.local_member_id] = Member(other.local_member_id, other.local_address,
+                                                                last_heartbeat=0.0)
+    
+    victim = managers[-1]
+    failed_at: Dict[str, float] = {}
+    suspected_at: List[float] = []
+    
+    def on_event(event: MembershipEvent):
+        if event.member_id != victim.local_member_id:
+            return
+        if event.event_type == MembershipEventType.SUSPECT and not suspected_at:
+            suspected_at.append(simulator.now - crash_at)
+    
+    def period(manager: MembershipManager):
+        if not manager.running:
+            return
+        target = manager._next_probe_target()
+        if target:
+            manager._probe(target)
+        simulator.schedule(protocol_period, period, manager)
+    
+    def detector(manager: MembershipManager):
+        if not manager.running:
+            return
+        manager._check_phi()
+        manager._expire_suspicions()
+        if not manager.is_member_alive(victim.local_member_id) and manager.local_member_id not in failed_at:
+            failed_at[manager.local_member_id] = simulator.now - crash_at
+        simulator.schedule(protocol_period / 2, detector, manager)
+    
+    for manager in managers:
+        manager.add_event_handler(on_event)
+        simulator.schedule_at(rng.uniform(0, protocol_period), period, manager)
+        simulator.schedule_at(rng.uniform(0, protocol_period), detector, manager)
+    
+    def crash():
+        victim.running = False
+    
+    started = time.perf_counter()
+    simulator.run(crash_at)
+    false_positives = sum(m.stats['suspicions'] for m in managers)
+    probes_before = sum(m.stats['pings_sent'] + m.stats['ping_reqs_sent'] for m in managers)
+    simulator.schedule_at(crash_at, crash)
+    simulator.run(crash_at + 300 * protocol_period, stop=lambda: len(failed_at) == member_count - 1)
+    wall_time = time.perf_counter() - started
+    
+    probes = sum(m.stats['pings_sent'] + m.stats['ping_reqs_sent'] for m in managers)
+    return {
+        'members': member_count,
+        'converged': len(failed_at) == member_count - 1,
+        'first_suspicion': suspected_at[0] if suspected_at else None,
+        'first_failure': min(failed_at.values()) if failed_at else None,
+        'all_failed': max(failed_at.values()) if failed_at else None,
+        'false_suspicions_before_crash': false_positives,
+        'messages_per_member_period': probes_before / member_count / (crash_at / protocol_period),
+        'messages': probes,
+        'events': simulator.events_processed,
+        'wall_time': wall_time
+    }
+
+def simulate_anti_entropy(replica_count: int = 50, key_count: int = 2000, sync_interval: float = 1.0,
+                          write_window: float = 5.0, seed: int = 1) -> Dict:
+    """Time for Merkle anti-entropy to converge replicas after scattered writes"""
+    random.seed(seed)
+    rng = random.Random(seed)
+    simulator = DiscreteEventSimulator()
+    registry: Dict[str, AntiEntropyManager] = {}
+    replicas = [AntiEntropyManager(f"replica-{i}", registry, merkle_depth=8, verbose=False)
+                for i in range(replica_count)]
+    
+    for i in range(key_count):
+        simulator.schedule_at(rng.uniform(0, write_window), rng.choice(replicas).put, f"key-{i}", f"value-{i}")
+    
+    def sync(replica: AntiEntropyManager):
+        peer = rng.choice(replicas)
+        if peer is not replica:
+            replica._sync_with_peer(peer.node_id)
+        simulator.schedule(sync_interval, sync, replica)
+    
+    for replica in replicas:
+        simulator.schedule_at(rng.uniform(0, sync_interval), sync, replica)
+    
+    def converged() -> bool:
+        if simulator.now < write_window:
+            return False
+        root = replicas[0].merkle.root()
+        return all(replica.merkle.root() == root for replica in replicas)
+    
+    started = time.perf_counter()
+    simulator.run(write_window + 200 * sync_interval, stop=converged)
+    wall_time = time.perf_counter() - started
+    
+    return {
+        'replicas': replica_count,
+        'keys': key_count,
+        'converged': converged(),
+        'convergence_time': simulator.now - write_window,
+        'bytes': sum(replica.stats['bytes_transferred'] for replica in replicas),
+        'hashes_compared': sum(replica.stats['hashes_compared'] for replica in replicas),
+        'events': simulator.events_processed,
+        'wall_time': wall_time
+    }
+
+def demonstrate_gossip_simulator():
+    """Demonstrate the discrete-event simulator at cluster scale"""
+    print("=== Discrete-Event Gossip Simulation ===")
+    
+    print("\n📡 Delta gossip: one state update across 10,000 nodes (1% loss, ~2ms lognormal latency)")
+    result = simulate_gossip_dissemination(10000)
+    print(f"   Converged: {result['converged']} in {result['convergence_time']:.2f}s virtual "
+          f"(p50 {result['p50_time']:.2f}s, p99 {result['p99_time']:.2f}s)")
+    print(f"   Traffic: {result['messages']:,} messages, {result['bytes']:,} bytes, "
+          f"{result['messages_per_node_round']:.1f} messages per node per round")
+    print(f"   Wall time: {result['wall_time']:.1f}s for {result['events']:,} events")
+    
+    print("\n💀 SWIM: crash one of 300 members")
+    result = simulate_swim_failure(300)
+    print(f"   First suspicion after {result['first_suspicion']:.1f}s, first failure verdict after "
+          f"{result['first_failure']:.1f}s, all members agree after {result['all_failed']:.1f}s")
+    print(f"   Load: {result['messages_per_member_period']:.2f} probe messages per member per period, "
+          f"{result['false_suspicions_before_crash']} false suspicions before the crash")
+    print(f"   Wall time: {result['wall_time']:.1f}s for {result['events']:,} events")
+    
+    print("\n🔄 Merkle anti-entropy: 2,000 writes scattered over 50 replicas")
+    result = simulate_anti_entropy(50, 2000)
+    print(f"   Converged: {result['converged']} {result['convergence_time']:.1f}s after the last write")
+    print(f"   Traffic: {result['bytes']:,} bytes, {result['hashes_compared']:,} digests compared")
+    print(f"   Wall time: {result['wall_time']:.1f}s for {result['events']:,} events")
+    
+    print("\n🎯 Discrete-event simulation demonstrates:")
+    print("💡 Virtual time: no sleeps, deterministic replays from a seed")
+    print("💡 Injectable latency and loss models")
+    print("💡 The real protocol code, measured at 10k-node scale")
+
+if __name__ == "__main__":
+    demonstrate_gossip_simulator()
@@ -5,9 +5,11 @@ Manages cluster membership with failure detection and recovery.
 """
 
 import time
+import math
 import random
 import threading
 from enum import Enum
+from functools import lru_cache
 from dataclasses import dataclass, field
 from typing import List, Dict, Set, Optional, Callable
 import uuid
@@ -15,9 +17,16 @@ import uuid
 class MembershipEventType(Enum):
     JOIN = "join"
     LEAVE = "leave"
+    SUSPECT = "suspect"
     FAIL = "fail"
     RECOVER = "recover"
 
+class MemberStatus(Enum):
+    ALIVE = "alive"
+    SUSPECT = "suspect"
+    DEAD = "dead"
+    LEFT = "left"
+
 @dataclass
 class Member:
     member_id: str
@@ -28,6 +37,13 @@ class Member:
     incarnation: int = 0
     is_alive: bool = True
     suspicion_count: int = 0
+    suspected_at: Optional[float] = None  # Set while suspected; a suspect still counts as alive
+    
+    @property
+    def status(self) -> MemberStatus:
+        if not self.is_alive:
+            return MemberStatus.DEAD
+        return MemberStatus.SUSPECT if self.suspected_at is not None else MemberStatus.ALIVE
 
 @dataclass
 class MembershipEvent:
@@ -36,24 +52,143 @@ class MembershipEvent:
     timestamp: float = field(default_factory=time.time)
     metadata: Dict = field(default_factory=dict)
 
+class PhiAccrualDetector:
+    """Phi-accrual failure detector for one peer.
+    
+    Inter-arrival times of the peer's messages go into a fixed-size ring
+    buffer whose sum and sum of squares are maintained as samples enter
+    and leave, so mean and variance cost O(1). phi is -log10 of the
+    probability that a message is still this late under a normal model of
+    the window: phi 1 means ~10% false-positive odds, phi 8 ~1e-8.
+    """
+    
+    def __init__(self, window_size: int = 100, min_std_dev: float = 0.1,
+                 first_interval: float = 1.0, acceptable_pause: float = 0.0):
+        self.window_size = window_size
+        self.min_std_dev = min_std_dev
+        self.acceptable_pause = acceptable_pause  # Silence tolerated beyond the mean
+        self.intervals = [0.0] * window_size
+        self.count = 0
+        self.index = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.last_arrival: Optional[float] = None
+        self._deadlines: Dict[float, float] = {}  # phi threshold -> time phi crosses it
+        
+        # Seed the window so phi is meaningful from the second message on
+        self._add(first_interval - first_interval / 4)
+        self._add(first_interval + first_interval / 4)
+    
+    def heartbeat(self, now: float):
+        if self.last_arrival is not None and now > self.last_arrival:
+            self._add(now - self.last_arrival)
+        self.last_arrival = now
+        self._deadlines.clear()
+    
+    def _add(self, interval: float):
+        if self.count == self.window_size:
+            evicted = self.intervals[self.index]
+            self.total -= evicted
+            self.total_squares -= evicted * evicted
+        else:
+            self.count += 1
+        self.intervals[self.index] = interval
+        self.index = (self.index + 1) % self.window_size
+        self.total += interval
+        self.total_squares += interval * interval
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+    
+    @property
+    def std_dev(self) -> float:
+        variance = max(0.0, self.total_squares / self.count - self.mean ** 2)
+        return max(self.min_std_dev, math.sqrt(variance))
+    
+    def phi(self, now: float) -> float:
+        """Suspicion level for a peer last heard from at last_arrival"""
+        if self.last_arrival is None:
+            return 0.0
+        return self._phi_of((now - self.last_arrival - self.mean - self.acceptable_pause) / self.std_dev)
+    
+    def suspect_after(self, threshold: float) -> float:
+        """Time at which phi will exceed threshold unless another message arrives"""
+        deadline = self._deadlines.get(threshold)
+        if deadline is None:
+            if self.last_arrival is None:
+                return float('inf')
+            deadline = self._deadlines[threshold] = (self.last_arrival + self.mean + self.acceptable_pause
+                                                     + self._deviations_for(threshold) * self.std_dev)
+        return deadline
+    
+    @staticmethod
+    def _phi_of(y: float) -> float:
+        # Logistic approximation of the normal CDF tail (error < 1e-4)
+        e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        if y > 0:
+            return -math.log10(e / (1.0 + e)) if e > 0 else float('inf')
+        return -math.log10(1.0 - 1.0 / (1.0 + e))
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _deviations_for(threshold: float) -> float:
+        """Standard deviations past the mean at which phi reaches threshold"""
+        low, high = -10.0, 40.0
+        for _ in range(60):
+            mid = (low + high) / 2
+            if PhiAccrualDetector._phi_of(mid) < threshold:
+                low = mid
+            else:
+                high = mid
+        return high
+
 class MembershipManager:
-    def __init__(self, local_member_id: str, address: str):
+    """SWIM membership: one probe per protocol period, indirect probes, suspicion.
+    
+    Each period the next member in a shuffled round-robin order is pinged;
+    if no ack arrives, indirect_probes helpers are asked to ping it for us
+    (ping-req). A member nobody can reach becomes suspect and is declared
+    dead only if it does not refute the suspicion, by bumping its
+    incarnation, before the suspicion timeout. Membership updates ride on
+    pings and acks rather than separate broadcasts, so the per-member
+    message load is constant in cluster size.
+    """
+    
+    def __init__(self, local_member_id: str, address: str,
+                 peer_registry: Optional[Dict[str, 'MembershipManager']] = None, verbose: bool = True):
         self.local_member_id = local_member_id
         self.local_address = address
         self.members: Dict[str, Member] = {}
         self.event_handlers: List[Callable[[MembershipEvent], None]] = []
+        self.verbose = verbose
+        
+        # Managers reachable in-process; anyone else is probed by simulation
+        self.peer_registry = peer_registry if peer_registry is not None else {}
+        self.peer_registry[local_member_id] = self
         
         # Configuration
-        self.heartbeat_interval = 1.0
+        self.protocol_period = 1.0
+        self.indirect_probes = 3  # k helpers asked to ping-req an unresponsive member
+        self.suspicion_multiplier = 2  # Suspicion lasts multiplier * log2(N) periods
+        self.retransmit_multiplier = 3  # Updates are piggybacked on ~multiplier * log2(N) messages
+        self.max_piggyback = 8  # Updates carried by any one message
+        self.message_loss = 0.05  # Chance a message is dropped
+        self.phi_threshold = 8.0  # Suspect a member whose silence is this improbable
+        self.phi_window = 100  # Inter-arrival samples kept per member
         self.failure_timeout = 5.0
-        self.suspicion_threshold = 3
-        self.gossip_fanout = 3
         self.cleanup_interval = 10.0
         
         # State
         self.running = False
         self.incarnation = 0
         self.event_log: List[MembershipEvent] = []
+        self.updates: Dict[str, List] = {}  # Member -> [update, times piggybacked]
+        self._probe_order: List[str] = []
+        self.detectors: Dict[str, PhiAccrualDetector] = {}
+        self._has_run = False
+        self._lock = threading.RLock()
+        self.clock = time.time  # Swapped for a virtual clock under simulation
         
         # Statistics
         self.stats = {
@@ -61,7 +196,14 @@ class MembershipManager:
             'members_left': 0,
             'failures_detected': 0,
             'recoveries': 0,
-            'gossip_messages': 0
+            'gossip_messages': 0,
+            'pings_sent': 0,
+            'ping_reqs_sent': 0,
+            'acks_received': 0,
+            'suspicions': 0,
+            'phi_suspicions': 0,
+            'refutations': 0,
+            'updates_piggybacked': 0
         }
         
         # Add self as member
@@ -77,10 +219,16 @@ class MembershipManager:
     
     def start(self):
         """Start membership management"""
+        if self._has_run:
+            # Rejoining: outbid any failure verdict the cluster reached meanwhile
+            with self._lock:
+                self._refute()
+                self.detectors.clear()  # Arrival history from before the restart is stale
+        self._has_run = True
         self.running = True
         
         # Start background threads
-        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        threading.Thread(target=self._protocol_loop, daemon=True).start()
         threading.Thread(target=self._failure_detector_loop, daemon=True).start()
         threading.Thread(target=self._cleanup_loop, daemon=True).start()
         
@@ -97,59 +245,68 @@ class MembershipManager:
     
     def join_member(self, member_id: str, address: str, metadata: Dict[str, str] = None):
         """Add a new member to the cluster"""
-        if member_id in self.members:
-            return False
-        
-        member = Member(
-            member_id=member_id,
-            address=address,
-            metadata=metadata or {}
-        )
-        
-        self.members[member_id] = member
-        self.stats['members_joined'] += 1
-        
-        event = MembershipEvent(
-            event_type=MembershipEventType.JOIN,
-            member_id=member_id,
-            metadata={'address': address, 'metadata': metadata or {}}
-        )
-        
-        self._emit_event(event)
-        self._gossip_membership_change(event)
+        with self._lock:
+            if member_id in self.members:
+                return False
+            
+            member = Member(
+                member_id=member_id,
+                address=address,
+                metadata=metadata or {},
+                last_heartbeat=self.clock()
+            )
+            
+            self.members[member_id] = member
+            self.stats['members_joined'] += 1
+            
+            event = MembershipEvent(
+                event_type=MembershipEventType.JOIN,
+                member_id=member_id,
+                metadata={'address': address, 'metadata': metadata or {}}
+            )
+            
+            self._emit_event(event)
+            self._gossip_membership_change(event)
         
-        print(f"🤝 Member {member_id} joined cluster")
+        if self.verbose:
+            print(f"🤝 Member {member_id} joined cluster")
         return True
     
     def leave_member(self, member_id: str):
         """Remove a member from the cluster"""
-        if member_id not in self.members:
-            return False
-        
-        del self.members[member_id]
-        self.stats['members_left'] += 1
-        
-        event = MembershipEvent(
-            event_type=MembershipEventType.LEAVE,
-            member_id=member_id
-        )
-        
-        self._emit_event(event)
-        self._gossip_membership_change(event)
+        with self._lock:
+            if member_id not in self.members:
+                return False
+            
+            member = self.members.pop(member_id)
+            self.stats['members_left'] += 1
+            self._queue_update(member, MemberStatus.LEFT)
+            
+            event = MembershipEvent(
+                event_type=MembershipEventType.LEAVE,
+                member_id=member_id
+            )
+            
+            self._emit_event(event)
+            self._gossip_membership_change(event)
         
-        print(f"👋 Member {member_id} left cluster")
+        if self.verbose:
+            print(f"👋 Member {member_id} left cluster")
         return True
     
     def update_member_metadata(self, member_id: str, metadata: Dict[str, str]):
         """Update member metadata"""
-        if member_id not in self.members:
-            return False
-        
-        self.members[member_id].metadata.update(metadata)
-        self.members[member_id].incarnation += 1
-        
-        if member_id == self.local_member_id:
-            self.incarnation += 1
+        with self._lock:
+            if member_id not in self.members:
+                return False
+            
+            member = self.members[member_id]
+            member.metadata.update(metadata)
+            member.incarnation += 1
+            
+            if member_id == self.local_member_id:
+                self.incarnation = member.incarnation
+            self._queue_update(member, member.status)
         
         print(f"📝 Updated metadata for {member_id}: {metadata}")
         return True
@@ -168,95 +325,287 @@ class MembershipManager:
         """Check if member is alive"""
         return member_id in self.members and self.members[member_id].is_alive
     
-    def _heartbeat_loop(self):
-        """Send periodic heartbeats"""
+    def phi(self, member_id: str, now: Optional[float] = None) -> float:
+        """Current phi-accrual suspicion level of a member"""
+        detector = self.detectors.get(member_id)
+        return detector.phi(self.clock() if now is None else now) if detector else 0.0
+    
+    def _heard_from(self, member: Member, now: Optional[float] = None):
+        """Record a message from member as a heart-beat arrival"""
+        now = self.clock() if now is None else now
+        member.last_heartbeat = now
+        detector = self.detectors.get(member.member_id)
+        if detector is None:
+            # We probe every member once per round-robin cycle, so expect to hear from it that often
+            cycle = self.protocol_period * max(1, len(self.members) - 1)
+            detector = self.detectors[member.member_id] = PhiAccrualDetector(
+                self.phi_window, min_std_dev=self.protocol_period / 2, first_interval=cycle,
+                acceptable_pause=self.protocol_period)
+        detector.heartbeat(now)
+    
+    def suspicion_timeout(self) -> float:
+        """How long a suspect has to refute before it is declared dead"""
+        return self.suspicion_multiplier * max(1.0, math.log2(len(self.members) + 1)) * self.protocol_period
+    
+    def _protocol_loop(self):
+        """Probe one member per protocol period"""
         while self.running:
             try:
-                self._send_heartbeats()
-                time.sleep(self.heartbeat_interval)
+                started = time.time()
+                target_id = self._next_probe_target()
+                if target_id:
+                    self._probe(target_id)
+                time.sleep(max(0.0, self.protocol_period - (time.time() - started)))
             except Exception as e:
-                print(f"❌ Heartbeat loop error: {e}")
+                print(f"❌ Protocol loop error: {e}")
     
-    def _send_heartbeats(self):
-        """Send heartbeat to random members"""
-        alive_members = [m for m in self.members.values() 
-                        if m.is_alive and m.member_id != self.local_member_id]
-        
-        if not alive_members:
-            return
+    def _next_probe_target(self) -> Optional[str]:
+        """Round-robin over a shuffled member list, bounding time to first probe"""
+        with self._lock:
+            while self._probe_order:
+                member = self.members.get(self._probe_order.pop())
+                if member and member.is_alive:
+                    return member.member_id
+            
+            self._probe_order = [m.member_id for m in self.members.values()
+                                 if m.is_alive and m.member_id != self.local_member_id]
+            random.shuffle(self._probe_order)
+            return self._probe_order.pop() if self._probe_order else None
+    
+    def _probe(self, target_id: str) -> bool:
+        """Ping target directly, then through k helpers; suspect it if nobody gets an ack"""
+        self.stats['pings_sent'] += 1
+        ack = self._send(target_id, self._message('ping'))
+        
+        if ack is None:
+            with self._lock:
+                helpers = [m.member_id for m in self.members.values()
+                           if m.status == MemberStatus.ALIVE
+                           and m.member_id not in (self.local_member_id, target_id)]
+            for helper_id in random.sample(helpers, min(self.indirect_probes, len(helpers))):
+                self.stats['ping_reqs_sent'] += 1
+                ack = self._send(helper_id, self._message('ping_req', target=target_id))
+                if ack is not None:
+                    break
+        
+        with self._lock:
+            member = self.members.get(target_id)
+            if member is None:
+                return ack is not None
+            if ack is not None:
+                self.stats['acks_received'] += 1
+                self._apply_updates(ack['updates'])
+                self._heard_from(member)
+                member.suspicion_count = 0
+                return True
+            
+            member.suspicion_count += 1
+            if member.status == MemberStatus.ALIVE:
+                self._suspect(member)
+            return False
+    
+    def _message(self, message_type: str, **fields) -> Dict:
+        """Protocol message carrying piggybacked membership updates"""
+        with self._lock:
+            message = {'type': message_type, 'from': self.local_member_id,
+                       'updates': self._take_piggyback()}
+        message.update(fields)
+        return message
+    
+    def _send(self, member_id: str, message: Dict) -> Optional[Dict]:
+        """Deliver a message and return the ack, or None if it (or the ack) was lost"""
+        if random.random() < self.message_loss:
+            return None
         
-        # Select random subset for heartbeat
-        targets = random.sample(alive_members, 
-                               min(self.gossip_fanout, len(alive_members)))
+        peer = self.peer_registry.get(member_id)
+        if peer is not None and peer is not self:
+            return peer._receive(message)
         
-        for target in targets:
-            self._send_heartbeat(target)
+        # No peer to talk to: simulate a responsive member
+        return {'type': 'ack', 'from': member_id, 'updates': []}
+    
+    def _receive(self, message: Dict) -> Optional[Dict]:
+        """Handle a ping or ping-req; a stopped manager answers nothing"""
+        if not self.running:
+            return None
+        
+        with self._lock:
+            self._apply_updates(message['updates'])
+            sender = self.members.get(message['from'])
+            if sender:
+                self._heard_from(sender)
+        
+        if message['type'] == 'ping_req':
+            # Probe the target for the requester; the lock is not held across the call
+            self.stats['pings_sent'] += 1
+            if self._send(message['target'], self._message('ping')) is None:
+                return None
+        
+        return self._message('ack')
+    
+    def _suspect(self, member: Member):
+        member.suspected_at = self.clock()
+        self.stats['suspicions'] += 1
+        self._queue_update(member, MemberStatus.SUSPECT)
+        self._emit_event(MembershipEvent(MembershipEventType.SUSPECT, member.member_id))
+        if self.verbose:
+            print(f"⚠️  Member {member.member_id} suspected (incarnation {member.incarnation})")
+    
+    def _refute(self):
+        """Bump our incarnation so an alive update overrides suspicion of us"""
+        local = self.members[self.local_member_id]
+        self.incarnation += 1
+        local.incarnation = self.incarnation
+        local.is_alive = True
+        local.suspected_at = None
+        self.stats['refutations'] += 1
+        self._queue_update(local, MemberStatus.ALIVE)
+    
+    def _queue_update(self, member: Member, status: MemberStatus):
+        """Queue a membership update for piggybacking, replacing older news of that member"""
+        self.updates[member.member_id] = [{
+            'member': member.member_id,
+            'address': member.address,
+            'status': status.value,
+            'incarnation': member.incarnation,
+            'metadata': dict(member.metadata)
+        }, 0]
     
-    def _send_heartbeat(self, target: Member):
-        """Send heartbeat to specific member"""
-        # Simulate heartbeat message
-        current_time = time.time()
+    def _take_piggyback(self) -> List[Dict]:
+        """Least-disseminated updates first; each retires after ~log(N) transmissions"""
+        if not self.updates:
+            return []
+        
+        limit = max(1, math.ceil(self.retransmit_multiplier * math.log2(len(self.members) + 1)))
+        chosen = sorted(self.updates, key=lambda member_id: self.updates[member_id][1])[:self.max_piggyback]
+        piggyback = []
+        for member_id in chosen:
+            entry = self.updates[member_id]
+            piggyback.append(entry[0])
+            entry[1] += 1
+            if entry[1] >= limit:
+                del self.updates[member_id]
+        
+        self.stats['updates_piggybacked'] += len(piggyback)
+        return piggyback
+    
+    def _apply_updates(self, updates: List[Dict]):
+        for update in updates:
+            if self._apply_update(update):
+                # Infection-style: pass on whatever was news to us
+                self.updates[update['member']] = [update, 0]
+    
+    def _apply_update(self, update: Dict) -> bool:
+        """Merge one update using SWIM's incarnation precedence; True if it changed our view"""
+        member_id = update['member']
+        status = MemberStatus(update['status'])
+        incarnation = update['incarnation']
+        member = self.members.get(member_id)
         
-        # Simulate network delay and potential failure
-        if random.random() < 0.95:  # 95% success rate
-            target.last_heartbeat = current_time
-            target.suspicion_count = 0
-            
-            # Simulate receiving heartbeat response
-            self.members[self.local_member_id].last_heartbeat = current_time
-        else:
-            # Simulate heartbeat failure
-            target.suspicion_count += 1
+        if member_id == self.local_member_id:
+            if status in (MemberStatus.SUSPECT, MemberStatus.DEAD) and incarnation >= self.incarnation:
+                self._refute()
+            return False
+        
+        if member is None:
+            if status != MemberStatus.ALIVE:
+                return False
+            self.members[member_id] = Member(member_id=member_id, address=update['address'],
+                                             metadata=dict(update['metadata']), incarnation=incarnation,
+                                             last_heartbeat=self.clock())
+            self.stats['members_joined'] += 1
+            self._emit_event(MembershipEvent(MembershipEventType.JOIN, member_id,
+                                             metadata={'address': update['address']}))
+            return True
+        
+        if status == MemberStatus.LEFT:
+            del self.members[member_id]
+            self.stats['members_left'] += 1
+            self._emit_event(MembershipEvent(MembershipEventType.LEAVE, member_id))
+            return True
+        
+        if status == MemberStatus.ALIVE:
+            # Alive overrides anything older, including a death verdict on a rejoining member
+            if incarnation <= member.incarnation:
+                return False
+            recovered = not member.is_alive
+            member.incarnation = incarnation
+            member.metadata = dict(update['metadata'])
+            member.is_alive = True
+            member.suspected_at = None
+            if recovered:
+                self.detectors.pop(member_id, None)  # Downtime is not an inter-arrival sample
+            self._heard_from(member)
+            if recovered:
+                self.stats['recoveries'] += 1
+                self._emit_event(MembershipEvent(MembershipEventType.RECOVER, member_id))
+                if self.verbose:
+                    print(f"🔄 Member {member_id} recovered")
+            return True
+        
+        if status == MemberStatus.SUSPECT:
+            # Suspect(i) overrides Alive(j) for i >= j and Suspect(j) for i > j
+            if not member.is_alive or incarnation < member.incarnation:
+                return False
+            if member.suspected_at is not None and incarnation == member.incarnation:
+                return False
+            member.incarnation = incarnation
+            self._suspect(member)
+            return False  # _suspect already queued the update
+        
+        # Dead overrides everything at its incarnation or above
+        if not member.is_alive or incarnation < member.incarnation:
+            return False
+        member.incarnation = incarnation
+        self._declare_failed(member)
+        return False  # _declare_failed already queued the update
     
     def _failure_detector_loop(self):
-        """Detect failed members"""
+        """Suspect members by phi and declare suspects that failed to refute in time"""
         while self.running:
             try:
-                self._detect_failures()
-                time.sleep(self.failure_timeout / 2)
+                self._check_phi()
+                self._expire_suspicions()
+                time.sleep(self.protocol_period / 2)
             except Exception as e:
                 print(f"❌ Failure detector error: {e}")
     
-    def _detect_failures(self):
-        """Detect and handle member failures"""
-        current_time = time.time()
+    def _check_phi(self, now: Optional[float] = None):
+        """Suspect alive members whose silence has become improbable for their history"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            for member_id, detector in list(self.detectors.items()):
+                # Deadlines are cached per arrival, so quiet members cost one comparison
+                if now <= detector.suspect_after(self.phi_threshold):
+                    continue
+                member = self.members.get(member_id)
+                if member is not None and member.status == MemberStatus.ALIVE:
+                    self.stats['phi_suspicions'] += 1
+                    self._suspect(member)
+    
+    def _expire_suspicions(self, now: Optional[float] = None):
+        """Confirm suspects whose suspicion timeout has elapsed as failed"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            timeout = self.suspicion_timeout()
+            for member in list(self.members.values()):
+                if member.suspected_at is not None and member.is_alive and now - member.suspected_at > timeout:
+                    self._declare_failed(member)
+    
+    def _declare_failed(self, member: Member):
+        member.is_alive = False
+        member.suspected_at = None
+        self.stats['failures_detected'] += 1
+        self._queue_update(member, MemberStatus.DEAD)
         
-        for member_id, member in list(self.members.items()):
-            if member_id == self.local_member_id:
-                continue
-            
-            time_since_heartbeat = current_time - member.last_heartbeat
-            
-            # Mark as failed if no heartbeat for timeout period
-            if member.is_alive and time_since_heartbeat > self.failure_timeout:
-                member.is_alive = False
-                self.stats['failures_detected'] += 1
-                
-                event = MembershipEvent(
-                    event_type=MembershipEventType.FAIL,
-                    member_id=member_id
-                )
-                
-                self._emit_event(event)
-                self._gossip_membership_change(event)
-                
-                print(f"💀 Member {member_id} detected as failed")
-            
-            # Check for recovery
-            elif not member.is_alive and time_since_heartbeat < self.failure_timeout / 2:
-                member.is_alive = True
-                member.suspicion_count = 0
-                self.stats['recoveries'] += 1
-                
-                event = MembershipEvent(
-                    event_type=MembershipEventType.RECOVER,
-                    member_id=member_id
-                )
-                
-                self._emit_event(event)
-                self._gossip_membership_change(event)
-                
-                print(f"🔄 Member {member_id} recovered")
+        event = MembershipEvent(
+            event_type=MembershipEventType.FAIL,
+            member_id=member.member_id
+        )
+        self._emit_event(event)
+        
+        if self.verbose:
+            print(f"💀 Member {member.member_id} detected as failed")
     
     def _cleanup_loop(self):
         """Cleanup dead members periodically"""
@@ -269,26 +618,29 @@ class MembershipManager:
     
     def _cleanup_dead_members(self):
         """Remove members that have been dead for too long"""
-        current_time = time.time()
+        current_time = self.clock()
         cleanup_threshold = self.failure_timeout * 3  # 3x failure timeout
         
-        to_remove = []
-        for member_id, member in self.members.items():
-            if (not member.is_alive and 
-                current_time - member.last_heartbeat > cleanup_threshold):
-                to_remove.append(member_id)
-        
-        for member_id in to_remove:
-            del self.members[member_id]
-            print(f"🧹 Cleaned up dead member: {member_id}")
+        with self._lock:
+            to_remove = []
+            for member_id, member in self.members.items():
+                if (not member.is_alive and 
+                    current_time - member.last_heartbeat > cleanup_threshold):
+                    to_remove.append(member_id)
+            
+            for member_id in to_remove:
+                del self.members[member_id]
+                print(f"🧹 Cleaned up dead member: {member_id}")
     
     def _gossip_membership_change(self, event: MembershipEvent):
-        """Gossip membership change to other members"""
+        """Queue a membership change for piggybacking on protocol messages"""
         self.stats['gossip_messages'] += 1
         
-        # In a real implementation, this would send the event to random members
-        # For simulation, we just log it
-        print(f"📡 Gossiping event: {event.event_type.value} for {event.member_id}")
+        member = self.members.get(event.member_id)
+        if member is not None:
+            self._queue_update(member, member.status)
+        if self.verbose:
+            print(f"📡 Gossiping event: {event.event_type.value} for {event.member_id}")
     
     def _emit_event(self, event: MembershipEvent):
         """Emit membership event to handlers"""
@@ -314,6 +666,9 @@ class MembershipManager:
                 member.member_id: {
                     'address': member.address,
                     'alive': member.is_alive,
+                    'status': member.status.value,
+                    'incarnation': member.incarnation,
+                    'phi': self.phi(member.member_id),
                     'join_time': member.join_time,
                     'last_heartbeat': member.last_heartbeat,
                     'metadata': member.metadata,
@@ -337,9 +692,11 @@ def demonstrate_membership_manager():
     print("=== Gossip-based Membership Manager Demonstration ===")
     
     # Create membership managers for multiple nodes
+    registry = {}
     managers = []
     for i in range(5):
-        manager = MembershipManager(f"node_{i}", f"192.168.1.{i+10}")
+        manager = MembershipManager(f"node_{i}", f"192.168.1.{i+10}", peer_registry=registry)
+        manager.protocol_period = 0.5
         managers.append(manager)
     
     # Add event handler to track membership changes
@@ -408,9 +765,10 @@ def demonstrate_membership_manager():
             
             print(f"     Member details:")
             for member_id, details in info['members'].items():
-                status = "🟢" if details['alive'] else "🔴"
+                status = {"alive": "🟢", "suspect": "🟡"}.get(details['status'], "🔴")
                 print(f"       {status} {member_id}: {details['address']} "
-                      f"(uptime: {details['uptime']:.1f}s)")
+                      f"(incarnation: {details['incarnation']}, phi: {details['phi']:.2f}, "
+                      f"uptime: {details['uptime']:.1f}s)")
                 if details['metadata']:
                     print(f"         Metadata: {details['metadata']}")
             
@@ -431,6 +789,9 @@ def demonstrate_membership_manager():
     
     print("\n🎯 Membership manager demonstrates:")
     print("💡 Automatic member discovery and tracking")
+    print("💡 SWIM probing with indirect ping-req and incarnation-based suspicion")
+    print("💡 Membership updates piggybacked on protocol messages")
+    print("💡 Phi-accrual suspicion adapting to observed message arrival times")
     print("💡 Failure detection and recovery")
     print("💡 Metadata management and propagation")
     print("💡 Event-driven architecture for membership changes")
@@ -8,10 +8,16 @@ import time
 import threading
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Optional, Callable, Any
+from typing import Dict, List, Set, Optional, Callable, Any, Tuple
 import json
+import os
 import re
+import shutil
+import struct
+import tempfile
 import uuid
+import weakref
+import heapq
 from collections import defaultdict, deque
 
 class ExchangeType(Enum):
@@ -55,6 +61,26 @@ class Message:
             'reply_to': self.reply_to,
             'expiration': self.expiration
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Message':
+        return cls(
+            body=data['body'],
+            routing_key=data['routing_key'],
+            headers=data['headers'],
+            properties=data['properties'],
+            delivery_mode=DeliveryMode(data['delivery_mode']),
+            timestamp=data['timestamp'],
+            message_id=data['message_id'],
+            correlation_id=data['correlation_id'],
+            reply_to=data['reply_to'],
+            expiration=data['expiration']
+        )
+    
+    def body_size(self) -> int:
+        if isinstance(self.body, bytes):
+            return len(self.body)
+        return len(str(self.body).encode('utf-8'))
 
 @dataclass
 class Binding:
@@ -63,9 +89,165 @@ class Binding:
     headers: Dict[str, Any] = field(default_factory=dict)
     arguments: Dict[str, Any] = field(default_factory=dict)
 
+class MessageSegmentStore:
+    """Append-only segment files holding paged-out message bodies.
+    
+    Each record is a header (metadata length, body length, body kind),
+    the message metadata as JSON, then the body as a raw blob so bytes
+    bodies survive the round trip. A segment is deleted once every record
+    in it has been released (acknowledged or dropped).
+    """
+    
+    RECORD_HEADER = struct.Struct('!IIB')
+    BODY_STR, BODY_BYTES, BODY_JSON = 0, 1, 2
+    
+    def __init__(self, directory: Optional[str] = None, segment_max_bytes: int = 4 * 1024 * 1024):
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='amqp-lazy-')
+            weakref.finalize(self, shutil.rmtree, directory, True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        
+        self.segments: Dict[int, Dict[str, int]] = {}  # segment_id -> {'size', 'live'}
+        self.active_segment: Optional[int] = None
+        self.next_segment_id = 0
+        
+        self._writer = None
+        self._readers: Dict[int, Any] = {}
+        
+        self.stats = {
+            'records_written': 0,
+            'records_read': 0,
+            'bytes_written': 0,
+            'segments_created': 0,
+            'segments_reclaimed': 0
+        }
+    
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment_id:08d}.log")
+    
+    def _roll_segment(self):
+        """Close the active segment and start a new one"""
+        if self._writer:
+            self._writer.close()
+        
+        self.active_segment = self.next_segment_id
+        self.next_segment_id += 1
+        self.segments[self.active_segment] = {'size': 0, 'live': 0}
+        self._writer = open(self._segment_path(self.active_segment), 'ab')
+        self.stats['segments_created'] += 1
+    
+    def append(self, message: Message) -> Tuple[int, int, int]:
+        """Write message to the active segment, returning its location"""
+        metadata = message.to_dict()
+        body = metadata.pop('body')
+        if isinstance(body, bytes):
+            kind = self.BODY_BYTES
+        elif isinstance(body, str):
+            kind, body = self.BODY_STR, body.encode('utf-8')
+        else:
+            kind, body = self.BODY_JSON, json.dumps(body).encode('utf-8')
+        metadata = json.dumps(metadata).encode('utf-8')
+        record_size = self.RECORD_HEADER.size + len(metadata) + len(body)
+        
+        if (self.active_segment is None or
+                self.segments[self.active_segment]['size'] + record_size > self.segment_max_bytes):
+            self._roll_segment()
+        
+        segment = self.segments[self.active_segment]
+        offset = segment['size']
+        self._writer.write(self.RECORD_HEADER.pack(len(metadata), len(body), kind))
+        self._writer.write(metadata)
+        self._writer.write(body)
+        
+        segment['size'] += record_size
+        segment['live'] += 1
+        self.stats['records_written'] += 1
+        self.stats['bytes_written'] += record_size
+        
+        return self.active_segment, offset, record_size
+    
+    def read(self, location: Tuple[int, int, int]) -> Message:
+        """Load a message back from its segment location"""
+        segment_id, offset, record_size = location
+        
+        if segment_id == self.active_segment:
+            self._writer.flush()
+        
+        reader = self._readers.get(segment_id)
+        if reader is None:
+            reader = open(self._segment_path(segment_id), 'rb')
+            self._readers[segment_id] = reader
+        
+        reader.seek(offset)
+        record = reader.read(record_size)
+        metadata_length, body_length, kind = self.RECORD_HEADER.unpack_from(record)
+        body_start = self.RECORD_HEADER.size + metadata_length
+        data = json.loads(record[self.RECORD_HEADER.size:body_start].decode('utf-8'))
+        body = record[body_start:body_start + body_length]
+        if kind == self.BODY_STR:
+            body = body.decode('utf-8')
+        elif kind == self.BODY_JSON:
+            body = json.loads(body.decode('utf-8'))
+        data['body'] = body
+        
+        self.stats['records_read'] += 1
+        return Message.from_dict(data)
+    
+    def release(self, segment_id: int):
+        """Drop one live record reference, reclaiming the segment when empty"""
+        segment = self.segments.get(segment_id)
+        if segment is None:
+            return
+        
+        segment['live'] -= 1
+        if segment['live'] > 0:
+            return
+        
+        if segment_id == self.active_segment:
+            # Next append starts a fresh segment
+            self._writer.close()
+            self._writer = None
+            self.active_segment = None
+        self._reclaim(segment_id)
+    
+    def _reclaim(self, segment_id: int):
+        """Delete a segment file that holds no live records"""
+        reader = self._readers.pop(segment_id, None)
+        if reader:
+            reader.close()
+        
+        del self.segments[segment_id]
+        try:
+            os.remove(self._segment_path(segment_id))
+        except FileNotFoundError:
+            pass
+        self.stats['segments_reclaimed'] += 1
+    
+    def disk_bytes(self) -> int:
+        return sum(segment['size'] for segment in self.segments.values())
+    
+    def close(self):
+        """Close open segment handles"""
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+
 class Queue:
     def __init__(self, name: str, durable: bool = False, exclusive: bool = False, 
-                 auto_delete: bool = False, max_length: Optional[int] = None):
+                 auto_delete: bool = False, max_length: Optional[int] = None,
+                 lazy: bool = False, memory_threshold: int = 1024 * 1024,
+                 head_window: int = 64, segment_dir: Optional[str] = None,
+                 max_priority: Optional[int] = None):
+        if lazy and max_priority:
+            raise ValueError("Lazy mode is not supported for priority queues")
+        
         self.name = name
         self.durable = durable
         self.exclusive = exclusive
@@ -76,16 +258,75 @@ class Queue:
         self.consumers: Dict[str, Callable] = {}
         self.bindings: Set[str] = set()  # Exchange names bound to this queue
         
+        # Lazy mode: once in-memory bodies exceed memory_threshold, new
+        # messages are paged to disk and only head_window messages are
+        # loaded back at a time.
+        self.lazy = lazy
+        self.memory_threshold = memory_threshold
+        self.head_window = head_window
+        self.memory_bytes = 0
+        self.paged: deque = deque()  # Segment locations of messages on disk
+        self.segment_refs: Dict[str, int] = {}  # message_id -> segment_id until ack
+        self.store = MessageSegmentStore(segment_dir) if lazy else None
+        
+        # Priority mode (x-max-priority): one FIFO deque per level plus a
+        # max-heap of non-empty levels, so enqueue/dequeue are O(log p)
+        self.max_priority = max_priority
+        self.priority_levels: List[deque] = (
+            [deque() for _ in range(max_priority + 1)] if max_priority else []
+        )
+        self.active_priorities: List[int] = []  # Negated levels (max-heap)
+        self.priority_count = 0
+        
         # Statistics
         self.stats = {
             'messages_published': 0,
             'messages_delivered': 0,
             'messages_acknowledged': 0,
             'messages_rejected': 0,
+            'messages_paged_out': 0,
             'consumers_count': 0
         }
         
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()  # Consumer callbacks may ack re-entrantly
+        self._delivering = False
+    
+    def __len__(self) -> int:
+        return len(self.messages) + len(self.paged) + self.priority_count
+    
+    def _message_priority(self, message: Message) -> int:
+        """Clamp the message priority property to [0, max_priority]"""
+        try:
+            priority = int(message.properties.get('priority', 0))
+        except (TypeError, ValueError):
+            return 0
+        return max(0, min(priority, self.max_priority))
+    
+    def _priority_push(self, message: Message, head: bool = False):
+        """Add message to its priority level"""
+        priority = self._message_priority(message)
+        level = self.priority_levels[priority]
+        if not level:
+            heapq.heappush(self.active_priorities, -priority)
+        
+        if head:
+            level.appendleft(message)
+        else:
+            level.append(message)
+        self.priority_count += 1
+    
+    def _priority_pop(self) -> Optional[Message]:
+        """Pop the oldest message of the highest non-empty priority"""
+        if not self.active_priorities:
+            return None
+        
+        priority = -self.active_priorities[0]
+        level = self.priority_levels[priority]
+        message = level.popleft()
+        if not level:
+            heapq.heappop(self.active_priorities)
+        self.priority_count -= 1
+        return message
     
     def enqueue(self, message: Message) -> bool:
         """Add message to queue"""
@@ -95,11 +336,12 @@ class Queue:
                 return False
             
             # Check max length
-            if self.max_length and len(self.messages) >= self.max_length:
+            if self.max_length and len(self) >= self.max_length:
                 # Remove oldest message (FIFO)
-                self.messages.popleft()
+                dropped = self._pop_head()
+                self._release(dropped)
             
-            self.messages.append(message)
+            self._append(message)
             self.stats['messages_published'] += 1
             
             # Try to deliver immediately if consumers available
@@ -110,11 +352,67 @@ class Queue:
     def dequeue(self) -> Optional[Message]:
         """Remove and return next message"""
         with self._lock:
-            if self.messages:
-                message = self.messages.popleft()
+            message = self._pop_head()
+            if message:
                 self.stats['messages_delivered'] += 1
-                return message
+            return message
+    
+    def _append(self, message: Message):
+        """Append to the tail, paging to disk once over the memory threshold"""
+        if self.max_priority:
+            self._priority_push(message)
+            return
+        
+        size = message.body_size()
+        
+        if self.lazy and (self.paged or self.memory_bytes + size > self.memory_threshold):
+            self.paged.append(self.store.append(message))
+            self.stats['messages_paged_out'] += 1
+            return
+        
+        self.messages.append(message)
+        self.memory_bytes += size
+    
+    def _pop_head(self) -> Optional[Message]:
+        """Remove the head message, refilling the in-memory window from disk"""
+        if self.max_priority:
+            return self._priority_pop()
+        
+        if not self.messages:
+            self._page_in()
+        if not self.messages:
             return None
+        
+        message = self.messages.popleft()
+        self.memory_bytes -= message.body_size()
+        self._page_in()
+        return message
+    
+    def _push_head(self, message: Message):
+        """Return a message to the head of the queue"""
+        if self.max_priority:
+            self._priority_push(message, head=True)
+            return
+        
+        self.messages.appendleft(message)
+        self.memory_bytes += message.body_size()
+    
+    def _page_in(self):
+        """Load paged messages into the head window"""
+        while self.paged and len(self.messages) < self.head_window:
+            location = self.paged.popleft()
+            message = self.store.read(location)
+            self.segment_refs[message.message_id] = location[0]
+            self.messages.append(message)
+            self.memory_bytes += message.body_size()
+    
+    def _release(self, message: Optional[Message]):
+        """Release the segment record backing a message, if any"""
+        if message is None:
+            return
+        segment_id = self.segment_refs.pop(message.message_id, None)
+        if segment_id is not None:
+            self.store.release(segment_id)
     
     def add_consumer(self, consumer_id: str, callback: Callable):
         """Add consumer to queue"""
@@ -132,8 +430,19 @@ class Queue:
     
     def _try_deliver(self):
         """Try to deliver messages to available consumers"""
-        while self.messages and self.consumers:
-            message = self.messages.popleft()
+        if self._delivering:
+            return  # A callback re-entered; the outer loop picks up what it queued
+        self._delivering = True
+        try:
+            self._deliver_ready()
+        finally:
+            self._delivering = False
+    
+    def _deliver_ready(self):
+        while self.consumers:
+            message = self._pop_head()
+            if message is None:
+                break
             
             # Round-robin delivery to consumers
             consumer_id = next(iter(self.consumers.keys()))
@@ -144,28 +453,82 @@ class Queue:
                 self.stats['messages_delivered'] += 1
             except Exception as e:
                 # Put message back on error
-                self.messages.appendleft(message)
+                self._push_head(message)
                 print(f"❌ Consumer {consumer_id} failed to process message: {e}")
                 break
     
+    def purge_expired(self) -> int:
+        """Drop expired messages from the in-memory window"""
+        with self._lock:
+            if self.max_priority:
+                return self._purge_expired_priorities()
+            
+            expired_messages = [m for m in self.messages if m.is_expired()]
+            for message in expired_messages:
+                self.messages.remove(message)
+                self.memory_bytes -= message.body_size()
+                self._release(message)
+            self._page_in()
+            return len(expired_messages)
+    
+    def _purge_expired_priorities(self) -> int:
+        """Drop expired messages from every priority level"""
+        purged = 0
+        for priority, level in enumerate(self.priority_levels):
+            if not level:
+                continue
+            live = deque(m for m in level if not m.is_expired())
+            purged += len(level) - len(live)
+            self.priority_levels[priority] = live
+        
+        if purged:
+            self.priority_count -= purged
+            self.active_priorities = [-p for p, level in enumerate(self.priority_levels) if level]
+            heapq.heapify(self.active_priorities)
+        return purged
+    
     def acknowledge(self, message_id: str):
         """Acknowledge message delivery"""
+        with self._lock:
+            if self.segment_refs:
+                segment_id = self.segment_refs.pop(message_id, None)
+                if segment_id is not None:
+                    self.store.release(segment_id)
         self.stats['messages_acknowledged'] += 1
     
-    def reject(self, message_id: str, requeue: bool = True):
-        """Reject message"""
+    def reject(self, message: Message, requeue: bool = True):
+        """Settle a delivered message without processing it, optionally back at the head"""
+        with self._lock:
+            self._release(message)
+            if requeue:
+                self._push_head(message)
+                self._try_deliver()
         self.stats['messages_rejected'] += 1
     
     def get_stats(self) -> Dict:
         """Get queue statistics"""
         with self._lock:
-            return {
+            stats = {
                 'name': self.name,
-                'messages_ready': len(self.messages),
+                'messages_ready': len(self),
                 'consumers': self.stats['consumers_count'],
                 'durable': self.durable,
                 **self.stats
             }
+            if self.max_priority:
+                stats['messages_by_priority'] = {
+                    priority: len(level)
+                    for priority, level in enumerate(self.priority_levels) if level
+                }
+            if self.lazy:
+                stats.update({
+                    'messages_in_memory': len(self.messages),
+                    'messages_on_disk': len(self.paged),
+                    'memory_bytes': self.memory_bytes,
+                    'disk_bytes': self.store.disk_bytes(),
+                    'segments': len(self.store.segments)
+                })
+            return stats
 
 class Exchange:
     def __init__(self, name: str, exchange_type: ExchangeType, 
@@ -297,10 +660,75 @@ class Exchange:
                 **self.stats
             }
 
+class ConfirmBatcher:
+    """Coalesces publisher confirms for one channel into cumulative acks.
+    
+    Consecutive acked delivery tags are reported as a single
+    (highest_tag, multiple=True) confirm once batch_size accumulate or the
+    broker's flush timer fires. A nack first flushes the pending ack run
+    so confirms are always emitted in delivery-tag order.
+    
+    Publishers on one channel may reach the broker with their tags out of
+    order, so outcomes ahead of a gap are held back until the gap fills:
+    a cumulative ack never covers a tag that has not been settled yet.
+    """
+    
+    def __init__(self, callback: Callable[[int, bool, bool], None], batch_size: int = 64):
+        self.callback = callback  # callback(delivery_tag, multiple, ack)
+        self.batch_size = batch_size
+        
+        self.settled_upto = 0  # Every tag up to here has been recorded
+        self.ack_upto = 0
+        self.pending_acks = 0
+        self.out_of_order: Dict[int, bool] = {}  # Tags recorded past a gap -> ack
+        
+        self.stats = {
+            'messages_confirmed': 0,
+            'messages_nacked': 0,
+            'confirm_frames': 0
+        }
+        
+        self._lock = threading.Lock()
+    
+    def record(self, delivery_tag: int, ack: bool = True):
+        """Record the outcome of one published message"""
+        with self._lock:
+            self.out_of_order[delivery_tag] = ack
+            while self.settled_upto + 1 in self.out_of_order:
+                self.settled_upto += 1
+                if self.out_of_order.pop(self.settled_upto):
+                    self.ack_upto = self.settled_upto
+                    self.pending_acks += 1
+                else:
+                    self._emit_acks()
+                    self.stats['messages_nacked'] += 1
+                    self.stats['confirm_frames'] += 1
+                    self.callback(self.settled_upto, False, False)
+            if self.pending_acks >= self.batch_size:
+                self._emit_acks()
+    
+    def flush(self):
+        """Emit any pending acks immediately"""
+        with self._lock:
+            self._emit_acks()
+    
+    def _emit_acks(self):
+        if not self.pending_acks:
+            return
+        
+        multiple = self.pending_acks > 1
+        self.stats['messages_confirmed'] += self.pending_acks
+        self.stats['confirm_frames'] += 1
+        self.pending_acks = 0
+        self.callback(self.ack_upto, multiple, True)
+
 class AMQPBroker:
-    def __init__(self):
+    def __init__(self, confirm_flush_interval: float = 0.005, verbose: bool = True):
+        self.verbose = verbose  # Per-message logging; disable for benchmarks
         self.exchanges: Dict[str, Exchange] = {}
         self.queues: Dict[str, Queue] = {}
+        self.confirm_batchers: List[ConfirmBatcher] = []
+        self.confirm_flush_interval = confirm_flush_interval
         
         # Create default exchanges
         self._create_default_exchanges()
@@ -313,7 +741,7 @@ class AMQPBroker:
             'start_time': time.time()
         }
         
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()  # Consumer callbacks may publish re-entrantly
         self.running = False
     
     def _create_default_exchanges(self):
@@ -331,6 +759,7 @@ class AMQPBroker:
         """Start the AMQP broker"""
         self.running = True
         threading.Thread(target=self._cleanup_loop, daemon=True).start()
+        threading.Thread(target=self._confirm_loop, daemon=True).start()
         print("🚀 AMQP Broker started")
     
     def stop(self):
@@ -350,13 +779,31 @@ class AMQPBroker:
             return True
     
     def declare_queue(self, name: str, durable: bool = False, exclusive: bool = False,
-                     auto_delete: bool = False, max_length: Optional[int] = None) -> bool:
+                     auto_delete: bool = False, max_length: Optional[int] = None,
+                     arguments: Dict[str, Any] = None) -> bool:
         """Declare a queue"""
+        arguments = arguments or {}
         with self._lock:
             if name in self.queues:
                 return True
             
-            self.queues[name] = Queue(name, durable, exclusive, auto_delete, max_length)
+            queue_options = {}
+            if arguments.get('x-max-priority'):
+                # RabbitMQ caps priority levels at 255
+                queue_options['max_priority'] = min(int(arguments['x-max-priority']), 255)
+            if arguments.get('x-queue-mode') == 'lazy':
+                queue_options['lazy'] = True
+                if 'x-lazy-memory-threshold' in arguments:
+                    queue_options['memory_threshold'] = arguments['x-lazy-memory-threshold']
+                if 'x-lazy-head-window' in arguments:
+                    queue_options['head_window'] = arguments['x-lazy-head-window']
+            if queue_options.get('lazy') and queue_options.get('max_priority'):
+                # Priority levels are kept in memory only; refuse rather than raise from Queue()
+                print(f"❌ Queue '{name}': x-queue-mode lazy cannot be combined with x-max-priority")
+                return False
+            
+            self.queues[name] = Queue(name, durable, exclusive, auto_delete, max_length,
+                                      **queue_options)
             
             # Auto-bind to default exchange with queue name as routing key
             self.exchanges[""].bind_queue(name, name)
@@ -380,11 +827,29 @@ class AMQPBroker:
             print(f"🔗 Queue '{queue_name}' bound to exchange '{exchange_name}' with key '{routing_key}'")
             return True
     
-    def publish(self, exchange_name: str, message: Message) -> bool:
+    def create_confirm_batcher(self, callback: Callable[[int, bool, bool], None],
+                               batch_size: int = 64) -> ConfirmBatcher:
+        """Register a channel for publisher confirms (confirm.select)"""
+        batcher = ConfirmBatcher(callback, batch_size)
+        with self._lock:
+            self.confirm_batchers.append(batcher)
+        return batcher
+    
+    def release_confirm_batcher(self, batcher: ConfirmBatcher):
+        """Flush and unregister a channel's confirm batcher"""
+        batcher.flush()
+        with self._lock:
+            if batcher in self.confirm_batchers:
+                self.confirm_batchers.remove(batcher)
+    
+    def publish(self, exchange_name: str, message: Message,
+                confirms: Optional[ConfirmBatcher] = None, delivery_tag: int = 0) -> bool:
         """Publish message to exchange"""
         with self._lock:
             if exchange_name not in self.exchanges:
                 print(f"❌ Exchange '{exchange_name}' not found")
+                if confirms:
+                    confirms.record(delivery_tag, ack=False)
                 return False
             
             exchange = self.exchanges[exchange_name]
@@ -399,11 +864,17 @@ class AMQPBroker:
             
             self.stats['total_messages'] += 1
             
+            # Unroutable messages are still acked once the broker has them
+            if confirms:
+                confirms.record(delivery_tag, ack=True)
+            
             if delivered > 0:
-                print(f"📤 Message published to {delivered} queue(s) via '{exchange_name}'")
+                if self.verbose:
+                    print(f"📤 Message published to {delivered} queue(s) via '{exchange_name}'")
                 return True
             else:
-                print(f"⚠️  Message published but not routed (no matching queues)")
+                if self.verbose:
+                    print(f"⚠️  Message published but not routed (no matching queues)")
                 return False
     
     def consume(self, queue_name: str, consumer_id: str, callback: Callable) -> bool:
@@ -446,19 +917,21 @@ class AMQPBroker:
                 with self._lock:
                     # Clean expired messages from queues
                     for queue in self.queues.values():
-                        with queue._lock:
-                            expired_messages = []
-                            for message in queue.messages:
-                                if message.is_expired():
-                                    expired_messages.append(message)
-                            
-                            for message in expired_messages:
-                                queue.messages.remove(message)
+                        queue.purge_expired()
                 
                 time.sleep(10)  # Cleanup every 10 seconds
             except Exception as e:
                 print(f"❌ Cleanup error: {e}")
     
+    def _confirm_loop(self):
+        """Periodically flush partially filled confirm batches"""
+        while self.running:
+            with self._lock:
+                batchers = list(self.confirm_batchers)
+            for batcher in batchers:
+                batcher.flush()
+            time.sleep(self.confirm_flush_interval)
+    
     def get_broker_stats(self) -> Dict:
         """Get broker statistics"""
         with self._lock:
@@ -560,6 +1033,35 @@ def demonstrate_amqp_broker():
             if q_stats['messages_published'] > 0:
                 print(f"   {name}: {q_stats['messages_ready']} ready, "
                       f"{q_stats['messages_delivered']} delivered")
+        
+        # Lazy queue: backlog beyond 64KB of bodies is paged to disk
+        print(f"\n💾 Lazy queue backlog (consumer outage)...")
+        broker.declare_queue("audit_backlog", durable=True, arguments={
+            'x-queue-mode': 'lazy',
+            'x-lazy-memory-threshold': 64 * 1024,
+            'x-lazy-head-window': 32
+        })
+        backlog = broker.queues["audit_backlog"]
+        for i in range(2000):
+            backlog.enqueue(Message(f"audit event {i:05d} " + "x" * 512, "audit_backlog"))
+        
+        lazy_stats = backlog.get_stats()
+        print(f"   Ready: {lazy_stats['messages_ready']} "
+              f"({lazy_stats['messages_in_memory']} in memory, "
+              f"{lazy_stats['messages_on_disk']} on disk)")
+        print(f"   Memory: {lazy_stats['memory_bytes']} bytes, "
+              f"disk: {lazy_stats['disk_bytes']} bytes in {lazy_stats['segments']} segment(s)")
+        
+        while True:
+            message = backlog.dequeue()
+            if message is None:
+                break
+            backlog.acknowledge(message.message_id)
+        
+        lazy_stats = backlog.get_stats()
+        print(f"   After drain + ack: {lazy_stats['messages_ready']} ready, "
+              f"{lazy_stats['segments']} segment(s) retained, "
+              f"{backlog.store.stats['segments_reclaimed']} reclaimed")
     
     finally:
         broker.stop()
@@ -569,6 +1071,7 @@ def demonstrate_amqp_broker():
     print("💡 Queue management and consumer handling")
     print("💡 Reliable message delivery and acknowledgments")
     print("💡 Scalable publish-subscribe patterns")
+    print("💡 Lazy queues with bounded memory for deep backlogs")
 
 if __name__ == "__main__":
     demonstrate_amqp_broker()
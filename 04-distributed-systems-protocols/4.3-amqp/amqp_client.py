@@ -10,9 +10,11 @@ import json
 from typing import Dict, List, Optional, Callable, Any
 from dataclasses import dataclass, field
 from enum import Enum
+from collections import OrderedDict
+from concurrent.futures import Future
 import uuid
 
-from amqp_broker import AMQPBroker, Message, ExchangeType, DeliveryMode
+from amqp_broker import AMQPBroker, Message, ExchangeType, DeliveryMode, ConfirmBatcher
 
 class ConnectionState(Enum):
     CLOSED = "closed"
@@ -39,9 +41,20 @@ class AMQPChannel:
         
         self.is_open = True
         self.consumer_tags: Dict[str, str] = {}  # consumer_tag -> queue_name
+        self.unacked: Dict[int, tuple] = {}  # delivery_tag -> (queue_name, message)
+        self.next_delivery_tag = 1
         self.confirm_mode = False
         self.transaction_active = False
         
+        # Publisher confirms: outstanding publish sequence numbers in
+        # ascending order, so a cumulative ack pops from the front
+        self.publish_seq = 0
+        self.pending_confirms: 'OrderedDict[int, Future]' = OrderedDict()
+        self.confirm_listeners: List[Callable[[int, bool, bool], None]] = []
+        self.confirms: Optional[ConfirmBatcher] = None
+        self._confirm_cond = threading.Condition()
+        self._nacked_since_wait = False
+        
         # QoS settings
         self.prefetch_count = 0
         self.prefetch_size = 0
@@ -52,7 +65,9 @@ class AMQPChannel:
             'messages_consumed': 0,
             'messages_acked': 0,
             'messages_nacked': 0,
-            'messages_rejected': 0
+            'messages_rejected': 0,
+            'confirms_received': 0,
+            'messages_confirmed': 0
         }
     
     def exchange_declare(self, exchange: str, exchange_type: str, 
@@ -86,20 +101,21 @@ class AMQPChannel:
                 queue_obj = self.broker.queues[queue]
                 return {
                     'queue': queue,
-                    'message_count': len(queue_obj.messages),
+                    'message_count': len(queue_obj),
                     'consumer_count': len(queue_obj.consumers)
                 }
             else:
                 raise Exception(f"Queue '{queue}' does not exist")
         
         max_length = arguments.get('x-max-length') if arguments else None
-        success = self.broker.declare_queue(queue, durable, exclusive, auto_delete, max_length)
+        success = self.broker.declare_queue(queue, durable, exclusive, auto_delete, max_length,
+                                            arguments=arguments)
         
         if success:
             queue_obj = self.broker.queues[queue]
             return {
                 'queue': queue,
-                'message_count': len(queue_obj.messages),
+                'message_count': len(queue_obj),
                 'consumer_count': len(queue_obj.consumers)
             }
         else:
@@ -117,6 +133,21 @@ class AMQPChannel:
                      properties: Dict[str, Any] = None, mandatory: bool = False,
                      immediate: bool = False) -> bool:
         """Publish a message"""
+        success, _ = self._publish(exchange, routing_key, body, properties, mandatory)
+        return success
+    
+    def basic_publish_async(self, exchange: str, routing_key: str, body: str,
+                            properties: Dict[str, Any] = None,
+                            mandatory: bool = False) -> Future:
+        """Publish in confirm mode, returning a future resolved with the broker ack"""
+        if not self.confirm_mode:
+            raise Exception("Channel is not in confirm mode")
+        
+        _, future = self._publish(exchange, routing_key, body, properties, mandatory)
+        return future
+    
+    def _publish(self, exchange: str, routing_key: str, body: str,
+                 properties: Optional[Dict[str, Any]], mandatory: bool):
         if not self.is_open:
             raise Exception("Channel is closed")
         
@@ -132,7 +163,16 @@ class AMQPChannel:
             expiration=properties.get('expiration')
         )
         
-        success = self.broker.publish(exchange, message)
+        future = None
+        if self.confirm_mode:
+            future = Future()
+            with self._confirm_cond:
+                self.publish_seq += 1
+                delivery_tag = self.publish_seq
+                self.pending_confirms[delivery_tag] = future
+            success = self.broker.publish(exchange, message, self.confirms, delivery_tag)
+        else:
+            success = self.broker.publish(exchange, message)
         
         if success:
             self.stats['messages_published'] += 1
@@ -141,7 +181,7 @@ class AMQPChannel:
             # In real AMQP, this would trigger a basic.return
             print(f"⚠️  Mandatory message could not be routed")
         
-        return success
+        return success, future
     
     def basic_consume(self, queue: str, callback: Callable, 
                      consumer_tag: str = "", no_ack: bool = False,
@@ -158,7 +198,7 @@ class AMQPChannel:
                 # Create delivery info
                 delivery_info = {
                     'consumer_tag': consumer_tag,
-                    'delivery_tag': self.stats['messages_consumed'] + 1,
+                    'delivery_tag': self._track_delivery(queue, message, no_ack),
                     'redelivered': False,
                     'exchange': '',  # Would be filled by broker in real implementation
                     'routing_key': message.routing_key
@@ -167,9 +207,6 @@ class AMQPChannel:
                 callback(message, delivery_info)
                 self.stats['messages_consumed'] += 1
                 
-                if no_ack:
-                    self.stats['messages_acked'] += 1
-                
             except Exception as e:
                 print(f"❌ Consumer callback error: {e}")
         
@@ -204,12 +241,9 @@ class AMQPChannel:
         message = self.broker.get_queue_message(queue)
         
         if message:
-            delivery_tag = self.stats['messages_consumed'] + 1
+            delivery_tag = self._track_delivery(queue, message, no_ack)
             self.stats['messages_consumed'] += 1
             
-            if no_ack:
-                self.stats['messages_acked'] += 1
-            
             return {
                 'message': message,
                 'delivery_tag': delivery_tag,
@@ -221,13 +255,53 @@ class AMQPChannel:
         
         return None
     
+    def _track_delivery(self, queue: str, message: Message, no_ack: bool) -> int:
+        """Assign a delivery tag, acknowledging immediately in no-ack mode"""
+        delivery_tag = self.next_delivery_tag
+        self.next_delivery_tag += 1
+        
+        if no_ack:
+            self._ack_message(queue, message.message_id)
+        else:
+            self.unacked[delivery_tag] = (queue, message)
+        
+        return delivery_tag
+    
+    def _ack_message(self, queue: str, message_id: str):
+        """Tell the broker queue a message is settled"""
+        queue_obj = self.broker.queues.get(queue)
+        if queue_obj is not None:
+            queue_obj.acknowledge(message_id)
+        self.stats['messages_acked'] += 1
+    
+    def _reject_messages(self, settled: List[tuple], requeue: bool):
+        """Hand nacked deliveries back to their queues, keeping their order on requeue"""
+        for queue, message in reversed(settled):
+            queue_obj = self.broker.queues.get(queue)
+            if queue_obj is not None:
+                queue_obj.reject(message, requeue)
+    
+    def _pop_unacked(self, delivery_tag: int, multiple: bool) -> List[tuple]:
+        """Remove and return the deliveries a delivery tag settles"""
+        if multiple:
+            tags = [tag for tag in self.unacked if tag <= delivery_tag]
+        else:
+            tags = [delivery_tag] if delivery_tag in self.unacked else []
+        return [self.unacked.pop(tag) for tag in tags]
+    
     def basic_ack(self, delivery_tag: int, multiple: bool = False) -> bool:
         """Acknowledge message delivery"""
         if not self.is_open:
             raise Exception("Channel is closed")
         
-        # In real implementation, would track delivery tags and acknowledge specific messages
-        self.stats['messages_acked'] += 1
+        settled = self._pop_unacked(delivery_tag, multiple)
+        if not settled:
+            # Unknown tags have nothing to settle on the broker side
+            self.stats['messages_acked'] += 1
+            return True
+        
+        for queue, message in settled:
+            self._ack_message(queue, message.message_id)
         return True
     
     def basic_nack(self, delivery_tag: int, multiple: bool = False, requeue: bool = True) -> bool:
@@ -235,6 +309,7 @@ class AMQPChannel:
         if not self.is_open:
             raise Exception("Channel is closed")
         
+        self._reject_messages(self._pop_unacked(delivery_tag, multiple), requeue)
         self.stats['messages_nacked'] += 1
         return True
     
@@ -243,6 +318,7 @@ class AMQPChannel:
         if not self.is_open:
             raise Exception("Channel is closed")
         
+        self._reject_messages(self._pop_unacked(delivery_tag, False), requeue)
         self.stats['messages_rejected'] += 1
         return True
     
@@ -255,14 +331,58 @@ class AMQPChannel:
         self.prefetch_count = prefetch_count
         return True
     
-    def confirm_select(self) -> bool:
+    def confirm_select(self, batch_size: int = 64) -> bool:
         """Enable publisher confirms"""
         if not self.is_open:
             raise Exception("Channel is closed")
         
-        self.confirm_mode = True
+        if not self.confirm_mode:
+            self.confirms = self.broker.create_confirm_batcher(self._handle_confirm, batch_size)
+            self.confirm_mode = True
         return True
     
+    def add_confirm_listener(self, listener: Callable[[int, bool, bool], None]):
+        """Register listener(delivery_tag, multiple, ack) for confirm frames"""
+        self.confirm_listeners.append(listener)
+    
+    def _handle_confirm(self, delivery_tag: int, multiple: bool, ack: bool):
+        """Settle every outstanding publish covered by a basic.ack/basic.nack"""
+        with self._confirm_cond:
+            settled = []
+            if multiple:
+                while self.pending_confirms:
+                    seq = next(iter(self.pending_confirms))
+                    if seq > delivery_tag:
+                        break
+                    settled.append(self.pending_confirms.popitem(last=False)[1])
+            elif delivery_tag in self.pending_confirms:
+                settled.append(self.pending_confirms.pop(delivery_tag))
+            
+            self.stats['confirms_received'] += 1
+            if ack:
+                self.stats['messages_confirmed'] += len(settled)
+            else:
+                self._nacked_since_wait = True
+            self._confirm_cond.notify_all()
+        
+        for future in settled:
+            future.set_result(ack)
+        for listener in self.confirm_listeners:
+            listener(delivery_tag, multiple, ack)
+    
+    def wait_for_confirms(self, timeout: Optional[float] = None) -> bool:
+        """Block until every outstanding publish is confirmed; False if any were nacked"""
+        if not self.confirm_mode:
+            raise Exception("Channel is not in confirm mode")
+        
+        self.confirms.flush()
+        with self._confirm_cond:
+            if not self._confirm_cond.wait_for(lambda: not self.pending_confirms, timeout):
+                raise TimeoutError(f"{len(self.pending_confirms)} publishes still unconfirmed")
+            all_acked = not self._nacked_since_wait
+            self._nacked_since_wait = False
+            return all_acked
+    
     def tx_select(self) -> bool:
         """Start transaction"""
         if not self.is_open:
@@ -293,6 +413,10 @@ class AMQPChannel:
         for consumer_tag in list(self.consumer_tags.keys()):
             self.basic_cancel(consumer_tag)
         
+        if self.confirms:
+            self.broker.release_confirm_batcher(self.confirms)
+            self.confirms = None
+        
         self.is_open = False
         print(f"📪 Channel {self.channel_id} closed")
 
@@ -438,10 +562,21 @@ def demonstrate_amqp_client():
         if result:
             print(f"Got message: {result['message'].body}")
         
-        # Publisher confirms
-        channel.confirm_select()
+        # Publisher confirms: the broker acks cumulatively, so a burst of
+        # publishes settles with a handful of confirm frames
+        channel.confirm_select(batch_size=4)
         print(f"✅ Publisher confirms enabled")
         
+        channel.queue_declare("audit_queue")
+        channel.queue_bind("audit_queue", "orders", "audit")
+        confirm_futures = [
+            channel.basic_publish_async("orders", "audit", f"Audit record {i}")
+            for i in range(10)
+        ]
+        all_acked = channel.wait_for_confirms(timeout=5)
+        print(f"📬 {len(confirm_futures)} publishes confirmed (all acked: {all_acked}) "
+              f"with {channel.stats['confirms_received']} confirm frame(s)")
+        
         # QoS settings
         channel.basic_qos(prefetch_count=10)
         print(f"⚙️  QoS set: prefetch_count=10")
@@ -333,6 +333,22 @@ class MessagePatterns:
         # Declare priority queue with x-max-priority argument
         channel.queue_declare("priority_queue", arguments={'x-max-priority': 10})
         
+        # Send messages with different priorities
+        priority_tasks = [
+            ({"description": "Regular backup task"}, 1),
+            ({"description": "CRITICAL: Security alert"}, 10),
+            ({"description": "Send newsletter"}, 2),
+            ({"description": "URGENT: System failure"}, 9),
+            ({"description": "Update user profile"}, 3),
+            ({"description": "HIGH: Payment processing"}, 7)
+        ]
+        
+        # Build a backlog in random order; the queue keeps one FIFO per
+        # priority level, so the worker drains it highest-priority first
+        for task, priority in priority_tasks:
+            channel.basic_publish("", "priority_queue", json.dumps(task),
+                                properties={'priority': priority})
+        
         # Create priority worker
         def priority_worker():
             def process_priority_message(message: Message, delivery_info: Dict):
@@ -350,21 +366,6 @@ class MessagePatterns:
         # Start priority worker
         threading.Thread(target=priority_worker, daemon=True).start()
         
-        # Send messages with different priorities
-        priority_tasks = [
-            ({"description": "Regular backup task"}, 1),
-            ({"description": "CRITICAL: Security alert"}, 10),
-            ({"description": "Send newsletter"}, 2),
-            ({"description": "URGENT: System failure"}, 9),
-            ({"description": "Update user profile"}, 3),
-            ({"description": "HIGH: Payment processing"}, 7)
-        ]
-        
-        # Send in random order to demonstrate priority sorting
-        for task, priority in priority_tasks:
-            channel.basic_publish("", "priority_queue", json.dumps(task),
-                                properties={'priority': priority})
-        
         time.sleep(2)  # Let worker process all tasks
     
     def cleanup(self):
@@ -8,9 +8,10 @@ import time
 import threading
 import json
 import uuid
+import itertools
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set
-from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple, Iterator
+from datetime import datetime, timedelta
 
 from stomp_broker import StompBroker, StompFrame, StompCommand
 from stomp_client import StompClient, StompClientConfig, AckMode
@@ -20,7 +21,7 @@ class ChatUser:
     user_id: str
     username: str
     room: str
-    client: StompClient
+    client: Optional[StompClient]
     last_seen: datetime = field(default_factory=datetime.now)
     message_count: int = 0
 
@@ -33,15 +34,91 @@ class ChatMessage:
     content: str
     timestamp: datetime
     message_type: str = "text"  # text, join, leave, system
+    seq: int = -1  # Position in the room's history, assigned on broadcast
+
+class MessageHistory:
+    """Fixed-capacity ring buffer of chat messages with a time index.
+    
+    Message seq numbers map to slots (seq % capacity), so appending
+    overwrites the oldest entry in O(1). Timestamps live in a parallel
+    ring; messages arrive in time order, so time lookups are a binary
+    search over the live seq range instead of a scan.
+    """
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.slots: List[Optional[ChatMessage]] = [None] * capacity
+        self.times: List[float] = [0.0] * capacity
+        self.next_seq = 0
+    
+    def __len__(self) -> int:
+        return min(self.next_seq, self.capacity)
+    
+    def __iter__(self) -> Iterator[ChatMessage]:
+        for seq in range(self.first_seq, self.next_seq):
+            yield self.slots[seq % self.capacity]
+    
+    @property
+    def first_seq(self) -> int:
+        """Oldest seq still held"""
+        return max(0, self.next_seq - self.capacity)
+    
+    def append(self, message: ChatMessage) -> int:
+        """Store message, evicting the oldest once full; returns its seq"""
+        seq = self.next_seq
+        slot = seq % self.capacity
+        message.seq = seq
+        self.slots[slot] = message
+        self.times[slot] = message.timestamp.timestamp()
+        self.next_seq += 1
+        return seq
+    
+    def seq_at(self, timestamp: datetime) -> int:
+        """First held seq at or after timestamp"""
+        target = timestamp.timestamp()
+        low, high = self.first_seq, self.next_seq
+        while low < high:
+            mid = (low + high) // 2
+            if self.times[mid % self.capacity] < target:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+    
+    def count_since(self, timestamp: datetime) -> int:
+        return self.next_seq - self.seq_at(timestamp)
+    
+    def since(self, timestamp: datetime) -> List[ChatMessage]:
+        return [self.slots[seq % self.capacity] for seq in range(self.seq_at(timestamp), self.next_seq)]
+    
+    def page(self, before: Optional[int] = None, limit: int = 50) -> Tuple[List[ChatMessage], Optional[int]]:
+        """Up to limit messages older than seq before (newest page if None).
+        
+        Returns the messages oldest-first and the cursor for the next older
+        page, or None once the start of the held history is reached.
+        """
+        end = self.next_seq if before is None else max(self.first_seq, min(before, self.next_seq))
+        start = max(self.first_seq, end - limit)
+        messages = [self.slots[seq % self.capacity] for seq in range(start, end)]
+        return messages, (start if start > self.first_seq else None)
 
 class ChatRoom:
-    def __init__(self, room_name: str, broker: StompBroker):
+    def __init__(self, room_name: str, broker: StompBroker, history_size: int = 100,
+                 large_room_threshold: int = 1000, verbose: bool = True):
         self.room_name = room_name
         self.broker = broker
         self.users: Dict[str, ChatUser] = {}
-        self.message_history: List[ChatMessage] = []
+        self.message_history = MessageHistory(history_size)
         self.topic = f"/topic/chat/{room_name}"
         self.user_topic = f"/topic/chat/{room_name}/users"
+        self.large_room_threshold = large_room_threshold  # Above this, joins/leaves aren't announced in chat
+        self.verbose = verbose
+        
+        # The room publishes once per broadcast; the broker fans out to members
+        self.publisher_id = f"chat-room:{room_name}"
+        if self.broker:
+            self.broker.process_frame(self.publisher_id, StompFrame(
+                StompCommand.CONNECT, {'accept-version': '1.2', 'host': 'localhost'}))
         
         # Room statistics
         self.stats = {
@@ -60,21 +137,22 @@ class ChatRoom:
         self.stats['current_users'] = len(self.users)
         self.stats['peak_users'] = max(self.stats['peak_users'], self.stats['current_users'])
         
-        # Send join message
-        join_message = ChatMessage(
-            message_id=str(uuid.uuid4()),
-            user_id=user.user_id,
-            username=user.username,
-            room=self.room_name,
-            content=f"{user.username} joined the room",
-            timestamp=datetime.now(),
-            message_type="join"
-        )
-        
-        self._broadcast_message(join_message)
-        self._broadcast_user_list()
-        
-        print(f"👤 {user.username} joined room '{self.room_name}'")
+        # Send join message; large rooms only publish the presence delta
+        if len(self.users) <= self.large_room_threshold:
+            join_message = ChatMessage(
+                message_id=str(uuid.uuid4()),
+                user_id=user.user_id,
+                username=user.username,
+                room=self.room_name,
+                content=f"{user.username} joined the room",
+                timestamp=datetime.now(),
+                message_type="join"
+            )
+            self._broadcast_message(join_message)
+        self._broadcast_presence(user, "join")
+        
+        if self.verbose:
+            print(f"👤 {user.username} joined room '{self.room_name}'")
         return True
     
     def remove_user(self, user_id: str) -> bool:
@@ -86,21 +164,22 @@ class ChatRoom:
         del self.users[user_id]
         self.stats['current_users'] = len(self.users)
         
-        # Send leave message
-        leave_message = ChatMessage(
-            message_id=str(uuid.uuid4()),
-            user_id=user_id,
-            username=user.username,
-            room=self.room_name,
-            content=f"{user.username} left the room",
-            timestamp=datetime.now(),
-            message_type="leave"
-        )
-        
-        self._broadcast_message(leave_message)
-        self._broadcast_user_list()
-        
-        print(f"👤 {user.username} left room '{self.room_name}'")
+        # Send leave message; large rooms only publish the presence delta
+        if len(self.users) < self.large_room_threshold:
+            leave_message = ChatMessage(
+                message_id=str(uuid.uuid4()),
+                user_id=user_id,
+                username=user.username,
+                room=self.room_name,
+                content=f"{user.username} left the room",
+                timestamp=datetime.now(),
+                message_type="leave"
+            )
+            self._broadcast_message(leave_message)
+        self._broadcast_presence(user, "leave")
+        
+        if self.verbose:
+            print(f"👤 {user.username} left room '{self.room_name}'")
         return True
     
     def send_message(self, user_id: str, content: str) -> bool:
@@ -127,15 +206,13 @@ class ChatRoom:
     
     def _broadcast_message(self, message: ChatMessage):
         """Broadcast message to all users in room"""
+        # Ring buffer drops the oldest message once full
         self.message_history.append(message)
         self.stats['total_messages'] += 1
         
-        # Keep only last 100 messages
-        if len(self.message_history) > 100:
-            self.message_history = self.message_history[-100:]
-        
         # Create STOMP message
         message_data = {
+            'seq': message.seq,
             'message_id': message.message_id,
             'user_id': message.user_id,
             'username': message.username,
@@ -155,24 +232,23 @@ class ChatRoom:
             body=json.dumps(message_data)
         )
         
-        # Simulate sending through broker
+        # One SEND to the room topic; the broker fans out to every member
         if self.broker:
-            self.broker.process_frame("chat_room", send_frame)
+            self.broker.process_frame(self.publisher_id, send_frame)
     
-    def _broadcast_user_list(self):
-        """Broadcast current user list"""
-        user_list = {
-            'type': 'user_list',
+    def _broadcast_presence(self, user: ChatUser, event: str):
+        """Broadcast a join/leave delta rather than the whole user list"""
+        presence = {
+            'type': 'presence',
+            'event': event,
             'room': self.room_name,
-            'users': [
-                {
-                    'user_id': user.user_id,
-                    'username': user.username,
-                    'last_seen': user.last_seen.isoformat(),
-                    'message_count': user.message_count
-                }
-                for user in self.users.values()
-            ],
+            'user': {
+                'user_id': user.user_id,
+                'username': user.username,
+                'last_seen': user.last_seen.isoformat(),
+                'message_count': user.message_count
+            },
+            'user_count': len(self.users),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -182,11 +258,19 @@ class ChatRoom:
                 'destination': self.user_topic,
                 'content-type': 'application/json'
             },
-            body=json.dumps(user_list)
+            body=json.dumps(presence)
         )
         
         if self.broker:
-            self.broker.process_frame("chat_room", send_frame)
+            self.broker.process_frame(self.publisher_id, send_frame)
+    
+    def get_history(self, before: Optional[int] = None, limit: int = 50) -> Tuple[List[ChatMessage], Optional[int]]:
+        """Page backwards through recent messages, e.g. for a late joiner"""
+        return self.message_history.page(before, limit)
+    
+    def get_users(self, offset: int = 0, limit: int = 100) -> List[ChatUser]:
+        """Page through the member list"""
+        return list(itertools.islice(self.users.values(), offset, offset + limit))
     
     def get_stats(self) -> Dict:
         """Get room statistics"""
@@ -196,8 +280,7 @@ class ChatRoom:
             'peak_users': self.stats['peak_users'],
             'total_messages': self.stats['total_messages'],
             'uptime': (datetime.now() - self.stats['created_at']).total_seconds(),
-            'recent_messages': len([m for m in self.message_history 
-                                  if (datetime.now() - m.timestamp).total_seconds() < 300])
+            'recent_messages': self.message_history.count_since(datetime.now() - timedelta(seconds=300))
         }
 
 class ChatApplication:
@@ -246,8 +329,8 @@ class ChatApplication:
         def message_handler(frame: StompFrame):
             try:
                 message_data = json.loads(frame.body)
-                if message_data.get('type') == 'user_list':
-                    print(f"👥 Users in {room_name}: {len(message_data['users'])}")
+                if message_data.get('type') == 'presence':
+                    print(f"👥 Users in {room_name}: {message_data['user_count']}")
                 else:
                     timestamp = datetime.fromisoformat(message_data['timestamp'])
                     print(f"[{timestamp.strftime('%H:%M:%S')}] {message_data['username']}: {message_data['content']}")
@@ -257,9 +340,9 @@ class ChatApplication:
         def user_list_handler(frame: StompFrame):
             try:
                 user_data = json.loads(frame.body)
-                if user_data.get('type') == 'user_list':
-                    usernames = [u['username'] for u in user_data['users']]
-                    print(f"👥 Online users: {', '.join(usernames)}")
+                if user_data.get('type') == 'presence':
+                    action = "joined" if user_data['event'] == 'join' else "left"
+                    print(f"👥 {user_data['user']['username']} {action} ({user_data['user_count']} online)")
             except Exception as e:
                 print(f"❌ Error handling user list: {e}")
         
@@ -303,6 +386,14 @@ class ChatApplication:
         
         return room.send_message(user_id, content)
     
+    def get_room_history(self, room_name: str, before: Optional[int] = None,
+                         limit: int = 50) -> Tuple[List[ChatMessage], Optional[int]]:
+        """Page through a room's recent messages"""
+        if room_name not in self.rooms:
+            return [], None
+        
+        return self.rooms[room_name].get_history(before, limit)
+    
     def get_room_stats(self, room_name: str) -> Optional[Dict]:
         """Get statistics for room"""
         if room_name not in self.rooms:
@@ -392,6 +483,17 @@ def demonstrate_chat_application():
         print(f"   Total users: {app_stats['total_users']}")
         print(f"   Total messages: {app_stats['total_messages']}")
         
+        # Late joiner pages back through the room history
+        print(f"\n📜 Late joiner catching up on 'general'...")
+        eve_id = chat_app.join_room("Eve", "general")
+        page, cursor = chat_app.get_room_history("general", limit=3)
+        while page:
+            print(f"   page: {[f'#{m.seq} {m.username}: {m.content[:24]}' for m in page]}")
+            if cursor is None:
+                break
+            page, cursor = chat_app.get_room_history("general", before=cursor, limit=3)
+        chat_app.leave_room(eve_id)
+        
         # Simulate users leaving
         print(f"\n👋 Users leaving...")
         
@@ -416,12 +518,52 @@ def demonstrate_chat_application():
     finally:
         broker.stop()
     
+    demonstrate_large_room()
+    
     print("\n🎯 STOMP Chat Application demonstrates:")
     print("💡 Real-time messaging with STOMP protocol")
     print("💡 Topic-based chat rooms and user management")
     print("💡 JSON message serialization over STOMP frames")
     print("💡 User presence and activity tracking")
     print("💡 Scalable pub-sub messaging patterns")
+    print("💡 Ring-buffer history with time index and paged catch-up")
+    print("💡 Publish-once room broadcasts fanned out by the broker")
+
+def demonstrate_large_room(member_count: int = 10000, checkpoints=(1000, 5000, 10000)):
+    """Join and broadcast latency as a room grows to member_count"""
+    print(f"\n🏟️  Large room: growing to {member_count:,} members...")
+    
+    broker = StompBroker(verbose=False)
+    room = ChatRoom("stadium", broker, history_size=1000, verbose=False)
+    connect_frame = StompFrame(StompCommand.CONNECT, {'accept-version': '1.2'})
+    
+    join_time = 0.0
+    joins = 0
+    for i in range(1, member_count + 1):
+        member_id = f"fan-{i}"
+        broker.process_frame(member_id, connect_frame)
+        broker.process_frame(member_id, StompFrame(
+            StompCommand.SUBSCRIBE, {'destination': room.topic, 'id': 'room'}))
+        
+        start = time.perf_counter()
+        room.add_user(ChatUser(user_id=member_id, username=f"fan{i}", room="stadium", client=None))
+        join_time += time.perf_counter() - start
+        joins += 1
+        
+        if i in checkpoints:
+            deliveries = broker.stats['deliveries']
+            start = time.perf_counter()
+            room.send_message(member_id, f"Hello from member {i}!")
+            broadcast = time.perf_counter() - start
+            delivered = broker.stats['deliveries'] - deliveries
+            print(f"   {i:>6,} members: join {join_time / joins * 1e6:6.1f}µs avg, "
+                  f"broadcast {broadcast * 1000:6.2f}ms to {delivered:,} "
+                  f"({broadcast / delivered * 1e6:.2f}µs per member)")
+            join_time, joins = 0.0, 0
+    
+    stats = room.get_stats()
+    print(f"   History: {len(room.message_history)} held of {stats['total_messages']} sent, "
+          f"{stats['recent_messages']} in the last 5min")
 
 if __name__ == "__main__":
     demonstrate_chat_application()
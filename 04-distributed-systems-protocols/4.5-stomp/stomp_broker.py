@@ -8,7 +8,9 @@ import time
 import threading
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Optional, Callable, Any
+from typing import Dict, List, Set, Optional, Callable, Any, Union, Hashable, Tuple
+import math
+import re
 import uuid
 from collections import defaultdict, deque
 
@@ -33,53 +35,239 @@ class AckMode(Enum):
     CLIENT = "client"
     CLIENT_INDIVIDUAL = "client-individual"
 
+# STOMP 1.2 header escaping (not applied to CONNECT/CONNECTED frames)
+HEADER_ESCAPES = {'\\': '\\\\', '\r': '\\r', '\n': '\\n', ':': '\\c'}
+HEADER_UNESCAPES = {'\\\\': '\\', '\\r': '\r', '\\n': '\n', '\\c': ':'}
+HEADER_ESCAPE_PATTERN = re.compile(r'[\\\r\n:]')
+HEADER_UNESCAPE_PATTERN = re.compile(r'\\.?')
+
+def escape_header(value: str) -> str:
+    """Escape a header key or value for the wire"""
+    return HEADER_ESCAPE_PATTERN.sub(lambda m: HEADER_ESCAPES[m.group()], value)
+
+def unescape_header(value: str) -> str:
+    """Undo header escaping; undefined escape sequences are a protocol error"""
+    def replace(match):
+        if match.group() not in HEADER_UNESCAPES:
+            raise ValueError(f"Invalid header escape sequence: {match.group()!r}")
+        return HEADER_UNESCAPES[match.group()]
+    return HEADER_UNESCAPE_PATTERN.sub(replace, value)
+
+def _uses_header_escaping(command: 'StompCommand') -> bool:
+    return command not in (StompCommand.CONNECT, StompCommand.CONNECTED)
+
+def _is_text_content(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return True
+    return content_type.startswith('text/') or any(
+        kind in content_type for kind in ('json', 'xml', 'javascript'))
+
 @dataclass
 class StompFrame:
     command: StompCommand
     headers: Dict[str, str] = field(default_factory=dict)
-    body: str = ""
+    body: Union[str, bytes] = ""
+    
+    def body_bytes(self) -> bytes:
+        if isinstance(self.body, bytes):
+            return self.body
+        return self.body.encode('utf-8')
+    
+    def to_bytes(self) -> bytes:
+        """Encode frame to STOMP wire format, adding content-length for bodies"""
+        body = self.body_bytes()
+        headers = self.headers
+        if body and 'content-length' not in headers:
+            headers = {**headers, 'content-length': str(len(body))}
+        
+        if _uses_header_escaping(self.command):
+            header_lines = [f"{escape_header(k)}:{escape_header(str(v))}" for k, v in headers.items()]
+        else:
+            header_lines = [f"{k}:{v}" for k, v in headers.items()]
+        
+        head = "\n".join([self.command.value] + header_lines) + "\n\n"
+        return head.encode('utf-8') + body + b'\x00'
     
     def to_string(self) -> str:
         """Convert frame to STOMP wire format"""
-        lines = [self.command.value]
-        
-        for key, value in self.headers.items():
-            lines.append(f"{key}:{value}")
-        
-        lines.append("")  # Empty line before body
-        lines.append(self.body)
-        
-        return "\n".join(lines) + "\x00"  # NULL terminator
+        return self.to_bytes().decode('utf-8')
     
     @classmethod
     def from_string(cls, data: str) -> 'StompFrame':
         """Parse STOMP frame from wire format"""
-        if data.endswith('\x00'):
-            data = data[:-1]  # Remove NULL terminator
-        
-        lines = data.split('\n')
-        
-        if not lines:
+        if not data.strip('\x00\r\n'):
             raise ValueError("Empty frame")
+        if not data.endswith('\x00'):
+            data += '\x00'
+        
+        frames = StompFrameParser().feed(data.encode('utf-8'))
+        if not frames:
+            # Header block without a terminating blank line
+            frames = StompFrameParser().feed(data[:-1].encode('utf-8') + b'\n\n\x00')
+        return frames[0]
+
+class StompFrameParser:
+    """Incremental STOMP 1.2 frame parser for a byte stream.
+    
+    Bytes from each recv are appended to one reusable buffer. Searches for
+    the header terminator and the NUL octet resume where the previous
+    feed stopped, so no byte is scanned twice. Bodies with a content-length
+    header are read by length and may contain NUL octets.
+    """
+    
+    def __init__(self, max_frame_size: int = 10 * 1024 * 1024):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+        self.frame_start = 0  # Start of the frame being parsed
+        self.scan_offset = 0  # Where the next terminator search resumes
+        
+        # Set once the header block of the current frame is parsed
+        self.command: Optional[StompCommand] = None
+        self.headers: Dict[str, str] = {}
+        self.body_start = 0
+        self.content_length: Optional[int] = None
         
-        command = StompCommand(lines[0])
-        headers = {}
-        body_start = 1
-        
-        # Parse headers
-        for i, line in enumerate(lines[1:], 1):
-            if line == "":  # Empty line indicates start of body
-                body_start = i + 1
+        self.stats = {
+            'frames_parsed': 0,
+            'heartbeats': 0,
+            'bytes_received': 0
+        }
+    
+    def feed(self, data: bytes) -> List[StompFrame]:
+        """Consume bytes and return every frame they complete"""
+        self.buffer += data
+        self.stats['bytes_received'] += len(data)
+        
+        frames = []
+        while True:
+            frame = self._parse_next()
+            if frame is None:
                 break
-            
-            if ":" in line:
-                key, value = line.split(":", 1)
-                headers[key] = value
-        
-        # Parse body
-        body = "\n".join(lines[body_start:]) if body_start < len(lines) else ""
+            frames.append(frame)
+        
+        # Compact once per feed rather than once per frame
+        if self.frame_start:
+            del self.buffer[:self.frame_start]
+            self.scan_offset -= self.frame_start
+            self.body_start -= self.frame_start
+            self.frame_start = 0
+        
+        if len(self.buffer) > self.max_frame_size:
+            raise ValueError(f"Frame exceeds {self.max_frame_size} bytes")
+        return frames
+    
+    def _parse_next(self) -> Optional[StompFrame]:
+        if self.command is None and not self._parse_headers():
+            return None
         
-        return cls(command=command, headers=headers, body=body)
+        if self.content_length is not None:
+            end = self.body_start + self.content_length
+            if len(self.buffer) <= end:
+                return None
+            if self.buffer[end] != 0:
+                raise ValueError("Frame body not followed by NUL octet")
+        else:
+            end = self.buffer.find(b'\x00', max(self.scan_offset, self.body_start))
+            if end < 0:
+                self.scan_offset = len(self.buffer)
+                return None
+        
+        body = bytes(self.buffer[self.body_start:end])
+        frame = StompFrame(self.command, self.headers, self._decode_body(body))
+        
+        self.frame_start = self.scan_offset = end + 1
+        self.command = None
+        self.headers = {}
+        self.stats['frames_parsed'] += 1
+        return frame
+    
+    def _parse_headers(self) -> bool:
+        """Parse the command and headers once the blank line has arrived"""
+        # Heart-beats are bare EOLs between frames
+        while self.frame_start < len(self.buffer):
+            if self.buffer[self.frame_start] == 0x0A:
+                self.frame_start += 1
+            elif self.buffer[self.frame_start:self.frame_start + 2] == b'\r\n':
+                self.frame_start += 2
+            else:
+                break
+            self.stats['heartbeats'] += 1
+        self.scan_offset = max(self.scan_offset, self.frame_start)
+        
+        end = self.buffer.find(b'\n\n', self.scan_offset)
+        # A CRLF terminator only matters if it comes first; don't scan past end
+        crlf_end = self.buffer.find(b'\n\r\n', self.scan_offset,
+                                    end + 1 if end >= 0 else len(self.buffer))
+        if crlf_end >= 0 and (end < 0 or crlf_end < end):
+            end, terminator = crlf_end, 3
+        elif end >= 0:
+            terminator = 2
+        else:
+            # Keep the last two bytes in range in case a terminator straddles feeds
+            self.scan_offset = max(self.frame_start, len(self.buffer) - 2)
+            return False
+        
+        lines = self.buffer[self.frame_start:end].decode('utf-8').split('\n')
+        command = StompCommand(lines[0].rstrip('\r'))
+        escaped = _uses_header_escaping(command)
+        
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            line = line.rstrip('\r')
+            if ':' not in line:
+                continue
+            key, value = line.split(':', 1)
+            if escaped:
+                key, value = unescape_header(key), unescape_header(value)
+            headers.setdefault(key, value)  # First occurrence wins
+        
+        self.command = command
+        self.headers = headers
+        self.body_start = end + terminator
+        self.scan_offset = self.body_start
+        self.content_length = int(headers['content-length']) if 'content-length' in headers else None
+        return True
+    
+    def _decode_body(self, body: bytes) -> Union[str, bytes]:
+        if _is_text_content(self.headers.get('content-type')):
+            try:
+                return body.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+        return body
+
+class EncodedMessage:
+    """A MESSAGE frame serialized once for fan-out.
+    
+    The body and the headers shared by every recipient are encoded a
+    single time; each delivery only adds its subscription and message-id
+    header lines in front, as separate chunks for a gathered write.
+    """
+    
+    __slots__ = ('message_id', 'headers', 'body', 'message_id_line', 'tail')
+    
+    HEAD = b'MESSAGE\n'
+    
+    def __init__(self, message_id: str, headers: Dict[str, str], body: bytes):
+        self.message_id = message_id
+        self.headers = headers
+        self.body = body
+        
+        self.message_id_line = f"message-id:{escape_header(message_id)}\n".encode('utf-8')
+        shared = "".join(f"{escape_header(k)}:{escape_header(str(v))}\n" for k, v in headers.items())
+        self.tail = shared.encode('utf-8') + b'\n' + body + b'\x00'
+    
+    def chunks(self, subscription_line: bytes) -> List[bytes]:
+        """Wire chunks for one subscription (no copying of body or shared headers)"""
+        return [self.HEAD, subscription_line, self.message_id_line, self.tail]
+    
+    def to_frame(self, subscription_id: str) -> StompFrame:
+        """Materialize a StompFrame for in-process listeners"""
+        headers = {'subscription': subscription_id, 'message-id': self.message_id, **self.headers}
+        body = self.body
+        if _is_text_content(headers.get('content-type')):
+            body = body.decode('utf-8')
+        return StompFrame(StompCommand.MESSAGE, headers, body)
 
 @dataclass
 class Subscription:
@@ -87,7 +275,12 @@ class Subscription:
     destination: str
     ack_mode: AckMode
     client_id: str
-    callback: Callable[[StompFrame], None]
+    callback: Optional[Callable[[StompFrame], None]] = None
+    header_line: bytes = b''  # Pre-encoded "subscription:<id>" line
+    
+    def __post_init__(self):
+        if not self.header_line:
+            self.header_line = f"subscription:{escape_header(self.id)}\n".encode('utf-8')
 
 @dataclass
 class Transaction:
@@ -95,16 +288,29 @@ class Transaction:
     client_id: str
     messages: List[StompFrame] = field(default_factory=list)
     receipts: List[str] = field(default_factory=list)
+    size_bytes: int = 0  # Buffered body bytes
 
 class StompClient:
     def __init__(self, client_id: str):
         self.client_id = client_id
         self.connected = False
         self.subscriptions: Dict[str, Subscription] = {}
-        self.pending_acks: Dict[str, StompFrame] = {}
+        self.pending_acks: Dict[str, EncodedMessage] = {}
         self.session = str(uuid.uuid4())
         self.heart_beat = (0, 0)  # (send, receive) intervals in ms
         self.last_activity = time.time()
+        self.last_write = time.time()
+        
+        # Negotiated heart-beat periods in seconds (0 = disabled)
+        self.outgoing_heartbeat = 0.0
+        self.incoming_heartbeat = 0.0
+        
+        # Outgoing frames are queued as chunks and written in batches;
+        # transport receives the chunk list (e.g. a socket writelines)
+        self.transport: Optional[Callable[[List[bytes]], None]] = None
+        self.on_close: Optional[Callable[[], None]] = None  # Called when the broker drops the session
+        self.write_buffer: List[bytes] = []
+        self.write_buffer_bytes = 0
         
         # Statistics
         self.stats = {
@@ -112,13 +318,144 @@ class StompClient:
             'messages_received': 0,
             'subscriptions_count': 0,
             'transactions_count': 0,
-            'connect_time': 0
+            'connect_time': 0,
+            'writes': 0,
+            'bytes_written': 0
         }
+    
+    def queue_write(self, chunks: List[bytes]):
+        """Append frame chunks to the write buffer"""
+        self.write_buffer.extend(chunks)
+        self.write_buffer_bytes += sum(len(chunk) for chunk in chunks)
+    
+    def flush_writes(self):
+        """Hand the whole write buffer to the transport in one call"""
+        if not self.write_buffer:
+            return
+        
+        # Swap first: an in-process transport may queue more writes re-entrantly
+        chunks, size = self.write_buffer, self.write_buffer_bytes
+        self.write_buffer = []
+        self.write_buffer_bytes = 0
+        
+        if self.transport:
+            self.transport(chunks)
+        self.last_write = time.time()
+        self.stats['writes'] += 1
+        self.stats['bytes_written'] += size
+
+class TimingWheel:
+    """Hierarchical timing wheel for per-connection deadlines.
+    
+    Level 0 has one slot per tick; each slot of a higher level spans a
+    full turn of the level below. Scheduling and cancelling are O(1) dict
+    operations, and advancing one tick only touches the timers in the
+    current slot plus those cascading down from a coarser level.
+    """
+    
+    def __init__(self, tick: float = 0.1, slots: int = 64, levels: int = 4,
+                 start: Optional[float] = None):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.span = slots ** levels  # Ticks covered before clamping to the top level
+        self.current_tick = int((time.time() if start is None else start) / tick)
+        
+        self.wheels: List[List[Dict[Hashable, int]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self.timers: Dict[Hashable, Tuple[int, int]] = {}  # key -> (level, slot)
+        
+        self.stats = {'scheduled': 0, 'cancelled': 0, 'expired': 0, 'cascaded': 0}
+    
+    def __len__(self) -> int:
+        return len(self.timers)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.timers
+    
+    def schedule(self, key: Hashable, deadline: float):
+        """Arm (or re-arm) the timer for key to fire at deadline seconds"""
+        self.cancel(key)
+        expiry = max(math.ceil(deadline / self.tick), self.current_tick + 1)
+        self._place(key, expiry)
+        self.stats['scheduled'] += 1
+    
+    def cancel(self, key: Hashable) -> bool:
+        """Disarm the timer for key, if any"""
+        location = self.timers.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        del self.wheels[level][slot][key]
+        self.stats['cancelled'] += 1
+        return True
+    
+    def advance(self, now: float) -> List[Hashable]:
+        """Turn the wheel up to now and return the keys whose deadline passed"""
+        target = int(now / self.tick)
+        expired = []
+        while self.current_tick < target:
+            self.current_tick += 1
+            self._cascade()
+            
+            bucket = self.wheels[0][self.current_tick & self.mask]
+            if bucket:
+                for key in bucket:
+                    del self.timers[key]
+                expired.extend(bucket)
+                bucket.clear()
+        
+        self.stats['expired'] += len(expired)
+        return expired
+    
+    def _place(self, key: Hashable, expiry: int):
+        delta = min(expiry - self.current_tick, self.span - 1)
+        level = 0
+        while level < self.levels - 1 and delta >= 1 << (self.bits * (level + 1)):
+            level += 1
+        if delta == self.span - 1:
+            # Beyond the wheel's range: park in the top level, re-placed on cascade
+            slot = ((self.current_tick + delta) >> (self.bits * level)) & self.mask
+        else:
+            slot = (max(expiry, self.current_tick) >> (self.bits * level)) & self.mask
+        self.wheels[level][slot][key] = expiry
+        self.timers[key] = (level, slot)
+    
+    def _cascade(self):
+        """Move timers from coarser levels down as their slot comes due"""
+        top = 0
+        while (top + 1 < self.levels and
+               self.current_tick & ((1 << (self.bits * (top + 1))) - 1) == 0):
+            top += 1
+        
+        for level in range(top, 0, -1):
+            slot = (self.current_tick >> (self.bits * level)) & self.mask
+            bucket = self.wheels[level][slot]
+            if not bucket:
+                continue
+            self.wheels[level][slot] = {}
+            for key, expiry in bucket.items():
+                self._place(key, expiry)
+            self.stats['cascaded'] += len(bucket)
 
 class StompBroker:
-    def __init__(self, host: str = "localhost", port: int = 61613):
+    def __init__(self, host: str = "localhost", port: int = 61613,
+                 flush_threshold: int = 64 * 1024, verbose: bool = True,
+                 heart_beat: Tuple[int, int] = (10000, 10000), heartbeat_tick: float = 0.1,
+                 max_transaction_frames: int = 10000, max_transaction_bytes: int = 16 * 1024 * 1024):
         self.host = host
         self.port = port
+        self.max_transaction_frames = max_transaction_frames  # SEND frames buffered per transaction
+        self.max_transaction_bytes = max_transaction_bytes  # Body bytes buffered per transaction
+        self.heart_beat = heart_beat  # Server (send, receive) intervals in ms
+        self.heartbeat_grace = 2.0  # Missed-heartbeat tolerance as a multiple of the period
+        self.flush_threshold = flush_threshold  # Flush a client early past this many bytes
+        self.verbose = verbose  # Per-client/per-message logging; disable for benchmarks
         
         # Client management
         self.clients: Dict[str, StompClient] = {}
@@ -128,18 +465,27 @@ class StompBroker:
         # Message storage
         self.message_queue: Dict[str, deque] = defaultdict(deque)
         self.message_id_counter = 1
+        self._dirty_clients: Set[str] = set()  # Clients with unflushed writes
+        
+        # Heart-beat deadlines keyed by (client_id, 'send' | 'receive')
+        self.heartbeat_wheel = TimingWheel(tick=heartbeat_tick)
         
         # Statistics
         self.stats = {
             'total_connections': 0,
             'active_connections': 0,
             'messages_processed': 0,
+            'messages_encoded': 0,
+            'deliveries': 0,
             'destinations_count': 0,
+            'heartbeats_sent': 0,
+            'heartbeat_timeouts': 0,
+            'transactions_rejected': 0,
             'start_time': time.time()
         }
         
         self.running = False
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()  # Re-entrant: in-process subscribers may reply from callbacks
     
     def start(self):
         """Start the STOMP broker"""
@@ -155,28 +501,44 @@ class StompBroker:
     def process_frame(self, client_id: str, frame: StompFrame) -> Optional[StompFrame]:
         """Process incoming STOMP frame"""
         with self._lock:
-            if frame.command == StompCommand.CONNECT:
-                return self._handle_connect(client_id, frame)
-            elif frame.command == StompCommand.SEND:
-                return self._handle_send(client_id, frame)
-            elif frame.command == StompCommand.SUBSCRIBE:
-                return self._handle_subscribe(client_id, frame)
-            elif frame.command == StompCommand.UNSUBSCRIBE:
-                return self._handle_unsubscribe(client_id, frame)
-            elif frame.command == StompCommand.ACK:
-                return self._handle_ack(client_id, frame)
-            elif frame.command == StompCommand.NACK:
-                return self._handle_nack(client_id, frame)
-            elif frame.command == StompCommand.BEGIN:
-                return self._handle_begin(client_id, frame)
-            elif frame.command == StompCommand.COMMIT:
-                return self._handle_commit(client_id, frame)
-            elif frame.command == StompCommand.ABORT:
-                return self._handle_abort(client_id, frame)
-            elif frame.command == StompCommand.DISCONNECT:
-                return self._handle_disconnect(client_id, frame)
-            else:
-                return self._create_error_frame(f"Unknown command: {frame.command}")
+            client = self.clients.get(client_id)
+            if client:
+                client.last_activity = time.time()
+            try:
+                return self._dispatch_frame(client_id, frame)
+            finally:
+                self._flush_writes()
+    
+    def record_heartbeat(self, client_id: str):
+        """Note a heart-beat EOL received from a client"""
+        client = self.clients.get(client_id)
+        if client:
+            client.last_activity = time.time()
+    
+    def _dispatch_frame(self, client_id: str, frame: StompFrame) -> Optional[StompFrame]:
+        """Route frame to its command handler"""
+        if frame.command == StompCommand.CONNECT:
+            return self._handle_connect(client_id, frame)
+        elif frame.command == StompCommand.SEND:
+            return self._handle_send(client_id, frame)
+        elif frame.command == StompCommand.SUBSCRIBE:
+            return self._handle_subscribe(client_id, frame)
+        elif frame.command == StompCommand.UNSUBSCRIBE:
+            return self._handle_unsubscribe(client_id, frame)
+        elif frame.command == StompCommand.ACK:
+            return self._handle_ack(client_id, frame)
+        elif frame.command == StompCommand.NACK:
+            return self._handle_nack(client_id, frame)
+        elif frame.command == StompCommand.BEGIN:
+            return self._handle_begin(client_id, frame)
+        elif frame.command == StompCommand.COMMIT:
+            return self._handle_commit(client_id, frame)
+        elif frame.command == StompCommand.ABORT:
+            return self._handle_abort(client_id, frame)
+        elif frame.command == StompCommand.DISCONNECT:
+            return self._handle_disconnect(client_id, frame)
+        else:
+            return self._create_error_frame(f"Unknown command: {frame.command}")
     
     def _handle_connect(self, client_id: str, frame: StompFrame) -> StompFrame:
         """Handle CONNECT frame"""
@@ -186,6 +548,8 @@ class StompBroker:
             self.stats['total_connections'] += 1
         
         client = self.clients[client_id]
+        if not client.connected:
+            self.stats['active_connections'] += 1
         client.connected = True
         client.stats['connect_time'] = time.time()
         
@@ -196,17 +560,17 @@ class StompBroker:
                 client.heart_beat = (send_interval, receive_interval)
             except ValueError:
                 pass
+        self._negotiate_heartbeat(client)
         
-        self.stats['active_connections'] = sum(1 for c in self.clients.values() if c.connected)
-        
-        print(f"🔌 Client '{client_id}' connected")
+        if self.verbose:
+            print(f"🔌 Client '{client_id}' connected")
         
         # Send CONNECTED frame
         response_headers = {
             'version': '1.2',
             'session': client.session,
             'server': 'STOMP-Broker/1.0',
-            'heart-beat': '10000,10000'  # 10 second intervals
+            'heart-beat': f"{self.heart_beat[0]},{self.heart_beat[1]}"
         }
         
         return StompFrame(StompCommand.CONNECTED, response_headers)
@@ -226,9 +590,21 @@ class StompBroker:
             if transaction_id not in self.transactions:
                 return self._create_error_frame(f"Unknown transaction: {transaction_id}")
             
-            # Add to transaction
-            self.transactions[transaction_id].messages.append(frame)
-            print(f"📝 Message added to transaction '{transaction_id}'")
+            # Add to transaction, aborting it whole if it outgrows its limits
+            transaction = self.transactions[transaction_id]
+            size = len(frame.body_bytes())
+            if (len(transaction.messages) >= self.max_transaction_frames or
+                    transaction.size_bytes + size > self.max_transaction_bytes):
+                del self.transactions[transaction_id]
+                self.stats['transactions_rejected'] += 1
+                return self._create_error_frame(
+                    f"Transaction '{transaction_id}' exceeds {self.max_transaction_frames} frames "
+                    f"or {self.max_transaction_bytes} bytes; aborted")
+            
+            transaction.messages.append(frame)
+            transaction.size_bytes += size
+            if self.verbose:
+                print(f"📝 Message added to transaction '{transaction_id}'")
             return None
         
         # Send message immediately
@@ -248,16 +624,12 @@ class StompBroker:
         
         client = self.clients[client_id]
         
-        # Create subscription
-        def message_callback(message_frame: StompFrame):
-            self._send_message_to_client(client_id, message_frame)
-        
+        # Create subscription; deliveries go to the client's write buffer
         subscription = Subscription(
             id=subscription_id,
             destination=destination,
             ack_mode=ack_mode,
-            client_id=client_id,
-            callback=message_callback
+            client_id=client_id
         )
         
         # Add to client and destination
@@ -267,7 +639,8 @@ class StompBroker:
         client.stats['subscriptions_count'] = len(client.subscriptions)
         self.stats['destinations_count'] = len(self.destinations)
         
-        print(f"📝 Client '{client_id}' subscribed to '{destination}' (id: {subscription_id})")
+        if self.verbose:
+            print(f"📝 Client '{client_id}' subscribed to '{destination}' (id: {subscription_id})")
         
         # Send receipt if requested
         if 'receipt' in frame.headers:
@@ -362,7 +735,8 @@ class StompBroker:
         client = self.clients[client_id]
         client.stats['transactions_count'] += 1
         
-        print(f"🔄 Transaction '{transaction_id}' started for client '{client_id}'")
+        if self.verbose:
+            print(f"🔄 Transaction '{transaction_id}' started for client '{client_id}'")
         
         # Send receipt if requested
         if 'receipt' in frame.headers:
@@ -387,14 +761,18 @@ class StompBroker:
         if transaction.client_id != client_id:
             return self._create_error_frame("Transaction belongs to different client")
         
-        # Commit all messages in transaction
+        # Commit in one pass per destination; order is kept within each destination
+        by_destination: Dict[str, List[StompFrame]] = defaultdict(list)
         for message_frame in transaction.messages:
-            self._deliver_message(client_id, message_frame)
+            by_destination[message_frame.headers['destination']].append(message_frame)
+        for destination, frames in by_destination.items():
+            self._fan_out(client_id, destination, frames)
         
         # Clean up transaction
         del self.transactions[transaction_id]
         
-        print(f"✅ Transaction '{transaction_id}' committed ({len(transaction.messages)} messages)")
+        if self.verbose:
+            print(f"✅ Transaction '{transaction_id}' committed ({len(transaction.messages)} messages)")
         
         # Send receipt if requested
         if 'receipt' in frame.headers:
@@ -423,7 +801,8 @@ class StompBroker:
         message_count = len(transaction.messages)
         del self.transactions[transaction_id]
         
-        print(f"❌ Transaction '{transaction_id}' aborted ({message_count} messages discarded)")
+        if self.verbose:
+            print(f"❌ Transaction '{transaction_id}' aborted ({message_count} messages discarded)")
         
         # Send receipt if requested
         if 'receipt' in frame.headers:
@@ -435,7 +814,11 @@ class StompBroker:
         """Handle DISCONNECT frame"""
         if client_id in self.clients:
             client = self.clients[client_id]
+            if client.connected:
+                self.stats['active_connections'] -= 1
             client.connected = False
+            self.heartbeat_wheel.cancel((client_id, 'send'))
+            self.heartbeat_wheel.cancel((client_id, 'receive'))
             
             # Clean up subscriptions
             for subscription in client.subscriptions.values():
@@ -444,9 +827,10 @@ class StompBroker:
                     if sub.client_id != client_id
                 ]
             
-            self.stats['active_connections'] = sum(1 for c in self.clients.values() if c.connected)
-            
-            print(f"🔌 Client '{client_id}' disconnected")
+            if self.verbose:
+                print(f"🔌 Client '{client_id}' disconnected")
+            if client.on_close:
+                client.on_close()
         
         # Send receipt if requested
         if 'receipt' in frame.headers:
@@ -460,69 +844,90 @@ class StompBroker:
         if not destination:
             return self._create_error_frame("Missing destination")
         
-        subscribers = self.destinations.get(destination, [])
+        self._fan_out(sender_id, destination, [frame])
         
-        if not subscribers:
-            print(f"⚠️  No subscribers for destination '{destination}'")
-            return None
+        # Send receipt if requested
+        if 'receipt' in frame.headers:
+            return StompFrame(StompCommand.RECEIPT, {'receipt-id': frame.headers['receipt']})
         
-        # Create message frame
+        return None
+    
+    def _encode_message(self, destination: str, frame: StompFrame) -> EncodedMessage:
+        """Assign a message-id and serialize a SEND frame as a MESSAGE"""
         message_id = str(self.message_id_counter)
         self.message_id_counter += 1
         
+        body = frame.body_bytes()
         message_headers = {
             'destination': destination,
-            'message-id': message_id,
-            'subscription': '',  # Will be set per subscriber
             'content-type': frame.headers.get('content-type', 'text/plain'),
-            'content-length': str(len(frame.body.encode('utf-8')))
+            'content-length': str(len(body))
         }
         
         # Copy custom headers
         for key, value in frame.headers.items():
-            if key not in ['destination', 'transaction']:
+            if key not in ['destination', 'transaction', 'receipt', 'content-length']:
                 message_headers[key] = value
         
+        # Serialize once; each subscription only splices in its own header lines
+        self.stats['messages_encoded'] += 1
+        return EncodedMessage(message_id, message_headers, body)
+    
+    def _fan_out(self, sender_id: str, destination: str, frames: List[StompFrame]) -> int:
+        """Deliver frames bound for one destination with a single subscriber pass"""
+        subscribers = self.destinations.get(destination, [])
+        
+        if not subscribers:
+            if self.verbose:
+                print(f"⚠️  No subscribers for destination '{destination}'")
+            return 0
+        
+        messages = [self._encode_message(destination, frame) for frame in frames]
+        
         delivered = 0
         for subscription in subscribers:
             # Skip sender if it's the same client
             if subscription.client_id == sender_id:
                 continue
             
-            # Set subscription-specific headers
-            message_headers['subscription'] = subscription.id
-            
-            message_frame = StompFrame(
-                command=StompCommand.MESSAGE,
-                headers=message_headers.copy(),
-                body=frame.body
-            )
+            client = self.clients[subscription.client_id]
             
-            # Handle acknowledgment mode
-            if subscription.ack_mode != AckMode.AUTO:
-                client = self.clients[subscription.client_id]
-                client.pending_acks[message_id] = message_frame
+            for encoded in messages:
+                # Handle acknowledgment mode
+                if subscription.ack_mode != AckMode.AUTO:
+                    client.pending_acks[encoded.message_id] = encoded
+                
+                # Queue for the client's next batched write
+                client.queue_write(encoded.chunks(subscription.header_line))
+                
+                if subscription.callback:
+                    subscription.callback(encoded.to_frame(subscription.id))
             
-            # Deliver message
-            subscription.callback(message_frame)
-            delivered += 1
-        
-        self.stats['messages_processed'] += 1
+            client.stats['messages_received'] += len(messages)
+            if client.write_buffer_bytes >= self.flush_threshold:
+                client.flush_writes()
+            else:
+                self._dirty_clients.add(subscription.client_id)
+            delivered += len(messages)
         
-        print(f"📤 Message delivered to {delivered} subscribers on '{destination}'")
+        self.stats['messages_processed'] += len(messages)
+        self.stats['deliveries'] += delivered
         
-        # Send receipt if requested
-        if 'receipt' in frame.headers:
-            return StompFrame(StompCommand.RECEIPT, {'receipt-id': frame.headers['receipt']})
+        if self.verbose:
+            if len(messages) == 1:
+                print(f"📤 Message delivered to {delivered} subscribers on '{destination}'")
+            else:
+                print(f"📤 {len(messages)} messages delivered ({delivered} deliveries) on '{destination}'")
         
-        return None
+        return delivered
     
-    def _send_message_to_client(self, client_id: str, message_frame: StompFrame):
-        """Send message frame to specific client"""
-        if client_id in self.clients:
-            client = self.clients[client_id]
-            client.stats['messages_received'] += 1
-            print(f"📨 Sent message to client '{client_id}': {message_frame.headers.get('destination')}")
+    def _flush_writes(self):
+        """Flush every client written to while processing the current frame"""
+        dirty, self._dirty_clients = self._dirty_clients, set()
+        for client_id in dirty:
+            client = self.clients.get(client_id)
+            if client:
+                client.flush_writes()
     
     def _create_error_frame(self, message: str) -> StompFrame:
         """Create ERROR frame"""
@@ -532,26 +937,68 @@ class StompBroker:
             body=message
         )
     
+    def _negotiate_heartbeat(self, client: StompClient):
+        """Agree heart-beat periods with the client and arm its timers"""
+        client_send, client_receive = client.heart_beat
+        server_send, server_receive = self.heart_beat
+        
+        # Each direction runs at the slower of what one side offers and the other wants
+        client.outgoing_heartbeat = (max(server_send, client_receive) / 1000.0
+                                     if server_send and client_receive else 0.0)
+        client.incoming_heartbeat = (max(client_send, server_receive) / 1000.0
+                                     if client_send and server_receive else 0.0)
+        
+        now = time.time()
+        client.last_activity = now
+        client.last_write = now
+        self.heartbeat_wheel.cancel((client.client_id, 'send'))
+        self.heartbeat_wheel.cancel((client.client_id, 'receive'))
+        if client.outgoing_heartbeat:
+            self.heartbeat_wheel.schedule((client.client_id, 'send'), now + client.outgoing_heartbeat)
+        if client.incoming_heartbeat:
+            self.heartbeat_wheel.schedule((client.client_id, 'receive'),
+                                          now + client.incoming_heartbeat * self.heartbeat_grace)
+    
+    def _process_heartbeats(self, now: float):
+        """Handle the heart-beat timers that expired up to now.
+        
+        Activity only stamps last_activity/last_write; a timer that fires
+        early because of later traffic is simply re-armed from that stamp.
+        """
+        for client_id, kind in self.heartbeat_wheel.advance(now):
+            client = self.clients.get(client_id)
+            if not client or not client.connected:
+                continue
+            
+            if kind == 'receive':
+                deadline = client.last_activity + client.incoming_heartbeat * self.heartbeat_grace
+                if deadline > now:
+                    self.heartbeat_wheel.schedule((client_id, 'receive'), deadline)
+                    continue
+                self.stats['heartbeat_timeouts'] += 1
+                if self.verbose:
+                    print(f"💔 Client '{client_id}' heartbeat timeout")
+                self._handle_disconnect(client_id, StompFrame(StompCommand.DISCONNECT))
+            else:
+                deadline = client.last_write + client.outgoing_heartbeat
+                if deadline <= now:
+                    client.queue_write([b'\n'])
+                    client.flush_writes()
+                    self.stats['heartbeats_sent'] += 1
+                    deadline = now + client.outgoing_heartbeat
+                self.heartbeat_wheel.schedule((client_id, 'send'), deadline)
+    
+    def tick_heartbeats(self, now: Optional[float] = None):
+        """Advance heart-beat timers; called once per wheel tick"""
+        with self._lock:
+            self._process_heartbeats(time.time() if now is None else now)
+    
     def _heartbeat_loop(self):
-        """Heartbeat monitoring loop"""
+        """Heartbeat loop: turn the timing wheel once per tick"""
         while self.running:
             try:
-                current_time = time.time()
-                
-                # Check for inactive clients
-                inactive_clients = []
-                for client_id, client in self.clients.items():
-                    if client.connected and client.heart_beat[1] > 0:
-                        timeout = client.heart_beat[1] / 1000.0 * 2  # 2x receive interval
-                        if current_time - client.last_activity > timeout:
-                            inactive_clients.append(client_id)
-                
-                # Disconnect inactive clients
-                for client_id in inactive_clients:
-                    print(f"💔 Client '{client_id}' heartbeat timeout")
-                    self._handle_disconnect(client_id, StompFrame(StompCommand.DISCONNECT))
-                
-                time.sleep(5)  # Check every 5 seconds
+                time.sleep(self.heartbeat_wheel.tick)
+                self.tick_heartbeats()
             except Exception as e:
                 print(f"❌ Heartbeat loop error: {e}")
     
@@ -656,8 +1103,70 @@ def demonstrate_stomp_broker():
         )
         broker.process_frame("producer_client", commit_frame)
         
+        # Parse a byte stream split at arbitrary recv boundaries
+        print(f"\n🧩 Parsing a fragmented byte stream...")
+        wire = (
+            StompFrame(StompCommand.SEND, {'destination': '/topic/chat'}, 'Hi: there').to_bytes() +
+            b'\n' +  # Heart-beat EOL between frames
+            StompFrame(StompCommand.SEND, {'destination': '/queue/blobs',
+                                           'content-type': 'application/octet-stream'},
+                       b'\x89PNG\x00\x00\x00\x0dIHDR').to_bytes()
+        )
+        parser = StompFrameParser()
+        parsed = []
+        for i in range(0, len(wire), 7):
+            parsed.extend(parser.feed(wire[i:i + 7]))
+        for parsed_frame in parsed:
+            print(f"   {parsed_frame.command.value} {parsed_frame.headers['destination']} "
+                  f"body={parsed_frame.body!r}")
+        print(f"   {parser.stats['frames_parsed']} frames, {parser.stats['heartbeats']} heart-beat(s) "
+              f"from {parser.stats['bytes_received']} bytes in 7-byte reads")
+        
         time.sleep(1)  # Let messages process
         
+        # Large topic fan-out: one encode, per-subscriber header splice
+        print(f"\n📡 Topic fan-out to 5000 subscribers...")
+        fanout_broker = StompBroker(verbose=False)
+        for i in range(5000):
+            fanout_broker.process_frame(f"viewer-{i}", connect_frame)
+            fanout_broker.process_frame(f"viewer-{i}", StompFrame(
+                StompCommand.SUBSCRIBE, {'destination': '/topic/prices', 'id': f"sub-{i}"}))
+        fanout_broker.process_frame("ticker", connect_frame)
+        
+        start = time.perf_counter()
+        for tick in range(10):
+            fanout_broker.process_frame("ticker", StompFrame(
+                StompCommand.SEND, {'destination': '/topic/prices', 'content-type': 'application/json'},
+                f'{{"symbol": "ACME", "price": {100 + tick}}}'))
+        elapsed = time.perf_counter() - start
+        
+        fanout_stats = fanout_broker.stats
+        sample_client = fanout_broker.clients['viewer-0']
+        print(f"   {fanout_stats['deliveries']} deliveries from {fanout_stats['messages_encoded']} "
+              f"encodes in {elapsed * 1000:.1f}ms")
+        print(f"   viewer-0: {sample_client.stats['messages_received']} messages in "
+              f"{sample_client.stats['writes']} writes ({sample_client.stats['bytes_written']} bytes)")
+        
+        # Heart-beat timeouts driven by the timing wheel
+        print(f"\n💓 Heart-beating 2000 connections on a timing wheel...")
+        hb_broker = StompBroker(verbose=False, heart_beat=(0, 200))
+        hb_broker.start()
+        hb_connect = StompFrame(StompCommand.CONNECT, {'accept-version': '1.2', 'heart-beat': '200,0'})
+        for i in range(2000):
+            hb_broker.process_frame(f"device-{i}", hb_connect)
+        
+        for _ in range(8):  # Only even-numbered devices keep beating
+            time.sleep(0.1)
+            for i in range(0, 2000, 2):
+                hb_broker.record_heartbeat(f"device-{i}")
+        hb_broker.stop()
+        
+        wheel_stats = hb_broker.heartbeat_wheel.stats
+        print(f"   {hb_broker.stats['heartbeat_timeouts']} silent devices timed out, "
+              f"{hb_broker.stats['active_connections']} still connected")
+        print(f"   wheel: {wheel_stats['expired']} expirations, {wheel_stats['scheduled']} (re)schedules, "
+              f"{len(hb_broker.heartbeat_wheel)} armed timers")
+        
         # Display statistics
         print(f"\n📊 Broker Statistics:")
         stats = broker.get_broker_stats()
@@ -680,6 +1189,9 @@ def demonstrate_stomp_broker():
     print("💡 Topic and queue destination types")
     print("💡 Transaction support for atomic operations")
     print("💡 Multiple acknowledgment modes")
+    print("💡 Incremental byte-level frame parsing with content-length")
+    print("💡 Serialize-once topic fan-out with batched client writes")
+    print("💡 Negotiated heart-beats tracked on a hierarchical timing wheel")
 
 if __name__ == "__main__":
     demonstrate_stomp_broker()
@@ -12,7 +12,7 @@ from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Callable, Any
 import json
 
-from stomp_broker import StompFrame, StompCommand, AckMode
+from stomp_broker import StompFrame, StompCommand, AckMode, StompFrameParser
 
 @dataclass
 class StompClientConfig:
@@ -66,6 +66,7 @@ class StompClient:
         
         # Simulated broker for demonstration
         self._broker = None
+        self._parser = StompFrameParser()  # Decodes MESSAGE frames the broker writes to us
         self._client_id = f"client_{uuid.uuid4().hex[:8]}"
     
     def connect(self, broker=None) -> bool:
@@ -96,6 +97,7 @@ class StompClient:
                 response = self._broker.process_frame(self._client_id, connect_frame)
                 if response and response.command == StompCommand.CONNECTED:
                     self._handle_connected(response)
+                    self._attach_transport()
                     return True
                 else:
                     self.state = ConnectionState.DISCONNECTED
@@ -128,7 +130,9 @@ class StompClient:
             
             # Send to broker
             if self._broker:
-                self._broker.process_frame(self._client_id, disconnect_frame)
+                response = self._broker.process_frame(self._client_id, disconnect_frame)
+                if response and response.command == StompCommand.RECEIPT:
+                    self._handle_receipt(response)
             
             # Wait for receipt if requested
             if receipt and receipt_id in self.pending_receipts:
@@ -431,6 +435,12 @@ class StompClient:
         """Setup receipt waiting mechanism"""
         self.pending_receipts[receipt_id] = threading.Event()
     
+    def _handle_receipt(self, frame: StompFrame):
+        """Release whoever is waiting on this receipt"""
+        event = self.pending_receipts.get(frame.headers.get('receipt-id', ''))
+        if event:
+            event.set()
+    
     def _cleanup_connection(self):
         """Clean up connection state"""
         self.state = ConnectionState.DISCONNECTED
@@ -466,6 +476,30 @@ class StompClient:
                 self.stats['heartbeats_sent'] += 1
                 self.stats['last_activity'] = time.time()
     
+    def _attach_transport(self):
+        """Receive broker deliveries through our session's write path"""
+        session = getattr(self._broker, 'clients', {}).get(self._client_id)
+        if session:
+            session.transport = self._receive_chunks
+    
+    def _receive_chunks(self, chunks: List[bytes]):
+        for frame in self._parser.feed(b''.join(chunks)):
+            if frame.command == StompCommand.MESSAGE:
+                self._handle_message(frame)
+    
+    def _handle_message(self, frame: StompFrame):
+        """Dispatch a MESSAGE frame to its subscription's callback"""
+        with self._lock:
+            subscription = self.subscriptions.get(frame.headers.get('subscription', ''))
+            if not subscription:
+                return
+            if subscription['ack_mode'] != AckMode.AUTO:
+                self.pending_acks[frame.headers['message-id']] = frame
+        
+        subscription['callback'](frame)
+        self.stats['messages_received'] += 1
+        self.stats['last_activity'] = time.time()
+    
     def simulate_message_received(self, destination: str, body: str, headers: Optional[Dict[str, str]] = None):
         """Simulate receiving a message (for demonstration)"""
         message_headers = {
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+STOMP TCP Server
+asyncio network front-end running StompBroker on a single event loop.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from stomp_broker import StompBroker, StompFrame, StompFrameParser, StompCommand
+
+class StompServerProtocol(asyncio.Protocol):
+    """One client connection: frame parsing, coalesced writes and backpressure.
+    
+    Frames written for this connection during one event-loop iteration are
+    gathered and handed to the socket with a single writelines. When the
+    socket's write buffer passes the high watermark the connection stops
+    writing and reading until it drains below the low watermark; a consumer
+    that falls further behind than max_pending_bytes is disconnected.
+    """
+    
+    def __init__(self, server: 'StompServer', client_id: str):
+        self.server = server
+        self.broker = server.broker
+        self.client_id = client_id
+        self.parser = StompFrameParser()
+        self.transport: Optional[asyncio.Transport] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread = 0
+        
+        self.pending: List[bytes] = []
+        self.pending_bytes = 0
+        self.flush_scheduled = False
+        self.paused = False
+        self.closing = False
+        
+        self.stats = {
+            'frames_received': 0,
+            'writes': 0,
+            'bytes_written': 0,
+            'chunks_written': 0,
+            'pauses': 0
+        }
+    
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        transport.set_write_buffer_limits(high=self.server.high_water, low=self.server.low_water)
+        self.server.connections[self.client_id] = self
+    
+    def data_received(self, data: bytes):
+        if self.closing:
+            return
+        # Any bytes from the peer, heart-beat EOLs included, count as activity
+        self.broker.record_heartbeat(self.client_id)
+        try:
+            frames = self.parser.feed(data)
+        except ValueError as e:
+            self._fail(f"Malformed frame: {e}")
+            return
+        
+        for frame in frames:
+            self.stats['frames_received'] += 1
+            response = self.broker.process_frame(self.client_id, frame)
+            
+            if frame.command == StompCommand.CONNECT and self.client_id in self.broker.clients:
+                client = self.broker.clients[self.client_id]
+                client.transport = self.write_chunks
+                client.on_close = self.close_after_flush
+            if response:
+                self.write_chunks([response.to_bytes()])
+            if self.closing:
+                break
+    
+    def write_chunks(self, chunks: List[bytes]):
+        """Queue frame chunks; everything queued this iteration goes out in one writelines"""
+        if threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self.write_chunks, chunks)
+            return
+        if self.transport is None or self.transport.is_closing():
+            return
+        if self.closing and self.paused:
+            return  # Being dropped; nothing more will be written
+        
+        self.pending.extend(chunks)
+        self.pending_bytes += sum(len(chunk) for chunk in chunks)
+        
+        if self.paused:
+            if self.pending_bytes > self.server.max_pending_bytes:
+                self.server.stats['slow_consumers_dropped'] += 1
+                self._fail("Slow consumer: too many pending frames")
+            return
+        self._schedule_flush()
+    
+    def close_after_flush(self):
+        """Close once queued frames (e.g. a RECEIPT) have been written"""
+        self.closing = True
+        self._schedule_flush()
+    
+    def _schedule_flush(self):
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_soon(self._flush)
+    
+    def _flush(self):
+        self.flush_scheduled = False
+        if self.transport is None or self.transport.is_closing():
+            return
+        
+        if self.pending and not self.paused:
+            self.transport.writelines(self.pending)
+            self.stats['writes'] += 1
+            self.stats['chunks_written'] += len(self.pending)
+            self.stats['bytes_written'] += self.pending_bytes
+            self.pending = []
+            self.pending_bytes = 0
+        
+        if self.closing and not self.pending:
+            self.transport.close()
+    
+    def pause_writing(self):
+        # Write buffer above the high watermark: hold frames and stop taking new work
+        self.paused = True
+        self.stats['pauses'] += 1
+        self.server.stats['pauses'] += 1
+        if not self.closing:
+            self.transport.pause_reading()
+    
+    def resume_writing(self):
+        self.paused = False
+        if not self.closing:
+            self.transport.resume_reading()
+        if self.pending or self.closing:
+            self._schedule_flush()
+    
+    def connection_lost(self, exc: Optional[Exception]):
+        self.server.connections.pop(self.client_id, None)
+        self.pending = []
+        self.pending_bytes = 0
+        client = self.broker.clients.get(self.client_id)
+        if client:
+            client.transport = None
+            client.on_close = None
+            if client.connected:
+                self.broker.process_frame(self.client_id, StompFrame(StompCommand.DISCONNECT))
+    
+    def _fail(self, message: str):
+        """Send an ERROR frame and drop the connection"""
+        if self.server.verbose:
+            print(f"❌ {self.client_id}: {message}")
+        self.closing = True
+        self.pending = []
+        self.pending_bytes = 0
+        error = StompFrame(StompCommand.ERROR, {'message': message}, message)
+        self.transport.write(error.to_bytes())
+        if self.paused:
+            self.transport.abort()  # The ERROR frame cannot get past the backlog
+        else:
+            self.transport.close()
+
+class StompServer:
+    """asyncio TCP listener in front of a StompBroker"""
+    
+    def __init__(self, broker: StompBroker, host: Optional[str] = None, port: Optional[int] = None,
+                 high_water: int = 256 * 1024, low_water: int = 64 * 1024,
+                 max_pending_bytes: int = 8 * 1024 * 1024, verbose: bool = True):
+        self.broker = broker
+        self.host = host or broker.host
+        self.port = broker.port if port is None else port
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_pending_bytes = max_pending_bytes  # Held frames before a paused consumer is dropped
+        self.verbose = verbose
+        
+        self.connections: Dict[str, StompServerProtocol] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._ids = itertools.count(1)
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        
+        self.stats = {
+            'connections_accepted': 0,
+            'pauses': 0,
+            'slow_consumers_dropped': 0
+        }
+    
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(self._create_protocol, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        # Heart-beats run on the loop too, so broker state has a single writer
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        if self.verbose:
+            print(f"🔌 STOMP server listening on {self.host}:{self.port}")
+    
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for connection in list(self.connections.values()):
+            connection.transport.close()
+    
+    def _create_protocol(self) -> StompServerProtocol:
+        self.stats['connections_accepted'] += 1
+        return StompServerProtocol(self, f"tcp-{next(self._ids)}")
+    
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.broker.heartbeat_wheel.tick)
+            self.broker.tick_heartbeats()
+
+# --- Benchmark ------------------------------------------------------------
+
+async def _stomp_connection(port: int, client_id: str):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(StompFrame(StompCommand.CONNECT, {'accept-version': '1.2', 'host': 'localhost',
+                                                   'login': client_id}).to_bytes())
+    return reader, writer
+
+async def _read_frames(reader: asyncio.StreamReader, parser: StompFrameParser,
+                       command: StompCommand, count: int) -> int:
+    """Read until count frames of the given command have arrived"""
+    seen = 0
+    while seen < count:
+        data = await reader.read(65536)
+        if not data:
+            break
+        seen += sum(1 for frame in parser.feed(data) if frame.command == command)
+    return seen
+
+async def _run_server_benchmark(subscriber_count: int = 50, message_count: int = 2000):
+    broker = StompBroker(verbose=False)
+    server = StompServer(broker, '127.0.0.1', 0, high_water=64 * 1024, low_water=16 * 1024,
+                         max_pending_bytes=1024 * 1024)
+    await server.start()
+    
+    try:
+        # Fast subscribers on one topic
+        subscribers = []
+        for i in range(subscriber_count):
+            reader, writer = await _stomp_connection(server.port, f"sub-{i}")
+            writer.write(StompFrame(StompCommand.SUBSCRIBE, {'destination': '/topic/bench', 'id': '1',
+                                                             'receipt': 'subscribed'}).to_bytes())
+            parser = StompFrameParser()
+            await _read_frames(reader, parser, StompCommand.RECEIPT, 1)
+            subscribers.append((reader, writer, parser))
+        
+        # Publish a burst in one write; the broker fans out frame by frame
+        _, producer = await _stomp_connection(server.port, "producer")
+        burst = b''.join(
+            StompFrame(StompCommand.SEND, {'destination': '/topic/bench', 'content-type': 'text/plain'},
+                       f"tick {i}").to_bytes()
+            for i in range(message_count)
+        )
+        start = time.perf_counter()
+        producer.write(burst)
+        received = await asyncio.gather(*(
+            _read_frames(reader, parser, StompCommand.MESSAGE, message_count)
+            for reader, _, parser in subscribers
+        ))
+        elapsed = time.perf_counter() - start
+        
+        deliveries = sum(received)
+        connections = [c for c in server.connections.values() if c.stats['writes']]
+        writes = sum(c.stats['writes'] for c in connections)
+        chunks = sum(c.stats['chunks_written'] for c in connections)
+        print(f"⚡ {deliveries:,} deliveries to {subscriber_count} TCP subscribers in {elapsed:.3f}s "
+              f"({deliveries / elapsed:,.0f} msg/s)")
+        print(f"📦 {chunks:,} frame chunks coalesced into {writes:,} writelines calls")
+        
+        # A consumer that never reads trips the watermarks and is dropped
+        slow_reader, slow_writer = await _stomp_connection(server.port, "slow")
+        slow_writer.write(StompFrame(StompCommand.SUBSCRIBE, {'destination': '/topic/firehose',
+                                                              'id': '1'}).to_bytes())
+        await asyncio.sleep(0.1)
+        blob = 'x' * 16384
+        frame = StompFrame(StompCommand.SEND, {'destination': '/topic/firehose'}, blob).to_bytes()
+        for _ in range(40):
+            producer.write(frame * 50)
+            await producer.drain()
+            await asyncio.sleep(0.01)
+            if server.stats['slow_consumers_dropped']:
+                break
+        print(f"🐢 Slow consumer: {server.stats['pauses']} write pause(s), "
+              f"{server.stats['slow_consumers_dropped']} dropped past "
+              f"{server.max_pending_bytes // 1024}KB pending")
+        
+        for _, writer, _ in subscribers:
+            writer.write(StompFrame(StompCommand.DISCONNECT).to_bytes())
+            writer.close()
+        producer.close()
+        slow_writer.close()
+        await asyncio.sleep(0.1)
+        print(f"🔌 {server.stats['connections_accepted']} connections served, "
+              f"{broker.stats['active_connections']} still active")
+    finally:
+        await server.stop()
+
+def demonstrate_stomp_server():
+    """Demonstrate the asyncio STOMP TCP front-end"""
+    print("=== STOMP TCP Server Demonstration ===")
+    
+    asyncio.run(_run_server_benchmark())
+    
+    print("\n🎯 STOMP TCP server demonstrates:")
+    print("💡 Broker command handlers driven from a single event loop")
+    print("💡 Per-connection write coalescing into one writelines per loop iteration")
+    print("💡 High/low watermark backpressure for slow consumers")
+    print("💡 Heart-beat timers advanced on the same loop")
+
+if __name__ == "__main__":
+    demonstrate_stomp_server()
@@ -13,6 +13,8 @@ from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any, Callable
 import uuid
 
+from mvcc_store import MVCCStore, Event, KeyValue, prefix_end
+
 class NodeState(Enum):
     FOLLOWER = "follower"
     CANDIDATE = "candidate"
@@ -53,8 +55,7 @@ class EtcdNode:
         self.match_index: Dict[str, int] = {}
         
         # Key-value store
-        self.kv_store: Dict[str, Any] = {}
-        self.revision = 0
+        self.store = MVCCStore()
         
         # Watch streams
         self.watchers: Dict[str, List[Callable[[WatchEvent], None]]] = {}
@@ -78,6 +79,10 @@ class EtcdNode:
             'log_entries_replicated': 0
         }
     
+    @property
+    def revision(self) -> int:
+        return self.store.current_revision
+    
     def start(self):
         """Start the etcd node"""
         self.running = True
@@ -200,20 +205,27 @@ class EtcdNode:
         print(f"📝 Put: {key} = {value} (revision {self.revision})")
         return True
     
-    def get(self, key: str) -> Optional[Any]:
-        """Get value by key (gRPC Get operation)"""
+    def get(self, key: str, revision: int = 0) -> Optional[Any]:
+        """Get value by key, optionally as of an earlier revision (gRPC Get operation)"""
+        self.stats['requests_served'] += 1
+        kv = self.store.get(key, revision)
+        if kv is not None:
+            print(f"📖 Get: {key} = {kv.value}" + (f" (at revision {revision})" if revision else ""))
+        return kv.value if kv else None
+    
+    def range(self, key: str, range_end: Optional[str] = None, revision: int = 0,
+              limit: int = 0) -> List[KeyValue]:
+        """Keys in [key, range_end) at a revision (gRPC Range operation)"""
         self.stats['requests_served'] += 1
-        value = self.kv_store.get(key)
-        if value is not None:
-            print(f"📖 Get: {key} = {value}")
-        return value
+        kvs, _ = self.store.range(key, range_end, revision, limit)
+        return kvs
     
     def delete(self, key: str) -> bool:
         """Delete key (gRPC Delete operation)"""
         if self.state != NodeState.LEADER:
             return False
         
-        if key not in self.kv_store:
+        if self.store.get(key) is None:
             return False
         
         # Create log entry
@@ -231,42 +243,49 @@ class EtcdNode:
         print(f"🗑️  Delete: {key} (revision {self.revision})")
         return True
     
-    def watch(self, key_prefix: str, callback: Callable[[WatchEvent], None]):
-        """Watch for changes to keys with prefix (gRPC Watch operation)"""
+    def watch(self, key_prefix: str, callback: Callable[[WatchEvent], None], start_revision: int = 0):
+        """Watch for changes to keys with prefix (gRPC Watch operation).
+        
+        With start_revision the watcher first receives every change from that
+        revision onwards out of the store's history. start_revision is inclusive,
+        as in etcd, so a client resuming a broken stream passes the last revision
+        it saw + 1 and neither misses nor repeats an event.
+        """
+        if start_revision:
+            for event in self.store.events_since(start_revision, key_prefix, prefix_end(key_prefix)):
+                callback(self._watch_event(event))
         if key_prefix not in self.watchers:
             self.watchers[key_prefix] = []
         self.watchers[key_prefix].append(callback)
-        print(f"👁️  Watching: {key_prefix}")
+        print(f"👁️  Watching: {key_prefix}" + (f" from revision {start_revision}" if start_revision else ""))
     
-    def _apply_entry(self, entry: LogEntry):
-        """Apply log entry to state machine"""
-        self.revision += 1
-        
+    def _apply_entry(self, entry: LogEntry) -> bool:
+        """Apply log entry to the MVCC store; returns False for a Txn whose compares failed"""
+        succeeded = True
         if entry.operation == "PUT":
-            old_value = self.kv_store.get(entry.key)
-            self.kv_store[entry.key] = entry.value
-            
-            # Notify watchers
-            self._notify_watchers(WatchEvent(
-                event_type="PUT",
-                key=entry.key,
-                value=entry.value,
-                revision=self.revision
-            ))
-            
+            events = [self.store.put(entry.key, entry.value)]
         elif entry.operation == "DELETE":
-            if entry.key in self.kv_store:
-                del self.kv_store[entry.key]
-                
-                # Notify watchers
-                self._notify_watchers(WatchEvent(
-                    event_type="DELETE",
-                    key=entry.key,
-                    value=None,
-                    revision=self.revision
-                ))
+            events = self.store.delete_range(entry.key)
+        elif entry.operation == "TXN":
+            succeeded, events = self.store.txn(**entry.value)
+        else:
+            events = []
+        
+        # Notify watchers
+        for event in events:
+            self._notify_watchers(self._watch_event(event))
         
         self.last_applied = entry.index
+        return succeeded
+    
+    @staticmethod
+    def _watch_event(event: Event) -> WatchEvent:
+        return WatchEvent(
+            event_type=event.event_type,
+            key=event.kv.key,
+            value=event.kv.value,
+            revision=event.kv.mod_revision
+        )
     
     def _notify_watchers(self, event: WatchEvent):
         """Notify all relevant watchers of an event"""
@@ -278,20 +297,38 @@ class EtcdNode:
                     except Exception as e:
                         print(f"⚠️  Watcher error: {e}")
     
-    def transaction(self, operations: List[Dict[str, Any]]) -> bool:
-        """Execute transaction (gRPC Txn operation)"""
+    def transaction(self, operations: List[Dict[str, Any]], compares: Optional[List[Dict[str, Any]]] = None,
+                    failure: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """Execute transaction (gRPC Txn operation).
+        
+        If every compare holds, operations are applied, otherwise failure is;
+        either branch commits atomically under a single revision. Returns
+        whether the compares held, so a compare on mod_revision is a real
+        compare-and-swap.
+        """
         if self.state != NodeState.LEADER:
             return False
         
-        # Simplified transaction - just execute all operations
-        success = True
-        for op in operations:
-            if op['type'] == 'PUT':
-                success &= self.put(op['key'], op['value'])
-            elif op['type'] == 'DELETE':
-                success &= self.delete(op['key'])
+        entry = LogEntry(
+            term=self.current_term,
+            index=len(self.log) + 1,
+            key="",
+            value={'compares': compares or [], 'success': operations, 'failure': failure or []},
+            operation="TXN"
+        )
+        
+        self.log.append(entry)
+        self.stats['log_entries_replicated'] += 1
+        succeeded = self._apply_entry(entry)
         
-        return success
+        print(f"🔄 Txn: {len(compares or [])} compare(s) {'succeeded' if succeeded else 'failed'}, "
+              f"{len(operations if succeeded else failure or [])} operation(s) (revision {self.revision})")
+        return succeeded
+    
+    def compact(self, revision: int):
+        """Discard history older than revision (gRPC Compact operation)"""
+        self.store.compact(revision)
+        print(f"🗜️  Compacted history up to revision {revision}")
 
 class EtcdCluster:
     def __init__(self, node_count: int = 3):
@@ -420,12 +457,46 @@ def demonstrate_etcd_cluster():
         
         time.sleep(0.1)
         
+        # Revision history
+        print("\n🕰️  MVCC Revisions:")
+        before_rollout = client.revision
+        client.put("/registry/pods/default/web-2", {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": {"name": "web-2", "namespace": "default"},
+            "spec": {"containers": [{"name": "nginx", "image": "nginx:1.22"}]}
+        })
+        old = client.get("/registry/pods/default/web-2", revision=before_rollout)
+        print(f"   web-2 image at revision {before_rollout}: {old['spec']['containers'][0]['image']}")
+        
+        pods = client.range("/registry/pods/", prefix_end("/registry/pods/"))
+        print(f"   Pods now: {[kv.key for kv in pods]}")
+        pods = client.range("/registry/pods/", prefix_end("/registry/pods/"), revision=before_rollout - 1)
+        print(f"   Pods at revision {before_rollout - 1}: {[kv.key for kv in pods]}")
+        
+        # Compare-and-swap on mod_revision, as the Kubernetes API server does for updates
+        kv = client.range("/registry/services/default/web-service")[0]
+        guard = {"key": kv.key, "target": "mod_revision", "result": "=", "value": kv.mod_revision}
+        update = {"type": "PUT", "key": kv.key, "value": {**kv.value, "spec": {"ports": [{"port": 8080}]}}}
+        client.transaction([update], compares=[guard])
+        client.transaction([update], compares=[guard])  # Stale mod_revision: rejected
+        
+        # A watcher that reconnects resumes just after the last revision it saw
+        resumed = []
+        client.watch("/registry/pods/", resumed.append, start_revision=before_rollout + 1)
+        assert [event.revision for event in resumed] == [before_rollout + 1]
+        print(f"   Resumed watch replayed {len(resumed)} event(s) after revision {before_rollout}")
+        
+        client.compact(before_rollout)
+        print(f"   History kept: {len(client.store.backend)} versions, "
+              f"{client.store.stats['keys_scanned']} keys scanned across {client.store.stats['ranges']} range reads")
+        
         # Show cluster state
         print("\n📊 Cluster State:")
         leader = cluster.get_leader()
         if leader:
             print(f"   Leader: {leader.node_id} (term {leader.current_term})")
-            print(f"   Keys stored: {len(leader.kv_store)}")
+            print(f"   Keys stored: {leader.store.key_count()}")
             print(f"   Current revision: {leader.revision}")
             print(f"   Log entries: {len(leader.log)}")
         
@@ -445,6 +516,7 @@ def demonstrate_etcd_cluster():
     print("💡 Raft consensus for distributed consistency")
     print("💡 gRPC-style key-value operations")
     print("💡 Real-time watch streams for change notifications")
+    print("💡 MVCC revisions: reads at past revisions, resumable watches, compare-and-swap")
     print("💡 Kubernetes-style resource storage patterns")
     print("💡 Leader election and cluster coordination")
 
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+etcd MVCC Store
+Revisioned key-value storage: a sorted key index mapping each key to its
+revision list, over a revision-ordered backend of immutable values.
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+RANGE_ALL = '\0'  # range_end meaning "every key >= key", as in etcd
+
+class CompactedError(Exception):
+    """Requested revision has been compacted away"""
+
+class FutureRevisionError(Exception):
+    """Requested revision is newer than the store"""
+
+class Revision(NamedTuple):
+    main: int     # Store revision of the write (one per Put, Delete or Txn)
+    sub: int = 0  # Position of the change inside a Txn
+
+@dataclass(frozen=True)
+class KeyValue:
+    key: str
+    value: Any
+    create_revision: int
+    mod_revision: int
+    version: int  # Puts since the key was created; 0 marks a tombstone
+
+@dataclass
+class Event:
+    event_type: str  # PUT, DELETE
+    kv: KeyValue
+    prev_kv: Optional[KeyValue] = None
+
+def prefix_end(prefix: str) -> str:
+    """range_end covering every key that starts with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else RANGE_ALL
+
+class KeyIndex:
+    """Every backend revision holding a version of one key, oldest first"""
+    
+    def __init__(self, key: str):
+        self.key = key
+        self.revisions: List[Revision] = []
+    
+    def revision_at(self, main: int) -> Optional[Revision]:
+        """Latest revision of the key at or before store revision main"""
+        pos = bisect.bisect_left(self.revisions, Revision(main + 1, 0))
+        return self.revisions[pos - 1] if pos else None
+
+class MVCCStore:
+    """Multi-version key-value store in the style of etcd's mvcc package.
+    
+    Writes never overwrite: each one appends an immutable KeyValue to the
+    backend under a new revision and records that revision in the key's
+    KeyIndex, and a delete appends a tombstone. Keys are kept in a sorted
+    list, so a range read bisects to its first key and walks forward,
+    costing O(log n + k) for k keys in range, and can be served at any
+    revision not yet compacted. Because the backend is in revision order,
+    a watcher can resume from a past revision by replaying it from there.
+    """
+    
+    def __init__(self):
+        self.keys: List[str] = []               # Sorted key index
+        self.index: Dict[str, KeyIndex] = {}
+        self.backend_revisions: List[Revision] = []  # Append-only, so always sorted
+        self.backend: Dict[Revision, KeyValue] = {}
+        self.current_revision = 0
+        self.compact_revision = 0
+        
+        self.stats = {
+            'puts': 0,
+            'deletes': 0,
+            'txns': 0,
+            'ranges': 0,
+            'keys_scanned': 0,
+            'compactions': 0
+        }
+    
+    # --- Reads ------------------------------------------------------------
+    
+    def range(self, key: str, range_end: Optional[str] = None, revision: int = 0,
+              limit: int = 0) -> Tuple[List[KeyValue], int]:
+        """Live keys in [key, range_end) as of revision (0 = latest); returns (kvs, store revision)"""
+        revision = self._check_revision(revision)
+        self.stats['ranges'] += 1
+        
+        kvs = []
+        for name in self._keys_in_range(key, range_end):
+            self.stats['keys_scanned'] += 1
+            kv = self._get(name, revision)
+            if kv is not None:
+                kvs.append(kv)
+                if limit and len(kvs) == limit:
+                    break
+        return kvs, self.current_revision
+    
+    def get(self, key: str, revision: int = 0) -> Optional[KeyValue]:
+        kvs, _ = self.range(key, revision=revision)
+        return kvs[0] if kvs else None
+    
+    def events_since(self, start_revision: int, key: str, range_end: Optional[str] = None) -> List[Event]:
+        """Changes to [key, range_end) from start_revision onwards, in revision order"""
+        if start_revision <= self.compact_revision:
+            raise CompactedError(f"revision {start_revision} compacted (at {self.compact_revision})")
+        
+        events = []
+        start = bisect.bisect_left(self.backend_revisions, Revision(start_revision, 0))
+        for rev in self.backend_revisions[start:]:
+            kv = self.backend[rev]
+            if self._in_range(kv.key, key, range_end):
+                events.append(Event("DELETE" if kv.version == 0 else "PUT", kv))
+        return events
+    
+    def key_count(self) -> int:
+        """Keys live at the current revision"""
+        return sum(1 for name in self.keys if self._get(name, self.current_revision) is not None)
+    
+    # --- Writes -----------------------------------------------------------
+    
+    def put(self, key: str, value: Any) -> Event:
+        self.current_revision += 1
+        return self._put(key, value, Revision(self.current_revision, 0))
+    
+    def delete_range(self, key: str, range_end: Optional[str] = None) -> List[Event]:
+        """Tombstone every live key in range; the revision only moves if something was deleted"""
+        live = [name for name in self._keys_in_range(key, range_end)
+                if self._get(name, self.current_revision) is not None]
+        if not live:
+            return []
+        self.current_revision += 1
+        return [self._delete(name, Revision(self.current_revision, sub)) for sub, name in enumerate(live)]
+    
+    def txn(self, compares: List[Dict[str, Any]], success: List[Dict[str, Any]],
+            failure: Optional[List[Dict[str, Any]]] = None) -> Tuple[bool, List[Event]]:
+        """Evaluate every compare against the current revision, then apply one branch atomically.
+        
+        A compare is {'key', 'target', 'result', 'value'} where target is one of
+        value, version, create_revision or mod_revision and result one of
+        =, !=, <, >. Operations are {'type': 'PUT', 'key', 'value'} or
+        {'type': 'DELETE', 'key', 'range_end'?}. All writes in the chosen branch
+        share one revision, distinguished by sub-revision.
+        """
+        self.stats['txns'] += 1
+        succeeded = all(self._compare(compare) for compare in compares)
+        operations = success if succeeded else (failure or [])
+        
+        events: List[Event] = []
+        main = self.current_revision + 1
+        for op in operations:
+            if op['type'] == 'PUT':
+                events.append(self._put(op['key'], op['value'], Revision(main, len(events))))
+            elif op['type'] == 'DELETE':
+                for name in list(self._keys_in_range(op['key'], op.get('range_end'))):
+                    # Read through this txn's own earlier writes
+                    if self._get(name, main) is not None:
+                        events.append(self._delete(name, Revision(main, len(events))))
+        if events:
+            self.current_revision = main
+        return succeeded, events
+    
+    def compact(self, revision: int):
+        """Drop history older than revision, keeping each key's value as of revision"""
+        if revision <= self.compact_revision:
+            raise CompactedError(f"revision {revision} already compacted (at {self.compact_revision})")
+        if revision > self.current_revision:
+            raise FutureRevisionError(f"revision {revision} is ahead of {self.current_revision}")
+        
+        for name in self.keys:
+            key_index = self.index[name]
+            revs = key_index.revisions
+            pos = bisect.bisect_left(revs, Revision(revision + 1, 0))
+            # The newest version at or before revision survives unless it is a tombstone
+            keep = pos - 1 if pos and self.backend[revs[pos - 1]].version else pos
+            for rev in revs[:keep]:
+                del self.backend[rev]
+            key_index.revisions = revs[keep:]
+            if not key_index.revisions:
+                del self.index[name]
+        
+        self.keys = [name for name in self.keys if name in self.index]
+        self.backend_revisions = [rev for rev in self.backend_revisions if rev in self.backend]
+        self.compact_revision = revision
+        self.stats['compactions'] += 1
+    
+    # --- Internals --------------------------------------------------------
+    
+    def _put(self, key: str, value: Any, rev: Revision) -> Event:
+        key_index = self.index.get(key)
+        if key_index is None:
+            key_index = self.index[key] = KeyIndex(key)
+            bisect.insort(self.keys, key)
+        prev = self._get(key, rev.main)
+        kv = KeyValue(key, value,
+                      create_revision=prev.create_revision if prev else rev.main,
+                      mod_revision=rev.main,
+                      version=prev.version + 1 if prev else 1)
+        self._append(key_index, rev, kv)
+        self.stats['puts'] += 1
+        return Event("PUT", kv, prev)
+    
+    def _delete(self, key: str, rev: Revision) -> Event:
+        prev = self._get(key, rev.main)
+        tombstone = KeyValue(key, None, create_revision=0, mod_revision=rev.main, version=0)
+        self._append(self.index[key], rev, tombstone)
+        self.stats['deletes'] += 1
+        return Event("DELETE", tombstone, prev)
+    
+    def _append(self, key_index: KeyIndex, rev: Revision, kv: KeyValue):
+        key_index.revisions.append(rev)
+        self.backend_revisions.append(rev)
+        self.backend[rev] = kv
+    
+    def _get(self, key: str, revision: int) -> Optional[KeyValue]:
+        key_index = self.index.get(key)
+        rev = key_index.revision_at(revision) if key_index else None
+        if rev is None:
+            return None
+        kv = self.backend[rev]
+        return kv if kv.version else None
+    
+    def _keys_in_range(self, key: str, range_end: Optional[str]) -> List[str]:
+        if range_end is None:
+            return [key] if key in self.index else []
+        start = bisect.bisect_left(self.keys, key)
+        end = len(self.keys) if range_end == RANGE_ALL else bisect.bisect_left(self.keys, range_end)
+        return self.keys[start:end]
+    
+    @staticmethod
+    def _in_range(name: str, key: str, range_end: Optional[str]) -> bool:
+        if range_end is None:
+            return name == key
+        return name >= key and (range_end == RANGE_ALL or name < range_end)
+    
+    def _check_revision(self, revision: int) -> int:
+        if revision <= 0:
+            return self.current_revision
+        if revision < self.compact_revision:
+            raise CompactedError(f"revision {revision} compacted (at {self.compact_revision})")
+        if revision > self.current_revision:
+            raise FutureRevisionError(f"revision {revision} is ahead of {self.current_revision}")
+        return revision
+    
+    def _compare(self, compare: Dict[str, Any]) -> bool:
+        kv = self._get(compare['key'], self.current_revision)
+        target = compare['target']
+        if target == 'value':
+            actual = kv.value if kv else None
+        else:
+            actual = getattr(kv, target) if kv else 0
+        expected = compare['value']
+        result = compare['result']
+        if result == '=':
+            return actual == expected
+        if result == '!=':
+            return actual != expected
+        if actual is None:
+            return False
+        if result == '<':
+            return actual < expected
+        if result == '>':
+            return actual > expected
+        raise ValueError(f"Unknown compare result: {result}")